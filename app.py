@@ -1,16 +1,24 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime, timedelta, timezone
+import hmac
 import os
 
 # Import models and database
 from models import db, jwt
 from models.user import User
 from models.law import Law
+from models.law_category import LawCategory
 from models.news import News
 from models.comrade import Comrade
 from models.file import File
+from models.table_version import TableVersion
+from models.feed import Feed
+from models.document_page import DocumentPage
+from models.upload_session import UploadSession
+from models.revoked_token import RevokedToken
 
 # Import routes
 from routes.auth import auth_bp, check_if_token_revoked
@@ -21,11 +29,30 @@ from routes.files import files_bp
 
 # Import configuration
 from config import Config
+from utils.search import init_search
+from utils.migrations import run_migrations
+from utils.pdf_text import queue_pending_extractions
+from utils.images import queue_pending_derivatives
+from utils.uploads import remove_expired_upload_sessions
+from utils.feeds import rebuild_news_feeds
+from utils.upload_gc import gc_uploads_command
+from utils.storage import migrate_uploads_command, get_storage, upload_folder
+from utils.compression import PrecompressedBody, init_compression
+from utils.api_docs import DOCS_HTML, OPENAPI_SPEC
+from utils.serialization import init_json
+from utils.instrumentation import init_metrics
+from utils.metrics import render as render_metrics
 
 def create_app():
     """Application factory"""
     app = Flask(__name__)
     app.config.from_object(Config)
+    if app.config['PROXY_FIX_X_FOR']:
+        # Behind a reverse proxy: take the client address from X-Forwarded-For
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    init_json(app)
+    if app.config['METRICS_ENABLED']:
+        init_metrics(app)
     
     # Initialize extensions
     db.init_app(app)
@@ -34,6 +61,7 @@ def create_app():
          origins=app.config['CORS_ORIGINS'],
          allow_headers=app.config['CORS_ALLOW_HEADERS'],
          supports_credentials=app.config['CORS_SUPPORTS_CREDENTIALS'])
+    init_compression(app)
     
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -42,6 +70,10 @@ def create_app():
     app.register_blueprint(comrades_bp, url_prefix='/api/comrades')
     app.register_blueprint(files_bp, url_prefix='/api/files')
     
+    # Maintenance commands (flask --app app <command>)
+    app.cli.add_command(gc_uploads_command)
+    app.cli.add_command(migrate_uploads_command)
+    
     # JWT configuration
     @jwt.token_in_blocklist_loader
     def check_if_token_is_revoked(jwt_header, jwt_payload):
@@ -93,674 +125,22 @@ def create_app():
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         }), 500
     
+    # The docs page and the OpenAPI spec never change while the app runs:
+    # serialize and compress them once
+    docs_page = PrecompressedBody(DOCS_HTML.encode('utf-8'), 'text/html; charset=utf-8')
+    openapi_spec = PrecompressedBody(app.json.dumps(OPENAPI_SPEC).encode('utf-8'), 'application/json')
+    
     # Swagger documentation endpoint
     @app.route('/docs/')
     @app.route('/docs')
     def swagger_docs():
         """Simple API Documentation"""
-        return '''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Veterans Association API Documentation</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
-                .container { background: white; padding: 30px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
-                h1 { color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
-                h2 { color: #34495e; margin-top: 30px; }
-                .endpoint { background: #ecf0f1; padding: 15px; margin: 10px 0; border-radius: 5px; }
-                .method { display: inline-block; padding: 5px 10px; border-radius: 3px; font-weight: bold; }
-                .get { background: #27ae60; color: white; }
-                .post { background: #e74c3c; color: white; }
-                .put { background: #f39c12; color: white; }
-                .delete { background: #e74c3c; color: white; }
-                .auth { color: #e67e22; font-weight: bold; }
-                code { background: #34495e; color: white; padding: 2px 5px; border-radius: 3px; }
-                .json-spec { background: #2c3e50; color: #ecf0f1; padding: 20px; border-radius: 5px; overflow: auto; }
-                .btn { background: #3498db; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>Veterans Association API Documentation</h1>
-                <p>Complete REST API for managing laws, news, comrades search, and file uploads.</p>
-                <p><strong>Base URL:</strong> <code>/api</code></p>
-                
-                <p><a href="/api/swagger.json" class="btn">View OpenAPI 3.0 Specification</a></p>
-                
-                <h2>Authentication</h2>
-                <div class="endpoint">
-                    <span class="method post">POST</span> <code>/auth/login</code>
-                    <p>Login with username/password to get JWT token</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method post">POST</span> <code>/auth/logout</code> <span class="auth">[Auth Required]</span>
-                    <p>Logout and invalidate token</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/auth/verify</code> <span class="auth">[Auth Required]</span>
-                    <p>Verify token validity</p>
-                </div>
-
-                <h2>Laws Management</h2>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/laws</code>
-                    <p>Get all laws with filtering (category, search, pagination)</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/laws/{id}</code>
-                    <p>Get specific law by ID</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method post">POST</span> <code>/laws</code> <span class="auth">[Auth Required]</span>
-                    <p>Create new law with multilingual support</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method put">PUT</span> <code>/laws/{id}</code> <span class="auth">[Auth Required]</span>
-                    <p>Update existing law</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method delete">DELETE</span> <code>/laws/{id}</code> <span class="auth">[Auth Required]</span>
-                    <p>Delete law</p>
-                </div>
-
-                <h2>News Management</h2>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/news</code>
-                    <p>Get all news with filtering, sorting, and pagination</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/news/{id}</code>
-                    <p>Get specific news by ID</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method post">POST</span> <code>/news</code> <span class="auth">[Auth Required]</span>
-                    <p>Create new news with multilingual support</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method put">PUT</span> <code>/news/{id}</code> <span class="auth">[Auth Required]</span>
-                    <p>Update existing news</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method delete">DELETE</span> <code>/news/{id}</code> <span class="auth">[Auth Required]</span>
-                    <p>Delete news</p>
-                </div>
-
-                <h2>Comrades Search</h2>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/comrades</code>
-                    <p>Search comrades with filters (name, unit, region, years, rank)</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/comrades/{id}</code>
-                    <p>Get specific comrade by ID</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method post">POST</span> <code>/comrades</code>
-                    <p>Add new comrade information</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method put">PUT</span> <code>/comrades/{id}</code> <span class="auth">[Auth Required]</span>
-                    <p>Update comrade information</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method delete">DELETE</span> <code>/comrades/{id}</code> <span class="auth">[Auth Required]</span>
-                    <p>Delete comrade information</p>
-                </div>
-
-                <h2>File Management</h2>
-                <div class="endpoint">
-                    <span class="method post">POST</span> <code>/files/upload</code> <span class="auth">[Auth Required]</span>
-                    <p>Upload PDF or image files</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/files</code> <span class="auth">[Auth Required]</span>
-                    <p>List uploaded files with filtering</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method get">GET</span> <code>/files/{id}</code>
-                    <p>Get file metadata by ID</p>
-                </div>
-                <div class="endpoint">
-                    <span class="method delete">DELETE</span> <code>/files/{id}</code> <span class="auth">[Auth Required]</span>
-                    <p>Delete file and metadata</p>
-                </div>
-
-                <h2>Example Usage</h2>
-                <h3>Login:</h3>
-                <pre><code>curl -X POST http://localhost:5000/api/auth/login \\
-  -H "Content-Type: application/json" \\
-  -d '{"username":"admin","password":"admin"}'</code></pre>
-
-                <h3>Get Laws:</h3>
-                <pre><code>curl http://localhost:5000/api/laws?limit=10&category=федеральный</code></pre>
-
-                <h3>Create News (with token):</h3>
-                <pre><code>curl -X POST http://localhost:5000/api/news \\
-  -H "Authorization: Bearer &lt;token&gt;" \\
-  -H "Content-Type: application/json" \\
-  -d '{"title": {"ru":"Новость","uz":"Yangilik","en":"News"}, ...}'</code></pre>
-
-                <p><strong>Default Admin:</strong> username: <code>admin</code>, password: <code>admin</code></p>
-            </div>
-        </body>
-        </html>
-        '''
+        return docs_page.response(app.config['DOCS_CACHE_MAX_AGE'])
     
     @app.route('/api/swagger.json')
     def swagger_json():
         """OpenAPI specification"""
-        swagger_spec = {
-            "openapi": "3.0.0",
-            "info": {
-                "title": "Veterans Association API",
-                "description": "API для Ассоциации Ветеранов - управление законами, новостями, поиск сослуживцев и файлы",
-                "version": "1.0.0"
-            },
-            "servers": [
-                {"url": "/api", "description": "API server"}
-            ],
-            "components": {
-                "securitySchemes": {
-                    "Bearer": {
-                        "type": "http",
-                        "scheme": "bearer",
-                        "bearerFormat": "JWT",
-                        "description": "JWT token for authentication"
-                    }
-                },
-                "schemas": {
-                    "MultiLangText": {
-                        "type": "object",
-                        "properties": {
-                            "ru": {"type": "string", "description": "Russian text"},
-                            "uz": {"type": "string", "description": "Uzbek text"},
-                            "en": {"type": "string", "description": "English text"}
-                        },
-                        "required": ["ru", "uz", "en"]
-                    },
-                    "Law": {
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "integer"},
-                            "title": {"$ref": "#/components/schemas/MultiLangText"},
-                            "description": {"$ref": "#/components/schemas/MultiLangText"},
-                            "category": {"$ref": "#/components/schemas/MultiLangText"},
-                            "date": {"type": "string", "format": "date"},
-                            "pdfUrl": {"type": "string", "nullable": True},
-                            "createdAt": {"type": "string", "format": "date-time"},
-                            "updatedAt": {"type": "string", "format": "date-time"}
-                        }
-                    },
-                    "News": {
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "integer"},
-                            "title": {"$ref": "#/components/schemas/MultiLangText"},
-                            "content": {"$ref": "#/components/schemas/MultiLangText"},
-                            "summary": {"$ref": "#/components/schemas/MultiLangText"},
-                            "date": {"type": "string", "format": "date"},
-                            "imageUrl": {"type": "string", "nullable": True},
-                            "createdAt": {"type": "string", "format": "date-time"},
-                            "updatedAt": {"type": "string", "format": "date-time"}
-                        }
-                    },
-                    "Comrade": {
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "integer"},
-                            "firstName": {"type": "string"},
-                            "lastName": {"type": "string"},
-                            "middleName": {"type": "string", "nullable": True},
-                            "unit": {"type": "string"},
-                            "region": {"type": "string"},
-                            "yearOfServiceFrom": {"type": "integer"},
-                            "yearOfServiceTo": {"type": "integer", "nullable": True},
-                            "rank": {"type": "string", "nullable": True},
-                            "photoUrl": {"type": "string", "nullable": True},
-                            "contactInfo": {"type": "object"},
-                            "additionalInfo": {"type": "string", "nullable": True},
-                            "isVerified": {"type": "boolean"},
-                            "createdAt": {"type": "string", "format": "date-time"},
-                            "updatedAt": {"type": "string", "format": "date-time"}
-                        }
-                    },
-                    "LoginRequest": {
-                        "type": "object",
-                        "properties": {
-                            "username": {"type": "string"},
-                            "password": {"type": "string"}
-                        },
-                        "required": ["username", "password"]
-                    },
-                    "Error": {
-                        "type": "object",
-                        "properties": {
-                            "error": {"type": "string"},
-                            "message": {"type": "string"},
-                            "timestamp": {"type": "string", "format": "date-time"}
-                        }
-                    }
-                }
-            },
-            "paths": {
-                "/auth/login": {
-                    "post": {
-                        "tags": ["Authentication"],
-                        "summary": "Login user",
-                        "description": "Authenticate user and return JWT token",
-                        "requestBody": {
-                            "required": True,
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/LoginRequest"}
-                                }
-                            }
-                        },
-                        "responses": {
-                            "200": {
-                                "description": "Login successful",
-                                "content": {
-                                    "application/json": {
-                                        "schema": {
-                                            "type": "object",
-                                            "properties": {
-                                                "token": {"type": "string"},
-                                                "user": {"type": "object"}
-                                            }
-                                        }
-                                    }
-                                }
-                            },
-                            "401": {
-                                "description": "Invalid credentials",
-                                "content": {
-                                    "application/json": {
-                                        "schema": {"$ref": "#/components/schemas/Error"}
-                                    }
-                                }
-                            }
-                        }
-                    }
-                },
-                "/auth/logout": {
-                    "post": {
-                        "tags": ["Authentication"],
-                        "summary": "Logout user",
-                        "description": "Deactivate JWT token",
-                        "security": [{"Bearer": []}],
-                        "responses": {
-                            "204": {"description": "Logout successful"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                },
-                "/auth/verify": {
-                    "get": {
-                        "tags": ["Authentication"],
-                        "summary": "Verify token",
-                        "description": "Verify JWT token validity",
-                        "security": [{"Bearer": []}],
-                        "responses": {
-                            "200": {
-                                "description": "Token is valid",
-                                "content": {
-                                    "application/json": {
-                                        "schema": {
-                                            "type": "object",
-                                            "properties": {
-                                                "valid": {"type": "boolean"},
-                                                "user": {"type": "object"}
-                                            }
-                                        }
-                                    }
-                                }
-                            },
-                            "401": {"description": "Token invalid"}
-                        }
-                    }
-                },
-                "/laws": {
-                    "get": {
-                        "tags": ["Laws"],
-                        "summary": "Get all laws",
-                        "description": "Get all laws with optional filtering",
-                        "parameters": [
-                            {"name": "category", "in": "query", "schema": {"type": "string"}, "description": "Filter by category"},
-                            {"name": "search", "in": "query", "schema": {"type": "string"}, "description": "Search in title and description"},
-                            {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 50}, "description": "Number of results"},
-                            {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}, "description": "Offset for pagination"}
-                        ],
-                        "responses": {
-                            "200": {
-                                "description": "List of laws",
-                                "content": {
-                                    "application/json": {
-                                        "schema": {
-                                            "type": "object",
-                                            "properties": {
-                                                "laws": {"type": "array", "items": {"$ref": "#/components/schemas/Law"}},
-                                                "total": {"type": "integer"},
-                                                "limit": {"type": "integer"},
-                                                "offset": {"type": "integer"}
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "post": {
-                        "tags": ["Laws"],
-                        "summary": "Create law",
-                        "description": "Create new law",
-                        "security": [{"Bearer": []}],
-                        "requestBody": {
-                            "required": True,
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "title": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "description": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "category": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "date": {"type": "string", "format": "date"},
-                                            "pdfUrl": {"type": "string"}
-                                        },
-                                        "required": ["title", "description", "category", "date"]
-                                    }
-                                }
-                            }
-                        },
-                        "responses": {
-                            "201": {
-                                "description": "Law created",
-                                "content": {
-                                    "application/json": {
-                                        "schema": {"$ref": "#/components/schemas/Law"}
-                                    }
-                                }
-                            },
-                            "400": {"description": "Validation error"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                },
-                "/laws/{id}": {
-                    "get": {
-                        "tags": ["Laws"],
-                        "summary": "Get law by ID",
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "responses": {
-                            "200": {
-                                "description": "Law details",
-                                "content": {
-                                    "application/json": {
-                                        "schema": {"$ref": "#/components/schemas/Law"}
-                                    }
-                                }
-                            },
-                            "404": {"description": "Law not found"}
-                        }
-                    },
-                    "put": {
-                        "tags": ["Laws"],
-                        "summary": "Update law",
-                        "security": [{"Bearer": []}],
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "requestBody": {
-                            "required": True,
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "title": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "description": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "category": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "date": {"type": "string", "format": "date"},
-                                            "pdfUrl": {"type": "string"}
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "responses": {
-                            "200": {"description": "Law updated"},
-                            "404": {"description": "Law not found"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    },
-                    "delete": {
-                        "tags": ["Laws"],
-                        "summary": "Delete law",
-                        "security": [{"Bearer": []}],
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "responses": {
-                            "204": {"description": "Law deleted"},
-                            "404": {"description": "Law not found"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                },
-                "/news": {
-                    "get": {
-                        "tags": ["News"],
-                        "summary": "Get all news",
-                        "description": "Get all news with optional filtering and sorting",
-                        "parameters": [
-                            {"name": "search", "in": "query", "schema": {"type": "string"}},
-                            {"name": "dateFrom", "in": "query", "schema": {"type": "string", "format": "date"}},
-                            {"name": "dateTo", "in": "query", "schema": {"type": "string", "format": "date"}},
-                            {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 20}},
-                            {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}},
-                            {"name": "sortBy", "in": "query", "schema": {"type": "string", "enum": ["date", "title"], "default": "date"}},
-                            {"name": "sortOrder", "in": "query", "schema": {"type": "string", "enum": ["asc", "desc"], "default": "desc"}}
-                        ],
-                        "responses": {
-                            "200": {
-                                "description": "List of news",
-                                "content": {
-                                    "application/json": {
-                                        "schema": {
-                                            "type": "object",
-                                            "properties": {
-                                                "news": {"type": "array", "items": {"$ref": "#/components/schemas/News"}},
-                                                "total": {"type": "integer"},
-                                                "limit": {"type": "integer"},
-                                                "offset": {"type": "integer"}
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "post": {
-                        "tags": ["News"],
-                        "summary": "Create news",
-                        "security": [{"Bearer": []}],
-                        "requestBody": {
-                            "required": True,
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "title": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "content": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "summary": {"$ref": "#/components/schemas/MultiLangText"},
-                                            "date": {"type": "string", "format": "date"},
-                                            "imageUrl": {"type": "string"}
-                                        },
-                                        "required": ["title", "content", "summary", "date"]
-                                    }
-                                }
-                            }
-                        },
-                        "responses": {
-                            "201": {"description": "News created"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                },
-                "/news/{id}": {
-                    "get": {
-                        "tags": ["News"],
-                        "summary": "Get news by ID",
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "responses": {
-                            "200": {"description": "News details"},
-                            "404": {"description": "News not found"}
-                        }
-                    },
-                    "put": {
-                        "tags": ["News"],
-                        "summary": "Update news",
-                        "security": [{"Bearer": []}],
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "responses": {
-                            "200": {"description": "News updated"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    },
-                    "delete": {
-                        "tags": ["News"],
-                        "summary": "Delete news",
-                        "security": [{"Bearer": []}],
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "responses": {
-                            "204": {"description": "News deleted"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                },
-                "/comrades": {
-                    "get": {
-                        "tags": ["Comrades"],
-                        "summary": "Search comrades",
-                        "parameters": [
-                            {"name": "name", "in": "query", "schema": {"type": "string"}},
-                            {"name": "unit", "in": "query", "schema": {"type": "string"}},
-                            {"name": "region", "in": "query", "schema": {"type": "string"}},
-                            {"name": "yearFrom", "in": "query", "schema": {"type": "integer"}},
-                            {"name": "yearTo", "in": "query", "schema": {"type": "integer"}},
-                            {"name": "rank", "in": "query", "schema": {"type": "string"}},
-                            {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 50}},
-                            {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}}
-                        ],
-                        "responses": {
-                            "200": {"description": "Search results"}
-                        }
-                    },
-                    "post": {
-                        "tags": ["Comrades"],
-                        "summary": "Add comrade",
-                        "responses": {
-                            "201": {"description": "Comrade added"}
-                        }
-                    }
-                },
-                "/comrades/{id}": {
-                    "get": {
-                        "tags": ["Comrades"],
-                        "summary": "Get comrade by ID",
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "responses": {
-                            "200": {"description": "Comrade details"},
-                            "404": {"description": "Comrade not found"}
-                        }
-                    },
-                    "put": {
-                        "tags": ["Comrades"],
-                        "summary": "Update comrade",
-                        "security": [{"Bearer": []}],
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "responses": {
-                            "200": {"description": "Comrade updated"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    },
-                    "delete": {
-                        "tags": ["Comrades"],
-                        "summary": "Delete comrade",
-                        "security": [{"Bearer": []}],
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
-                        "responses": {
-                            "204": {"description": "Comrade deleted"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                },
-                "/files/upload": {
-                    "post": {
-                        "tags": ["Files"],
-                        "summary": "Upload file",
-                        "security": [{"Bearer": []}],
-                        "requestBody": {
-                            "content": {
-                                "multipart/form-data": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "file": {"type": "string", "format": "binary"},
-                                            "type": {"type": "string", "enum": ["pdf", "image"]},
-                                            "category": {"type": "string", "enum": ["law", "news", "photo", "other"]}
-                                        },
-                                        "required": ["file", "type"]
-                                    }
-                                }
-                            }
-                        },
-                        "responses": {
-                            "201": {"description": "File uploaded"},
-                            "400": {"description": "Invalid file"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                },
-                "/files": {
-                    "get": {
-                        "tags": ["Files"],
-                        "summary": "List files",
-                        "security": [{"Bearer": []}],
-                        "parameters": [
-                            {"name": "type", "in": "query", "schema": {"type": "string", "enum": ["pdf", "image"]}},
-                            {"name": "category", "in": "query", "schema": {"type": "string"}},
-                            {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 50}},
-                            {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}}
-                        ],
-                        "responses": {
-                            "200": {"description": "File list"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                },
-                "/files/{id}": {
-                    "get": {
-                        "tags": ["Files"],
-                        "summary": "Get file metadata",
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}],
-                        "responses": {
-                            "200": {"description": "File metadata"},
-                            "404": {"description": "File not found"}
-                        }
-                    },
-                    "delete": {
-                        "tags": ["Files"],
-                        "summary": "Delete file",
-                        "security": [{"Bearer": []}],
-                        "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}],
-                        "responses": {
-                            "204": {"description": "File deleted"},
-                            "401": {"description": "Unauthorized"}
-                        }
-                    }
-                }
-            }
-        }
-        return jsonify(swagger_spec)
+        return openapi_spec.response(app.config['DOCS_CACHE_MAX_AGE'])
     
     # Health check endpoint
     @app.route('/health')
@@ -771,6 +151,19 @@ def create_app():
             'version': '1.0.0'
         })
     
+    # Metrics endpoint (Prometheus text format)
+    if app.config['METRICS_ENABLED']:
+        @app.route('/metrics')
+        def metrics():
+            token = app.config['METRICS_TOKEN']
+            if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                return jsonify({
+                    'error': 'Unauthorized',
+                    'message': 'A valid metrics token is required'
+                }), 401
+            
+            return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    
     # API info endpoint
     @app.route('/api/info')
     def api_info():
@@ -795,6 +188,12 @@ def init_db(app):
         # Create all tables
         db.create_all()
         
+        # Upgrade tables created by older versions
+        run_migrations(db)
+        
+        # Create and backfill full-text search tables (SQLite FTS5 only)
+        init_search(db)
+        
         # Check if admin user exists
         admin = User.query.filter_by(username='admin').first()
         if not admin:
@@ -803,7 +202,13 @@ def init_db(app):
             db.session.add(admin)
             
             # Create sample law
+            sample_category = LawCategory.get_or_create({
+                'ru': 'Федеральный закон',
+                'uz': 'Federal qonun',
+                'en': 'Federal Law'
+            })
             sample_law = Law(
+                category_id=sample_category.id,
                 title_ru='Закон о ветеранах',
                 title_uz='Veteranlar haqidagi qonun',
                 title_en='Veterans Law',
@@ -858,6 +263,16 @@ def init_db(app):
             db.session.commit()
             print("Database initialized with sample data")
             print("Admin credentials: admin/admin")
+        
+        # Render the news feeds (and re-render them after a SITE_URL change)
+        rebuild_news_feeds()
+        db.session.commit()
+        
+        # Extract text of PDFs / resize images uploaded before this existed
+        queue_pending_extractions()
+        queue_pending_derivatives()
+        remove_expired_upload_sessions(upload_folder())
+        get_storage().resume_writes()
 
 if __name__ == '__main__':
     app = create_app()
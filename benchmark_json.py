@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark of JSON serialization cost per 1000 rows for each model
+
+Times to_dict() and the encoding of the resulting list with Flask's default
+provider (the standard library json module) and with the app's FastJSONProvider.
+No database is needed: rows are built in memory.
+
+    python benchmark_json.py [--rows 1000] [--repeat 20]
+"""
+import argparse
+import timeit
+from datetime import datetime, date, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from models.law import Law
+from models.news import News
+from models.comrade import Comrade
+from models.file import File
+from models.upload_session import UploadSession
+from utils.serialization import FastJSONProvider, orjson
+
+TEXT = {
+    'ru': 'Закон о статусе ветеранов военной службы и социальной защите их семей',
+    'uz': 'Harbiy xizmat faxriylarining maqomi va oilalarini ijtimoiy himoya qilish to\'g\'risida',
+    'en': 'On the status of military service veterans and social protection of their families'
+}
+
+def multilang(field, repeat=1):
+    return {f'{field}_{code}': ' '.join([text] * repeat) for code, text in TEXT.items()}
+
+def make_laws(count, now):
+    return [Law(id=i, date=date(2020, 1, 1) + timedelta(days=i), pdf_url=f'/api/files/uploads/{i}.pdf',
+                category_id=i % 10, created_at=now, updated_at=now,
+                **multilang('title'), **multilang('description', 3), **multilang('category'))
+            for i in range(count)]
+
+def make_news(count, now):
+    return [News(id=i, date=date(2020, 1, 1) + timedelta(days=i), image_url=f'/api/files/uploads/{i}.jpg',
+                 created_at=now, updated_at=now,
+                 **multilang('title'), **multilang('summary', 2), **multilang('content', 10))
+            for i in range(count)]
+
+def make_comrades(count, now):
+    comrades = []
+    for i in range(count):
+        comrade = Comrade(id=i, first_name='Иван', last_name=f'Петров{i}', middle_name='Сергеевич',
+                          unit=f'в/ч {10000 + i}', region='Ташкент', year_of_service_from=1980,
+                          year_of_service_to=1982, rank='сержант', photo_url=None,
+                          additional_info='Служил в Афганистане', is_verified=bool(i % 2),
+                          created_at=now, updated_at=now)
+        comrade.set_contact_info({'phone': '+998 90 123 45 67', 'email': f'comrade{i}@example.com'})
+        comrades.append(comrade)
+    return comrades
+
+def make_files(count, now):
+    return [File(id=f'{i:08d}-0000-0000-0000-000000000000', filename=f'ab/cd/{i:064x}.jpg',
+                 original_name=f'photo_{i}.jpg', url=f'/api/files/uploads/{i:064x}.jpg', file_type='image',
+                 category='news', size=250000 + i, optimized_size=120000, sha256=f'{i:064x}', ref_count=1,
+                 derivatives='{"thumb": {"width": 200, "height": 150}, "md": {"width": 800, "height": 600}}',
+                 uploaded_at=now)
+            for i in range(count)]
+
+def make_upload_sessions(count, now):
+    return [UploadSession(id=f'{i:032x}', filename=f'scan_{i}.pdf', file_type='pdf', category='law',
+                          size=8000000, offset=4000000, created_at=now, expires_at=now + timedelta(days=1))
+            for i in range(count)]
+
+MODELS = [
+    ('Law', make_laws, lambda row: row.to_dict()),
+    ('Law (lang=ru)', make_laws, lambda row: row.to_dict('ru')),
+    ('News', make_news, lambda row: row.to_dict()),
+    ('News (lang=ru, list)', make_news, lambda row: row.to_dict('ru', include_content=False)),
+    ('Comrade', make_comrades, lambda row: row.to_dict()),
+    ('File', make_files, lambda row: row.to_dict()),
+    ('UploadSession', make_upload_sessions, lambda row: row.to_dict())
+]
+
+def per_thousand(fn, rows, repeat):
+    """Best of repeat runs, in milliseconds per 1000 rows"""
+    best = min(timeit.repeat(fn, number=1, repeat=repeat))
+    return best * 1000 * 1000 / rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    default_provider.default = FastJSONProvider.default
+    fast_provider = FastJSONProvider(app)
+    now = datetime.utcnow()
+
+    print(f"JSON serialization, ms per 1000 rows (best of {args.repeat}, orjson {'on' if orjson else 'not installed'})")
+    print(f"{'model':<24}{'to_dict':>10}{'stdlib json':>14}{'app provider':>14}{'KB':>8}")
+    with app.app_context():
+        for name, make_rows, serialize in MODELS:
+            rows = make_rows(args.rows, now)
+            data = [serialize(row) for row in rows]
+            size = len(fast_provider.response(data).get_data())
+
+            to_dict = per_thousand(lambda: [serialize(row) for row in rows], args.rows, args.repeat)
+            stdlib = per_thousand(lambda: default_provider.response(data), args.rows, args.repeat)
+            fast = per_thousand(lambda: fast_provider.response(data), args.rows, args.repeat)
+            print(f'{name:<24}{to_dict:>10.2f}{stdlib:>14.2f}{fast:>14.2f}{size / 1024:>8.0f}')
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
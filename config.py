@@ -14,12 +14,111 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_ALGORITHM = 'HS256'
     
+    # Login throttling (per worker process): token buckets of *_BURST attempts
+    # refilled at *_PER_MINUTE, per client IP and per username
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 20))
+    LOGIN_IP_PER_MINUTE = int(os.environ.get('LOGIN_IP_PER_MINUTE', 10))
+    LOGIN_USERNAME_BURST = int(os.environ.get('LOGIN_USERNAME_BURST', 5))
+    LOGIN_USERNAME_PER_MINUTE = int(os.environ.get('LOGIN_USERNAME_PER_MINUTE', 3))
+    # Number of reverse proxies in front of the app that append to X-Forwarded-For;
+    # the client address (used by the per-IP throttle) is taken from that header.
+    # 0 = no proxy, the address is the one of the connection
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    # Password hashes are verified on LOGIN_HASH_WORKERS threads; logins beyond
+    # LOGIN_HASH_QUEUE waiting checks get 503
+    LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 2))
+    LOGIN_HASH_QUEUE = int(os.environ.get('LOGIN_HASH_QUEUE', 16))
+    
+    # Logged-out tokens (revoked_tokens table): each process checks a Bloom filter
+    # sized for REVOCATION_BLOOM_CAPACITY tokens, syncs it with the table every
+    # REVOCATION_SYNC_INTERVAL seconds and prunes expired entries every
+    # REVOCATION_PRUNE_INTERVAL seconds
+    REVOCATION_BLOOM_CAPACITY = int(os.environ.get('REVOCATION_BLOOM_CAPACITY', 100000))
+    REVOCATION_SYNC_INTERVAL = int(os.environ.get('REVOCATION_SYNC_INTERVAL', 5))
+    REVOCATION_PRUNE_INTERVAL = int(os.environ.get('REVOCATION_PRUNE_INTERVAL', 3600))
+    
+    # Authenticated users are cached per process for USER_CACHE_TTL seconds
+    # (0 = look up on every request); changes made through this process apply at once
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    # Take the role from the claims signed into the token at login instead of
+    # the database: no lookup per request, but role changes and deleted users
+    # only take effect when their tokens expire
+    JWT_TRUST_ROLE_CLAIM = os.environ.get('JWT_TRUST_ROLE_CLAIM', '').lower() in ('1', 'true', 'yes')
+    
+    # News feeds: public site URL (serving the API under /api) used for item and
+    # feed links, and number of items per feed. Feeds are built at startup and on
+    # news writes, never from the host of a request, so set SITE_URL in production
+    SITE_URL = os.environ.get('SITE_URL', 'http://localhost:5000')
+    FEED_SIZE = int(os.environ.get('FEED_SIZE', 20))
+    
+    # HTTP caching: max-age for public read endpoints (0 = always revalidate with ETag)
+    HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', 0))
+    # max-age of the docs page and the OpenAPI spec (fixed for the life of the process)
+    DOCS_CACHE_MAX_AGE = int(os.environ.get('DOCS_CACHE_MAX_AGE', 86400))
+    
+    # Response compression: text responses of at least COMPRESS_MIN_SIZE bytes
+    # are sent with gzip, or brotli when installed and accepted by the client
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))
+    COMPRESS_MIMETYPES = {
+        'application/json', 'application/feed+json', 'application/rss+xml',
+        'application/xml', 'text/xml', 'text/html', 'text/plain', 'text/csv'
+    }
+    
+    # Request, database and cache metrics at /metrics (Prometheus text format),
+    # off by default; scrapers must send METRICS_TOKEN as a Bearer token and
+    # every request is refused while no token is configured
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    
     # File upload config
+    # UPLOAD_FOLDER (relative to the working directory) holds temporary uploads
+    # and, with UPLOAD_STORAGE = 'local', the stored files themselves
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB max file size
     ALLOWED_EXTENSIONS_PDF = {'pdf'}
     ALLOWED_EXTENSIONS_IMAGE = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     
+    # Uploaded file delivery: '' streams from Python, 'x-accel' hands the transfer
+    # to nginx (X-Accel-Redirect to UPLOAD_ACCEL_PREFIX/<filename>, an internal
+    # location aliased to the upload folder), 'x-sendfile' to Apache/lighttpd
+    UPLOAD_SENDFILE = os.environ.get('UPLOAD_SENDFILE', '')
+    UPLOAD_ACCEL_PREFIX = os.environ.get('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
+    
+    # Upload storage backend: 'local' (UPLOAD_FOLDER) or 's3' (an S3-compatible
+    # bucket, needs boto3; S3_ENDPOINT_URL points at MinIO or another stand-in).
+    # Bucket downloads are redirected to presigned URLs valid UPLOAD_URL_EXPIRY
+    # seconds. UPLOAD_ASYNC_WRITES sends new files to the bucket on the worker
+    # pool; the receiving node serves them from UPLOAD_FOLDER meanwhile
+    UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET', '')
+    S3_PREFIX = os.environ.get('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+    UPLOAD_URL_EXPIRY = int(os.environ.get('UPLOAD_URL_EXPIRY', 3600))
+    UPLOAD_ASYNC_WRITES = os.environ.get('UPLOAD_ASYNC_WRITES', '').lower() in ('1', 'true', 'yes')
+    
+    # Image uploads: a full-size copy without metadata, at most IMAGE_MAX_DIMENSION
+    # pixels and re-encoded at IMAGE_QUALITY, is served instead of the original
+    # when it is smaller (made on the worker pool together with the resized copies)
+    IMAGE_OPTIMIZE = os.environ.get('IMAGE_OPTIMIZE', '').lower() in ('1', 'true', 'yes')
+    IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', 2560))
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 82))
+    
+    # Resumable uploads: idle sessions and their staging files expire after this many seconds
+    UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 60 * 60))
+    
+    # Upload garbage collection (flask gc-uploads) leaves files younger than this many seconds alone
+    UPLOAD_GC_MIN_AGE = int(os.environ.get('UPLOAD_GC_MIN_AGE', 24 * 60 * 60))
+    
+    # Background worker pool (PDF text extraction and other post-upload work)
+    BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', 2))
+    
     # CORS config - Allow all origins in development
     CORS_ORIGINS = '*'  # Allow all origins for development
     CORS_ALLOW_HEADERS = ['Content-Type', 'Authorization', 'Access-Control-Allow-Credentials']
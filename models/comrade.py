@@ -1,4 +1,6 @@
 from models import db
+from models.file import File
+from sqlalchemy.orm import validates
 from datetime import datetime
 import json
 
@@ -15,12 +17,18 @@ class Comrade(db.Model):
     year_of_service_to = db.Column(db.Integer)
     rank = db.Column(db.String(100))
     photo_url = db.Column(db.String(500))
+    photo_upload_name = db.Column(db.String(255), index=True)  # File.stored_name photo_url points to
     contact_info = db.Column(db.Text)  # JSON string with phone, email, address
     additional_info = db.Column(db.Text)
     is_verified = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @validates('photo_url')
+    def _set_photo_upload_name(self, key, url):
+        self.photo_upload_name = File.name_in_url(url)
+        return url
+    
     def get_contact_info(self):
         """Parse contact info from JSON string"""
         if self.contact_info:
@@ -52,6 +60,6 @@ class Comrade(db.Model):
             'contactInfo': self.get_contact_info(),
             'additionalInfo': self.additional_info,
             'isVerified': self.is_verified,
-            'createdAt': self.created_at.isoformat() + 'Z',
-            'updatedAt': self.updated_at.isoformat() + 'Z'
+            'createdAt': self.created_at,
+            'updatedAt': self.updated_at
         }
\ No newline at end of file
@@ -0,0 +1,12 @@
+from models import db
+from datetime import datetime
+
+class DocumentPage(db.Model):
+    """Text of one page of an uploaded PDF, extracted in the background for search"""
+    __tablename__ = 'document_pages'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.String(36), db.ForeignKey('files.id'), nullable=False, index=True)
+    page = db.Column(db.Integer, nullable=False)  # 1-based page number
+    text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
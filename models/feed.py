@@ -0,0 +1,12 @@
+from models import db
+from datetime import datetime
+
+class Feed(db.Model):
+    """Pre-rendered syndication feed, rebuilt whenever news change"""
+    __tablename__ = 'feeds'
+
+    name = db.Column(db.String(50), primary_key=True)  # e.g. news-ru.xml
+    content_type = db.Column(db.String(100), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    etag = db.Column(db.String(64), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
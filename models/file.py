@@ -1,27 +1,95 @@
 from models import db
 from datetime import datetime
+from urllib.parse import urlsplit, unquote
+import json
+import os
 import uuid
 
 class File(db.Model):
     __tablename__ = 'files'
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    filename = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)  # path in the upload directory, e.g. ab/cd/<sha256>.pdf
+    stored_name = db.Column(db.String(255), index=True)  # bare file name as it appears in URLs, e.g. <sha256>.pdf
     original_name = db.Column(db.String(255), nullable=False)
     url = db.Column(db.String(500), nullable=False)
     file_type = db.Column(db.String(20), nullable=False)  # pdf, image
     category = db.Column(db.String(50))  # law, news, photo, other
     size = db.Column(db.Integer, nullable=False)  # file size in bytes
+    sha256 = db.Column(db.String(64), index=True, unique=True)  # hex digest of the content
+    ref_count = db.Column(db.Integer, nullable=False, default=1)  # uploads sharing this blob
+    text_status = db.Column(db.String(20))  # PDF text extraction: pending, done, failed, unavailable
+    derivatives = db.Column(db.Text)  # JSON: resized image variants per size, see utils/images.py
+    optimized = db.Column(db.Text)  # JSON: re-encoded full-size image variant served instead of the original
+    optimized_size = db.Column(db.Integer)  # bytes of the smallest optimized copy (size when none is smaller)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every write (ref_count, text_status, derivatives, ...); used for the item ETag
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @staticmethod
+    def name_in_url(url):
+        """
+        Stored file name an upload URL points to (.../uploads/<name>), or None.
+        Relative URLs, other hosts and ?size= variants give the same name
+        """
+        if not url:
+            return None
+        path = urlsplit(url).path
+        if 'uploads/' not in path:
+            return None
+        return os.path.basename(unquote(path.rsplit('uploads/', 1)[1])) or None
+    
+    @classmethod
+    def is_referenced_by(cls, name_column):
+        """
+        SQL condition: a URL points to this file. name_column holds the name
+        taken from the URL when it was stored (Law.pdf_upload_name,
+        News.image_upload_name, Comrade.photo_upload_name); both sides are indexed
+        """
+        return cls.stored_name == name_column
+    
+    def get_derivatives(self):
+        """Parse image derivatives from JSON string: {size: {width, height, formats: {format: filename}}}"""
+        if self.derivatives:
+            try:
+                return json.loads(self.derivatives)
+            except (json.JSONDecodeError, TypeError):
+                return {}
+        return {}
+    
+    def set_derivatives(self, derivatives):
+        """Set image derivatives as JSON string"""
+        self.derivatives = json.dumps(derivatives)
+    
+    def get_optimized(self):
+        """Parse the optimized image variant from JSON string: {width, height, formats: {format: filename}}"""
+        if self.optimized:
+            try:
+                return json.loads(self.optimized)
+            except (json.JSONDecodeError, TypeError):
+                return None
+        return None
+    
+    def set_optimized(self, optimized):
+        """Set the optimized image variant as JSON string (None: serve the original)"""
+        self.optimized = json.dumps(optimized) if optimized else None
     
     def to_dict(self):
         return {
             'id': self.id,
-            'filename': self.filename,
+            'filename': os.path.basename(self.filename),
             'originalName': self.original_name,
             'url': self.url,
             'type': self.file_type,
             'category': self.category,
             'size': self.size,
-            'uploadedAt': self.uploaded_at.isoformat() + 'Z'
+            'optimizedSize': self.optimized_size,
+            'sha256': self.sha256,
+            'refCount': self.ref_count,
+            'textStatus': self.text_status,
+            'sizes': {
+                size: {'width': variant['width'], 'height': variant['height']}
+                for size, variant in self.get_derivatives().items()
+            },
+            'uploadedAt': self.uploaded_at
         }
\ No newline at end of file
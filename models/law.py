@@ -1,10 +1,16 @@
 from models import db
+from models.multilang import MultiLangMixin
+from models.file import File
+from sqlalchemy.orm import validates
 from datetime import datetime
 import json
 
-class Law(db.Model):
+class Law(MultiLangMixin, db.Model):
     __tablename__ = 'laws'
     
+    MULTILANG_FIELDS = ('title', 'description', 'category')
+    COMMON_FIELDS = ('id', 'category_id', 'date', 'pdf_url', 'created_at', 'updated_at')
+    
     id = db.Column(db.Integer, primary_key=True)
     title_ru = db.Column(db.Text, nullable=False)
     title_uz = db.Column(db.Text, nullable=False)
@@ -15,31 +21,39 @@ class Law(db.Model):
     category_ru = db.Column(db.String(255), nullable=False)
     category_uz = db.Column(db.String(255), nullable=False)
     category_en = db.Column(db.String(255), nullable=False)
+    # Normalized category; the category_* names above are kept in sync with it
+    category_id = db.Column(db.Integer, db.ForeignKey('law_categories.id'), index=True)
     date = db.Column(db.Date, nullable=False)
     pdf_url = db.Column(db.String(500))
+    pdf_upload_name = db.Column(db.String(255), index=True)  # File.stored_name pdf_url points to
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        return {
+    @validates('pdf_url')
+    def _set_pdf_upload_name(self, key, url):
+        self.pdf_upload_name = File.name_in_url(url)
+        return url
+    
+    def to_dict(self, lang=None):
+        """Serialize law; with lang set, text fields are flat strings in that language"""
+        data = {
             'id': self.id,
-            'title': {
-                'ru': self.title_ru,
-                'uz': self.title_uz,
-                'en': self.title_en
-            },
-            'description': {
-                'ru': self.description_ru,
-                'uz': self.description_uz,
-                'en': self.description_en
-            },
-            'category': {
-                'ru': self.category_ru,
-                'uz': self.category_uz,
-                'en': self.category_en
-            },
-            'date': self.date.isoformat() if self.date else None,
+            'title': self.multilang_value('title', lang),
+            'description': self.multilang_value('description', lang),
+            'category': self.multilang_value('category', lang),
+            'categoryId': self.category_id,
+            'date': self.date,
             'pdfUrl': self.pdf_url,
-            'createdAt': self.created_at.isoformat() + 'Z',
-            'updatedAt': self.updated_at.isoformat() + 'Z'
-        }
\ No newline at end of file
+            'createdAt': self.created_at,
+            'updatedAt': self.updated_at
+        }
+        if lang:
+            data['lang'] = lang
+        return data
+    
+    def set_category(self, category):
+        """Assign a LawCategory and copy its names onto the law"""
+        self.category_id = category.id
+        self.category_ru = category.name_ru
+        self.category_uz = category.name_uz
+        self.category_en = category.name_en
\ No newline at end of file
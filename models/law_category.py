@@ -0,0 +1,42 @@
+from models import db
+from models.multilang import MultiLangMixin
+from datetime import datetime
+
+class LawCategory(MultiLangMixin, db.Model):
+    __tablename__ = 'law_categories'
+    __table_args__ = (
+        db.UniqueConstraint('name_ru', 'name_uz', 'name_en', name='uq_law_categories_names'),
+    )
+
+    MULTILANG_FIELDS = ('name',)
+    COMMON_FIELDS = ('id', 'created_at', 'updated_at')
+
+    id = db.Column(db.Integer, primary_key=True)
+    name_ru = db.Column(db.String(255), nullable=False)
+    name_uz = db.Column(db.String(255), nullable=False)
+    name_en = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def get_or_create(cls, names):
+        """Find the category with the given {ru, uz, en} names or add a new one"""
+        category = cls.query.filter_by(
+            name_ru=names['ru'],
+            name_uz=names['uz'],
+            name_en=names['en']
+        ).first()
+        if not category:
+            category = cls(name_ru=names['ru'], name_uz=names['uz'], name_en=names['en'])
+            db.session.add(category)
+            db.session.flush()
+        return category
+
+    def to_dict(self, lang=None):
+        data = {
+            'id': self.id,
+            'name': self.multilang_value('name', lang)
+        }
+        if lang:
+            data['lang'] = lang
+        return data
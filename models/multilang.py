@@ -0,0 +1,29 @@
+from sqlalchemy.orm import load_only
+
+LANGUAGES = ('ru', 'uz', 'en')
+
+class MultiLangMixin:
+    """Helpers for models storing one column per language (title_ru, title_uz, ...)"""
+
+    # Multilingual field names, e.g. ('title', 'content')
+    MULTILANG_FIELDS = ()
+    # Language independent columns that are always loaded
+    COMMON_FIELDS = ()
+
+    @classmethod
+    def language_load_options(cls, lang=None, fields=None):
+        """
+        Query option loading the common columns plus the column group of the given
+        multilingual fields, for one language or for all languages when lang is None
+        """
+        fields = fields or cls.MULTILANG_FIELDS
+        languages = (lang,) if lang else LANGUAGES
+        common = [getattr(cls, field) for field in cls.COMMON_FIELDS]
+        columns = [getattr(cls, f'{field}_{code}') for field in fields for code in languages]
+        return load_only(*common, *columns)
+
+    def multilang_value(self, field, lang=None):
+        """Flat string for one language or the full {ru, uz, en} object"""
+        if lang:
+            return getattr(self, f'{field}_{lang}')
+        return {code: getattr(self, f'{field}_{code}') for code in LANGUAGES}
@@ -1,9 +1,17 @@
 from models import db
+from models.multilang import MultiLangMixin
+from models.file import File
+from sqlalchemy.orm import validates
 from datetime import datetime
 
-class News(db.Model):
+class News(MultiLangMixin, db.Model):
     __tablename__ = 'news'
     
+    MULTILANG_FIELDS = ('title', 'content', 'summary')
+    # Fields shown in listings; the full content is only loaded on request
+    SUMMARY_FIELDS = ('title', 'summary')
+    COMMON_FIELDS = ('id', 'date', 'image_url', 'created_at', 'updated_at')
+    
     id = db.Column(db.Integer, primary_key=True)
     title_ru = db.Column(db.Text, nullable=False)
     title_uz = db.Column(db.Text, nullable=False)
@@ -16,29 +24,28 @@ class News(db.Model):
     summary_en = db.Column(db.Text, nullable=False)
     date = db.Column(db.Date, nullable=False)
     image_url = db.Column(db.String(500))
+    image_upload_name = db.Column(db.String(255), index=True)  # File.stored_name image_url points to
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        return {
+    @validates('image_url')
+    def _set_image_upload_name(self, key, url):
+        self.image_upload_name = File.name_in_url(url)
+        return url
+    
+    def to_dict(self, lang=None, include_content=True):
+        """Serialize news; with lang set, text fields are flat strings in that language"""
+        data = {
             'id': self.id,
-            'title': {
-                'ru': self.title_ru,
-                'uz': self.title_uz,
-                'en': self.title_en
-            },
-            'content': {
-                'ru': self.content_ru,
-                'uz': self.content_uz,
-                'en': self.content_en
-            },
-            'summary': {
-                'ru': self.summary_ru,
-                'uz': self.summary_uz,
-                'en': self.summary_en
-            },
-            'date': self.date.isoformat() if self.date else None,
+            'title': self.multilang_value('title', lang),
+            'summary': self.multilang_value('summary', lang),
+            'date': self.date,
             'imageUrl': self.image_url,
-            'createdAt': self.created_at.isoformat() + 'Z',
-            'updatedAt': self.updated_at.isoformat() + 'Z'
-        }
\ No newline at end of file
+            'createdAt': self.created_at,
+            'updatedAt': self.updated_at
+        }
+        if include_content:
+            data['content'] = self.multilang_value('content', lang)
+        if lang:
+            data['lang'] = lang
+        return data
\ No newline at end of file
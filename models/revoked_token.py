@@ -0,0 +1,10 @@
+from models import db
+from datetime import datetime
+
+class RevokedToken(db.Model):
+    """Logged-out JWT, kept until the token would have expired anyway"""
+    __tablename__ = 'revoked_tokens'
+    
+    jti = db.Column(db.String(36), primary_key=True)  # JWT ID
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # the token's exp
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
\ No newline at end of file
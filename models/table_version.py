@@ -0,0 +1,61 @@
+from models import db
+from datetime import datetime
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped on every flush that writes to the table"""
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def get_versions(cls, table_names):
+        """Return {table_name: (version, updated_at)} for the given tables"""
+        rows = cls.query.filter(cls.table_name.in_(table_names)).all()
+        versions = {name: (0, None) for name in table_names}
+        versions.update({row.table_name: (row.version, row.updated_at) for row in rows})
+        return versions
+
+def _changed_tables(session):
+    tables = set()
+    for obj in session.new | session.deleted:
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            tables.add(obj.__table__.name)
+    tables.discard(TableVersion.__tablename__)
+    return tables
+
+def bump_versions(connection, table_names):
+    """Increment the version of the given tables on this connection's transaction"""
+    now = datetime.utcnow()
+    for table_name in sorted(table_names):
+        result = connection.execute(
+            text("UPDATE table_versions SET version = version + 1, updated_at = :now "
+                 "WHERE table_name = :table_name"),
+            {'now': now, 'table_name': table_name}
+        )
+        if result.rowcount == 0:
+            connection.execute(
+                text("INSERT INTO table_versions (table_name, version, updated_at) "
+                     "VALUES (:table_name, 1, :now)"),
+                {'now': now, 'table_name': table_name}
+            )
+
+@event.listens_for(Session, 'after_flush')
+def bump_table_versions(session, flush_context):
+    """Increment the version of every table written by this flush"""
+    tables = _changed_tables(session)
+    if tables:
+        bump_versions(session.connection(), tables)
+
+@event.listens_for(Session, 'do_orm_execute')
+def bump_bulk_table_versions(orm_execute_state):
+    """Bulk UPDATE and DELETE statements bypass the flush; count them too"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.local_table.name != TableVersion.__tablename__:
+            bump_versions(orm_execute_state.session.connection(), {mapper.local_table.name})
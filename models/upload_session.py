@@ -0,0 +1,29 @@
+from models import db
+from datetime import datetime
+import uuid
+
+class UploadSession(db.Model):
+    """Resumable upload in progress; chunks are appended to a staging file"""
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)  # original name
+    file_type = db.Column(db.String(20), nullable=False)  # pdf, image
+    category = db.Column(db.String(50))
+    size = db.Column(db.Integer, nullable=False)  # declared total size in bytes
+    offset = db.Column(db.Integer, nullable=False, default=0)  # bytes received so far
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'type': self.file_type,
+            'category': self.category,
+            'size': self.size,
+            'offset': self.offset,
+            'createdAt': self.created_at,
+            'expiresAt': self.expires_at
+        }
\ No newline at end of file
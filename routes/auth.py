@@ -1,18 +1,38 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from models import db
 from models.user import User
+from utils.auth import load_user
+from utils.revocation import revoke_token, is_token_revoked
+from utils.throttle import get_rate_limiter
+from utils.hashing import check_password, HashPoolBusy
+from utils.metrics import counter
 from datetime import datetime, timedelta
+import math
 
 auth_bp = Blueprint('auth', __name__)
 
-# Simple token blacklist (in production, use Redis or database)
-blacklisted_tokens = set()
+LOGIN_ATTEMPTS = counter('login_attempts', 'Login attempts by result', ['result'])
+
+def too_many_attempts(wait, scope):
+    """429 response for a throttled login, scope: ip or username"""
+    LOGIN_ATTEMPTS.inc(result=f'throttled_{scope}')
+    retry_after = math.ceil(wait)
+    return jsonify({
+        'error': 'Too Many Requests',
+        'message': f'Too many login attempts, try again in {retry_after} seconds',
+        'retryAfter': retry_after
+    }), 429, {'Retry-After': str(retry_after)}
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Authenticate user and return JWT token"""
     try:
+        # Throttle by client address before any work is done
+        wait = get_rate_limiter(current_app, 'LOGIN_IP').acquire(request.remote_addr)
+        if wait:
+            return too_many_attempts(wait, 'ip')
+        
         data = request.get_json()
         
         if not data:
@@ -30,15 +50,36 @@ def login():
                 'message': 'Username and password are required'
             }), 400
         
+        # Throttle guessing against one account from many addresses
+        wait = get_rate_limiter(current_app, 'LOGIN_USERNAME').acquire(str(username).casefold())
+        if wait:
+            return too_many_attempts(wait, 'username')
+        
         user = User.query.filter_by(username=username).first()
         
-        if not user or not user.check_password(password):
+        # The slow hash runs on the bounded password pool
+        try:
+            valid = user is not None and check_password(user.password_hash, password)
+        except HashPoolBusy:
+            LOGIN_ATTEMPTS.inc(result='busy')
+            return jsonify({
+                'error': 'Service Unavailable',
+                'message': 'Too many logins in progress, try again shortly'
+            }), 503, {'Retry-After': '1'}
+        
+        if not valid:
+            LOGIN_ATTEMPTS.inc(result='failure')
             return jsonify({
                 'error': 'Invalid credentials',
                 'message': 'Username or password is incorrect'
             }), 401
         
-        access_token = create_access_token(identity=user.id)
+        # Role and username are signed into the token for JWT_TRUST_ROLE_CLAIM
+        access_token = create_access_token(identity=user.id, additional_claims={
+            'role': user.role,
+            'username': user.username
+        })
+        LOGIN_ATTEMPTS.inc(result='success')
         
         return jsonify({
             'token': access_token,
@@ -57,8 +98,7 @@ def login():
 def logout():
     """Deactivate current JWT token"""
     try:
-        jti = get_jwt()['jti']  # JWT ID
-        blacklisted_tokens.add(jti)
+        revoke_token(get_jwt())
         return '', 204
     except Exception as e:
         return jsonify({
@@ -72,8 +112,7 @@ def logout():
 def verify():
     """Verify JWT token validity"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = load_user(get_jwt_identity())
         
         if not current_user:
             return jsonify({
@@ -95,6 +134,5 @@ def verify():
 
 # JWT token blacklist checker
 def check_if_token_revoked(jwt_header, jwt_payload):
-    """Check if token is in blacklist"""
-    jti = jwt_payload['jti']
-    return jti in blacklisted_tokens
\ No newline at end of file
+    """Check if token was revoked by a logout (in any worker process)"""
+    return is_token_revoked(jwt_payload)
\ No newline at end of file
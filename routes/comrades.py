@@ -4,6 +4,7 @@ from models.comrade import Comrade
 from utils.auth import token_required
 from utils.validators import validate_contact_info, validate_year_range
 from utils.excel_parser import ComradeExcelParser
+from utils.http_cache import list_validators, item_validators, not_modified, with_validators
 from datetime import datetime
 from sqlalchemy import or_, and_
 import os
@@ -24,6 +25,12 @@ def search_comrades():
         limit = int(request.args.get('limit', 50))
         offset = int(request.args.get('offset', 0))
         
+        # Answer conditional requests before running the query
+        etag, last_modified = list_validators(['comrades'])
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+        
         # Build query
         query = Comrade.query
         
@@ -81,12 +88,13 @@ def search_comrades():
         # Apply pagination and get results
         comrades = query.order_by(Comrade.last_name, Comrade.first_name).offset(offset).limit(limit).all()
         
-        return jsonify({
+        response = jsonify({
             'comrades': [comrade.to_dict() for comrade in comrades],
             'total': total,
             'limit': limit,
             'offset': offset
-        }), 200
+        })
+        return with_validators(response, etag, last_modified), 200
         
     except Exception as e:
         return jsonify({
@@ -184,15 +192,23 @@ def create_comrade():
 def get_comrade(comrade_id):
     """Get specific comrade by ID"""
     try:
-        comrade = Comrade.query.get(comrade_id)
+        # Check validators using only the timestamp before loading the row
+        row = db.session.query(Comrade.updated_at).filter(Comrade.id == comrade_id).first()
         
-        if not comrade:
+        if not row:
             return jsonify({
                 'error': 'Not Found',
                 'message': 'Comrade not found'
             }), 404
         
-        return jsonify(comrade.to_dict()), 200
+        etag, last_modified = item_validators('comrades', comrade_id, row.updated_at)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+        
+        comrade = Comrade.query.get(comrade_id)
+        
+        return with_validators(jsonify(comrade.to_dict()), etag, last_modified), 200
         
     except Exception as e:
         return jsonify({
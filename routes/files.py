@@ -1,101 +1,354 @@
-from flask import Blueprint, request, jsonify, url_for, send_from_directory
+from flask import Blueprint, request, jsonify, url_for, current_app
 from werkzeug.utils import secure_filename
 from models import db
 from models.file import File
+from models.upload_session import UploadSession
 from utils.auth import token_required
 from utils.validators import allowed_file
-from datetime import datetime
+from utils.uploads import (stream_upload, StreamedUpload, UploadTooLarge, staging_path, append_chunk,
+                           hash_file, remove_upload_session, remove_expired_upload_sessions)
+from utils.pdf_text import queue_text_extraction, remove_document_text
+from utils.images import (DERIVATIVE_SIZES, queue_image_derivatives, remove_image_derivatives, pick_derivative,
+                          pick_optimized)
+from utils.static_files import send_upload
+from utils.storage import shard_path, get_storage, upload_folder
+from utils.http_cache import list_validators, item_validators, not_modified, with_validators
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
 import os
 import uuid
 
 files_bp = Blueprint('files', __name__)
 
+# Allowed extensions and maximum size per upload type
+UPLOAD_TYPES = {
+    'pdf': ({'pdf'}, 10 * 1024 * 1024),  # 10MB
+    'image': ({'png', 'jpg', 'jpeg', 'gif', 'webp'}, 5 * 1024 * 1024)  # 5MB
+}
+
+def add_file_reference(file_record, upload):
+    """
+    Record one more upload of an already stored blob. A blob that went missing
+    is stored again from this upload (and an image's derivatives rebuilt)
+    
+    Returns:
+        False if the record was deleted meanwhile (the upload is then new content)
+    """
+    # Conditional increment: a concurrent delete of the last reference wins or loses as a whole
+    added = File.query.filter(File.id == file_record.id) \
+        .update({File.ref_count: File.ref_count + 1}, synchronize_session=False)
+    if not added:
+        db.session.rollback()
+        return False
+    
+    storage = get_storage()
+    if upload.path and not storage.exists(file_record.filename):
+        upload.save(storage, os.path.basename(file_record.filename))
+        if file_record.file_type == 'image':
+            queue_image_derivatives(file_record.id)
+    
+    db.session.commit()
+    return True
+
+def upload_errors(filename, file_type, size):
+    """Error response for an upload of the wrong type, format or size, or None"""
+    # Validate file type parameter
+    if file_type not in UPLOAD_TYPES:
+        return jsonify({
+            'error': 'Invalid file type',
+            'message': 'Type must be either "pdf" or "image"'
+        }), 400
+    
+    # Get allowed extensions based on file type
+    allowed_extensions, max_size = UPLOAD_TYPES[file_type]
+    
+    # Check file extension
+    if not allowed_file(filename, allowed_extensions):
+        return jsonify({
+            'error': 'Invalid file format',
+            'message': f'Allowed formats for {file_type}: {", ".join(allowed_extensions)}'
+        }), 400
+    
+    # Check file size
+    if size > max_size:
+        return jsonify({
+            'error': 'File size too large',
+            'message': f'Maximum file size for {file_type}: {max_size // (1024*1024)}MB'
+        }), 400
+    
+    return None
+
+def store_upload(upload, file_type, category):
+    """
+    Store a received StreamedUpload under its content hash and return its File
+    record; a blob that is already stored gets one more reference instead, and
+    the record keeps the metadata (original name, type, category) of its first upload
+    """
+    # Content already stored: count one more reference instead of a new copy
+    file_record = File.query.filter_by(sha256=upload.sha256).first()
+    if file_record and add_file_reference(file_record, upload):
+        return file_record
+    
+    # Blobs are named by content hash, so identical uploads share one file
+    original_filename = secure_filename(upload.filename)
+    file_extension = original_filename.rsplit('.', 1)[1].lower()
+    new_filename = f"{upload.sha256}.{file_extension}"
+    
+    # Hand the file over to the storage backend; a blob left under this name
+    # without a record may be about to be deleted, so it is always replaced
+    upload.save(get_storage(), new_filename)
+    
+    # Generate URL (in production, use proper domain)
+    file_url = url_for('files.get_uploaded_file', filename=new_filename, _external=True)
+    
+    # Create file record in database
+    file_record = File(
+        filename=shard_path(new_filename),
+        stored_name=new_filename,
+        original_name=original_filename,
+        url=file_url,
+        file_type=file_type,
+        category=category,
+        size=upload.size,
+        sha256=upload.sha256,
+        text_status='pending' if file_type == 'pdf' else None
+    )
+    
+    try:
+        db.session.add(file_record)
+        db.session.commit()
+    except IntegrityError:
+        # The same content was stored by a concurrent upload
+        db.session.rollback()
+        return store_upload(upload, file_type, category)
+    
+    # Extract PDF text for search / resize images in the background
+    if file_type == 'pdf':
+        queue_text_extraction(file_record.id)
+    else:
+        queue_image_derivatives(file_record.id)
+    
+    return file_record
+
 @files_bp.route('/upload', methods=['POST'])
 @token_required
 def upload_file(current_user):
     """Upload file (PDF or image)"""
+    upload = None
     try:
+        # Create upload directory if it doesn't exist
+        upload_dir = upload_folder()
+        os.makedirs(upload_dir, exist_ok=True)
+        
+        # Stream the body to disk, hashing it and enforcing the size limit on the way
+        size_limits = {name: max_size for name, (_, max_size) in UPLOAD_TYPES.items()}
+        try:
+            fields, upload = stream_upload(request, upload_dir, size_limits)
+        except UploadTooLarge as e:
+            limit = f'{e.max_size // (1024*1024)}MB'
+            return jsonify({
+                'error': 'File size too large',
+                'message': f'Maximum file size for {e.file_type}: {limit}' if e.file_type
+                           else f'Maximum file size: {limit}'
+            }), 400
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': str(e)
+            }), 400
+        
         # Check if file is present
-        if 'file' not in request.files:
+        if upload is None:
             return jsonify({
                 'error': 'No file provided',
                 'message': 'File field is required'
             }), 400
         
-        file = request.files['file']
-        file_type = request.form.get('type')
-        category = request.form.get('category', 'other')
+        file_type = fields.get('type')
+        category = fields.get('category', 'other')
         
         # Check if file is selected
-        if file.filename == '':
+        if upload.filename == '':
             return jsonify({
                 'error': 'No file selected',
                 'message': 'Please select a file'
             }), 400
         
-        # Validate file type parameter
-        if file_type not in ['pdf', 'image']:
+        errors = upload_errors(upload.filename, file_type, upload.size)
+        if errors:
+            return errors
+        
+        file_record = store_upload(upload, file_type, category)
+        return jsonify(file_record.to_dict()), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': str(e),
+            'timestamp': datetime.utcnow().isoformat() + 'Z'
+        }), 500
+    
+    finally:
+        # Remove the temporary file of rejected or failed uploads
+        if upload is not None:
+            upload.discard()
+
+def get_upload_session(session_id, current_user):
+    """Active upload session of the user, or None"""
+    upload_session = UploadSession.query.get(session_id)
+    if (not upload_session or upload_session.user_id != current_user.id
+            or upload_session.expires_at < datetime.utcnow()):
+        return None
+    return upload_session
+
+def session_not_found():
+    return jsonify({
+        'error': 'Not Found',
+        'message': 'Upload session not found or expired'
+    }), 404
+
+@files_bp.route('/sessions', methods=['POST'])
+@token_required
+def create_upload_session(current_user):
+    """Start a resumable upload"""
+    try:
+        data = request.get_json()
+        
+        if not data:
             return jsonify({
-                'error': 'Invalid file type',
-                'message': 'Type must be either "pdf" or "image"'
+                'error': 'Invalid request',
+                'message': 'Request body must be JSON'
             }), 400
         
-        # Get allowed extensions based on file type
-        if file_type == 'pdf':
-            allowed_extensions = {'pdf'}
-            max_size = 10 * 1024 * 1024  # 10MB
-        else:  # image
-            allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-            max_size = 5 * 1024 * 1024  # 5MB
+        filename = data.get('filename')
+        if not filename:
+            return jsonify({
+                'error': 'No file selected',
+                'message': 'filename is required'
+            }), 400
         
-        # Check file extension
-        if not allowed_file(file.filename, allowed_extensions):
+        size = data.get('size')
+        if not isinstance(size, int) or size <= 0:
             return jsonify({
-                'error': 'Invalid file format',
-                'message': f'Allowed formats for {file_type}: {", ".join(allowed_extensions)}'
+                'error': 'Invalid size',
+                'message': 'size must be a positive number of bytes'
             }), 400
         
-        # Check file size
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
+        file_type = data.get('type')
+        errors = upload_errors(filename, file_type, size)
+        if errors:
+            return errors
+        
+        upload_dir = upload_folder()
+        remove_expired_upload_sessions(upload_dir)
+        
+        upload_session = UploadSession(
+            user_id=current_user.id,
+            filename=filename,
+            file_type=file_type,
+            category=data.get('category', 'other'),
+            size=size,
+            expires_at=datetime.utcnow() + timedelta(seconds=current_app.config['UPLOAD_SESSION_TTL'])
+        )
+        db.session.add(upload_session)
+        db.session.commit()
+        
+        return jsonify(upload_session.to_dict()), 201
         
-        if file_size > max_size:
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': str(e),
+            'timestamp': datetime.utcnow().isoformat() + 'Z'
+        }), 500
+
+@files_bp.route('/sessions/<session_id>', methods=['GET'])
+@token_required
+def get_upload_session_status(current_user, session_id):
+    """Current offset of a resumable upload, to resume after a failure"""
+    upload_session = get_upload_session(session_id, current_user)
+    if not upload_session:
+        return session_not_found()
+    return jsonify(upload_session.to_dict()), 200
+
+@files_bp.route('/sessions/<session_id>', methods=['PUT'])
+@token_required
+def upload_session_chunk(current_user, session_id):
+    """Append a chunk (raw request body) at ?offset= to a resumable upload"""
+    try:
+        upload_session = get_upload_session(session_id, current_user)
+        if not upload_session:
+            return session_not_found()
+        
+        try:
+            offset = int(request.args.get('offset', ''))
+        except ValueError:
+            return jsonify({
+                'error': 'Invalid offset',
+                'message': 'offset query parameter is required'
+            }), 400
+        
+        # Chunks must continue exactly where the stored data ends
+        if offset != upload_session.offset:
+            return jsonify({
+                'error': 'Offset mismatch',
+                'message': f'Upload continues at offset {upload_session.offset}',
+                'offset': upload_session.offset
+            }), 409
+        
+        upload_dir = upload_folder()
+        try:
+            upload_session.offset = append_chunk(request.stream, staging_path(upload_dir, upload_session.id),
+                                                 offset, upload_session.size)
+        except UploadTooLarge:
             return jsonify({
                 'error': 'File size too large',
-                'message': f'Maximum file size for {file_type}: {max_size // (1024*1024)}MB'
+                'message': f'Chunk goes past the declared size of {upload_session.size} bytes'
             }), 400
         
-        # Generate unique filename
-        original_filename = secure_filename(file.filename)
-        file_extension = original_filename.rsplit('.', 1)[1].lower()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        new_filename = f"{original_filename.rsplit('.', 1)[0]}_{timestamp}.{file_extension}"
+        upload_session.expires_at = datetime.utcnow() + timedelta(seconds=current_app.config['UPLOAD_SESSION_TTL'])
+        db.session.commit()
         
-        # Create upload directory if it doesn't exist
-        upload_dir = os.path.join(os.getcwd(), 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
+        return jsonify(upload_session.to_dict()), 200
         
-        # Save file
-        file_path = os.path.join(upload_dir, new_filename)
-        file.save(file_path)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': str(e),
+            'timestamp': datetime.utcnow().isoformat() + 'Z'
+        }), 500
+
+@files_bp.route('/sessions/<session_id>/complete', methods=['POST'])
+@token_required
+def complete_upload_session(current_user, session_id):
+    """Finish a resumable upload and create the file"""
+    upload = None
+    try:
+        upload_session = get_upload_session(session_id, current_user)
+        if not upload_session:
+            return session_not_found()
         
-        # Generate URL (in production, use proper domain)
-        file_url = url_for('files.get_uploaded_file', filename=new_filename, _external=True)
+        if upload_session.offset != upload_session.size:
+            return jsonify({
+                'error': 'Upload incomplete',
+                'message': f'Received {upload_session.offset} of {upload_session.size} bytes',
+                'offset': upload_session.offset
+            }), 409
         
-        # Create file record in database
-        file_record = File(
-            filename=new_filename,
-            original_name=original_filename,
-            url=file_url,
-            file_type=file_type,
-            category=category,
-            size=file_size
-        )
+        upload_dir = upload_folder()
+        path = staging_path(upload_dir, upload_session.id)
+        upload = StreamedUpload(upload_session.filename, path, upload_session.size, hash_file(path))
+        file_type, category = upload_session.file_type, upload_session.category
         
-        db.session.add(file_record)
+        # The staging file now belongs to the upload, which removes it on failure
+        db.session.delete(upload_session)
         db.session.commit()
         
+        file_record = store_upload(upload, file_type, category)
+        
         return jsonify(file_record.to_dict()), 201
         
     except Exception as e:
@@ -105,6 +358,32 @@ def upload_file(current_user):
             'message': str(e),
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         }), 500
+    
+    finally:
+        if upload is not None:
+            upload.discard()
+
+@files_bp.route('/sessions/<session_id>', methods=['DELETE'])
+@token_required
+def cancel_upload_session(current_user, session_id):
+    """Abort a resumable upload"""
+    try:
+        upload_session = get_upload_session(session_id, current_user)
+        if not upload_session:
+            return session_not_found()
+        
+        remove_upload_session(upload_session, upload_folder())
+        db.session.commit()
+        
+        return '', 204
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': str(e),
+            'timestamp': datetime.utcnow().isoformat() + 'Z'
+        }), 500
 
 @files_bp.route('/<file_id>', methods=['GET'])
 def get_file_metadata(file_id):
@@ -118,7 +397,12 @@ def get_file_metadata(file_id):
                 'message': 'File not found'
             }), 404
         
-        return jsonify(file_record.to_dict()), 200
+        etag, last_modified = item_validators('files', file_id, file_record.updated_at or file_record.uploaded_at)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+        
+        return with_validators(jsonify(file_record.to_dict()), etag, last_modified), 200
         
     except Exception as e:
         return jsonify({
@@ -140,13 +424,36 @@ def delete_file(current_user, file_id):
                 'message': 'File not found'
             }), 404
         
-        # Delete physical file
-        file_path = os.path.join(os.getcwd(), 'uploads', file_record.filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # Conditional statements, so a concurrent upload of the same content
+        # either adds its reference first or finds the record gone
+        while True:
+            # Other uploads still reference the blob: only drop this reference
+            dropped = File.query.filter(File.id == file_id, File.ref_count > 1) \
+                .update({File.ref_count: File.ref_count - 1}, synchronize_session=False)
+            if dropped:
+                db.session.commit()
+                return '', 204
+            
+            # Delete database record and extracted text
+            remove_document_text(file_id)
+            deleted = File.query.filter(File.id == file_id, File.ref_count <= 1) \
+                .delete(synchronize_session=False)
+            if deleted:
+                break
+            
+            # Referenced again in between: retry, or gone altogether
+            db.session.rollback()
+            file_record = File.query.get(file_id)
+            if not file_record:
+                return jsonify({
+                    'error': 'Not Found',
+                    'message': 'File not found'
+                }), 404
         
-        # Delete database record
-        db.session.delete(file_record)
+        # Delete the physical files before committing: the uncommitted delete
+        # holds back uploads of the same content until they are gone
+        get_storage().delete(file_record.filename)
+        remove_image_derivatives(file_record)
         db.session.commit()
         
         return '', 204
@@ -170,6 +477,12 @@ def get_files(current_user):
         limit = int(request.args.get('limit', 50))
         offset = int(request.args.get('offset', 0))
         
+        # Answer conditional requests before running the query
+        etag, last_modified = list_validators(['files'])
+        cached = not_modified(etag, last_modified, private=True)
+        if cached:
+            return cached
+        
         # Build query
         query = File.query
         
@@ -192,12 +505,13 @@ def get_files(current_user):
         # Apply pagination and get results
         files = query.order_by(File.uploaded_at.desc()).offset(offset).limit(limit).all()
         
-        return jsonify({
+        response = jsonify({
             'files': [file.to_dict() for file in files],
             'total': total,
             'limit': limit,
             'offset': offset
-        }), 200
+        })
+        return with_validators(response, etag, last_modified, private=True), 200
         
     except Exception as e:
         return jsonify({
@@ -206,8 +520,47 @@ def get_files(current_user):
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         }), 500
 
+def send_optimized_image(filename):
+    """Serve the optimized copy of an image in place of the uploaded file"""
+    file_record = File.query.filter(File.filename.in_([shard_path(filename), filename])).first()
+    if not file_record:
+        return send_upload(filename)
+    
+    # Not processed yet: the original stands in without long-lived caching
+    if file_record.derivatives is None:
+        return send_upload(filename, cacheable=False)
+    
+    optimized = pick_optimized(file_record, request.accept_mimetypes)
+    if optimized:
+        optimized_name, mimetype = optimized
+        response = send_upload(optimized_name, mimetype=mimetype)
+    else:
+        response = send_upload(filename)
+    response.vary.add('Accept')
+    return response
+
 @files_bp.route('/uploads/<filename>')
 def get_uploaded_file(filename):
-    """Serve uploaded files"""
-    upload_dir = os.path.join(os.getcwd(), 'uploads')
-    return send_from_directory(upload_dir, filename)
\ No newline at end of file
+    """Serve uploaded files; images also as ?size=thumb|md|lg in WebP or JPEG"""
+    size = request.args.get('size')
+    if not size:
+        if current_app.config['IMAGE_OPTIMIZE'] and allowed_file(filename, UPLOAD_TYPES['image'][0]):
+            return send_optimized_image(filename)
+        return send_upload(filename)
+    
+    if size not in DERIVATIVE_SIZES:
+        return jsonify({
+            'error': 'Invalid size',
+            'message': f'Size must be one of: {", ".join(DERIVATIVE_SIZES)}'
+        }), 400
+    
+    # Fall back to the original until the derivatives have been generated
+    file_record = File.query.filter(File.filename.in_([shard_path(filename), filename])).first()
+    derivative = pick_derivative(file_record, size, request.accept_mimetypes) if file_record else None
+    if not derivative:
+        return send_upload(filename, cacheable=False)
+    
+    derivative_name, mimetype = derivative
+    response = send_upload(derivative_name, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
\ No newline at end of file
@@ -1,38 +1,151 @@
 from flask import Blueprint, request, jsonify
 from models import db
 from models.law import Law
+from models.law_category import LawCategory
+from models.file import File
+from models.document_page import DocumentPage
 from utils.auth import token_required, admin_required
 from utils.validators import validate_multilang_field, validate_date_field
+from utils.i18n import resolve_language, vary_on_language
+from utils.http_cache import list_validators, item_validators, not_modified, with_validators
+from utils.search import LAWS_INDEX, law_hits, document_page_hits, fts_enabled
+from utils.laws_snapshot import get_laws_snapshot, refresh_laws_snapshot
+from utils.compression import PrecompressedBody
+from utils.metrics import CACHE_REQUESTS
 from datetime import datetime
-from sqlalchemy import or_
+from sqlalchemy import or_, asc, desc, func
 
 laws_bp = Blueprint('laws', __name__)
 
+# Category lists, serialized and compressed, keyed by their ETag (laws/categories version + query)
+_categories_cache = {}
+
+# Snapshot list pages and single laws, serialized and compressed, keyed by the
+# snapshot version and the response's ETag
+_snapshot_bodies = {}
+
+def snapshot_body(snapshot, etag, build):
+    """Compressed JSON body of a snapshot read, built from build() on first use"""
+    key = (snapshot.version, etag)
+    body = _snapshot_bodies.get(key)
+    CACHE_REQUESTS.inc(cache='laws_responses', result='miss' if body is None else 'hit')
+    if body is None:
+        body = PrecompressedBody(jsonify(build()).get_data(), 'application/json')
+        if len(_snapshot_bodies) >= 256:
+            _snapshot_bodies.clear()
+        _snapshot_bodies[key] = body
+    return body
+
+def validate_category(data):
+    """Validate the law category given as categoryId or as a multilingual object"""
+    if data.get('categoryId') is None:
+        return validate_multilang_field(data, 'category')
+    
+    try:
+        category = LawCategory.query.get(int(data['categoryId']))
+    except (ValueError, TypeError):
+        category = None
+    
+    if not category:
+        return {'categoryId': 'Category not found'}
+    return {}
+
+def resolve_category(data):
+    """Category referenced by a validated request body, created when new"""
+    if data.get('categoryId') is not None:
+        return LawCategory.query.get(int(data['categoryId']))
+    return LawCategory.get_or_create(data['category'])
+
 @laws_bp.route('', methods=['GET'])
 def get_laws():
     """Get all laws with optional filtering"""
     try:
         # Get query parameters
         category = request.args.get('category')
+        category_id = request.args.get('categoryId')
         search = request.args.get('search')
+        sort_by = request.args.get('sortBy', 'date')
         limit = int(request.args.get('limit', 50))
         offset = int(request.args.get('offset', 0))
         
+        try:
+            lang = resolve_language()
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid lang',
+                'message': str(e)
+            }), 400
+        
+        # Answer conditional requests before running the query; extracted PDF
+        # text changes search results, so its version is part of the ETag
+        etag, last_modified = list_validators(['laws', 'document_pages'])
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return vary_on_language(cached)
+        
+        if category_id:
+            try:
+                category_id = int(category_id)
+            except ValueError:
+                return jsonify({
+                    'error': 'Invalid categoryId',
+                    'message': 'categoryId must be a number'
+                }), 400
+        else:
+            category_id = None
+        
+        # Plain listing and category filters are answered from the in-memory snapshot
+        if not search:
+            snapshot = get_laws_snapshot()
+            
+            def build():
+                ids = snapshot.filter(category_id, category)
+                return {
+                    'laws': [snapshot.item(law_id, lang) for law_id in ids[offset:offset + limit]],
+                    'total': len(ids),
+                    'limit': limit,
+                    'offset': offset
+                }
+            
+            body = snapshot_body(snapshot, etag, build)
+            return with_validators(vary_on_language(body.make_response()), etag, last_modified), 200
+        
         # Build query
         query = Law.query
         
-        # Apply category filter
+        # Load only the requested language columns
+        if lang:
+            query = query.options(Law.language_load_options(lang))
+        
+        # Apply category filters through the indexed category_id
+        if category_id is not None:
+            query = query.filter(Law.category_id == category_id)
+        
         if category:
-            query = query.filter(
+            # Match the name in the small categories table, not on every law
+            matching_ids = db.session.query(LawCategory.id).filter(
                 or_(
-                    Law.category_ru.ilike(f'%{category}%'),
-                    Law.category_uz.ilike(f'%{category}%'),
-                    Law.category_en.ilike(f'%{category}%')
+                    LawCategory.name_ru.ilike(f'%{category}%'),
+                    LawCategory.name_uz.ilike(f'%{category}%'),
+                    LawCategory.name_en.ilike(f'%{category}%')
                 )
             )
+            query = query.filter(Law.category_id.in_(matching_ids))
         
-        # Apply search filter
-        if search:
+        # Apply search filter over title, description and the text of the law's
+        # PDF: ranked full-text search when FTS5 is available, ILIKE otherwise
+        hits = None
+        if fts_enabled(db.session.connection()):
+            hits = law_hits(search)
+        if hits is not None:
+            query = query.join(hits, Law.id == hits.c.id)
+        else:
+            # Same law-to-PDF link as the full-text search
+            document_match = db.session.query(DocumentPage.id) \
+                .join(File, File.id == DocumentPage.file_id) \
+                .filter(File.is_referenced_by(Law.pdf_upload_name),
+                        DocumentPage.text.ilike(f'%{search}%')) \
+                .exists()
             query = query.filter(
                 or_(
                     Law.title_ru.ilike(f'%{search}%'),
@@ -40,22 +153,92 @@ def get_laws():
                     Law.title_en.ilike(f'%{search}%'),
                     Law.description_ru.ilike(f'%{search}%'),
                     Law.description_uz.ilike(f'%{search}%'),
-                    Law.description_en.ilike(f'%{search}%')
+                    Law.description_en.ilike(f'%{search}%'),
+                    document_match
                 )
             )
         
+        # Apply sorting
+        if sort_by == 'relevance' and hits is not None:
+            query = query.order_by(asc(hits.c.rank), desc(Law.date))
+        else:
+            query = query.order_by(desc(Law.date))
+        
         # Get total count
         total = query.count()
         
         # Apply pagination and get results
-        laws = query.order_by(Law.date.desc()).offset(offset).limit(limit).all()
+        rows = query.offset(offset).limit(limit).all()
         
-        return jsonify({
-            'laws': [law.to_dict() for law in laws],
+        laws = [law.to_dict(lang) for law in rows]
+        
+        # Highlight search matches for the returned page only
+        if hits is not None:
+            law_ids = [law.id for law in rows]
+            snippets = LAWS_INDEX.highlights(db.session, law_ids, search, lang)
+            page_hits = document_page_hits(db.session, law_ids, search)
+            for item in laws:
+                item['highlight'] = snippets.get(item['id'])
+                item['documentHits'] = page_hits.get(item['id'], [])
+        
+        response = jsonify({
+            'laws': laws,
             'total': total,
             'limit': limit,
             'offset': offset
-        }), 200
+        })
+        return with_validators(vary_on_language(response), etag, last_modified), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': str(e),
+            'timestamp': datetime.utcnow().isoformat() + 'Z'
+        }), 500
+
+@laws_bp.route('/categories', methods=['GET'])
+def get_law_categories():
+    """Get law categories with the number of laws in each"""
+    try:
+        try:
+            lang = resolve_language()
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid lang',
+                'message': str(e)
+            }), 400
+        
+        etag, last_modified = list_validators(['laws', 'law_categories'])
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return vary_on_language(cached)
+        
+        body = _categories_cache.get(etag)
+        CACHE_REQUESTS.inc(cache='law_categories', result='miss' if body is None else 'hit')
+        if body is None:
+            name_column = getattr(LawCategory, f'name_{lang or "ru"}')
+            rows = db.session.query(LawCategory, func.count(Law.id)) \
+                .outerjoin(Law, Law.category_id == LawCategory.id) \
+                .group_by(LawCategory.id) \
+                .order_by(name_column) \
+                .all()
+            
+            categories = []
+            for category, law_count in rows:
+                item = category.to_dict(lang)
+                item['lawCount'] = law_count
+                categories.append(item)
+            
+            data = {
+                'categories': categories,
+                'total': len(categories)
+            }
+            body = PrecompressedBody(jsonify(data).get_data(), 'application/json')
+            if len(_categories_cache) >= 64:
+                _categories_cache.clear()
+            _categories_cache[etag] = body
+        
+        return with_validators(vary_on_language(body.make_response()), etag, last_modified), 200
         
     except Exception as e:
         return jsonify({
@@ -68,15 +251,30 @@ def get_laws():
 def get_law(law_id):
     """Get specific law by ID"""
     try:
-        law = Law.query.get(law_id)
+        try:
+            lang = resolve_language()
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid lang',
+                'message': str(e)
+            }), 400
         
-        if not law:
+        snapshot = get_laws_snapshot()
+        data = snapshot.item(law_id, lang)
+        
+        if not data:
             return jsonify({
                 'error': 'Not Found',
                 'message': 'Law not found'
             }), 404
         
-        return jsonify(law.to_dict()), 200
+        etag, last_modified = item_validators('laws', law_id, snapshot.updated_at[law_id])
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return vary_on_language(cached)
+        
+        body = snapshot_body(snapshot, etag, lambda: data)
+        return with_validators(vary_on_language(body.make_response()), etag, last_modified), 200
         
     except Exception as e:
         return jsonify({
@@ -102,7 +300,7 @@ def create_law(current_user):
         errors = {}
         errors.update(validate_multilang_field(data, 'title'))
         errors.update(validate_multilang_field(data, 'description'))
-        errors.update(validate_multilang_field(data, 'category'))
+        errors.update(validate_category(data))
         errors.update(validate_date_field(data, 'date'))
         
         if errors:
@@ -121,15 +319,14 @@ def create_law(current_user):
             description_ru=data['description']['ru'],
             description_uz=data['description']['uz'],
             description_en=data['description']['en'],
-            category_ru=data['category']['ru'],
-            category_uz=data['category']['uz'],
-            category_en=data['category']['en'],
             date=datetime.strptime(data['date'], '%Y-%m-%d').date(),
             pdf_url=data.get('pdfUrl')
         )
+        law.set_category(resolve_category(data))
         
         db.session.add(law)
         db.session.commit()
+        refresh_laws_snapshot()
         
         return jsonify(law.to_dict()), 201
         
@@ -166,7 +363,7 @@ def update_law(current_user, law_id):
         errors = {}
         errors.update(validate_multilang_field(data, 'title'))
         errors.update(validate_multilang_field(data, 'description'))
-        errors.update(validate_multilang_field(data, 'category'))
+        errors.update(validate_category(data))
         errors.update(validate_date_field(data, 'date'))
         
         if errors:
@@ -184,14 +381,13 @@ def update_law(current_user, law_id):
         law.description_ru = data['description']['ru']
         law.description_uz = data['description']['uz']
         law.description_en = data['description']['en']
-        law.category_ru = data['category']['ru']
-        law.category_uz = data['category']['uz']
-        law.category_en = data['category']['en']
+        law.set_category(resolve_category(data))
         law.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
         law.pdf_url = data.get('pdfUrl')
         law.updated_at = datetime.utcnow()
         
         db.session.commit()
+        refresh_laws_snapshot()
         
         return jsonify(law.to_dict()), 200
         
@@ -218,6 +414,7 @@ def delete_law(current_user, law_id):
         
         db.session.delete(law)
         db.session.commit()
+        refresh_laws_snapshot()
         
         return '', 204
         
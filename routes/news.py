@@ -1,13 +1,26 @@
 from flask import Blueprint, request, jsonify
 from models import db
 from models.news import News
+from models.feed import Feed
 from utils.auth import token_required
 from utils.validators import validate_multilang_field, validate_date_field
+from utils.i18n import resolve_language, vary_on_language
+from utils.http_cache import list_validators, item_validators, not_modified, with_validators
+from utils.search import NEWS_INDEX, fts_enabled
+from utils.feeds import rebuild_news_feeds, feed_name
+from utils.compression import PrecompressedBody
+from utils.metrics import CACHE_REQUESTS
 from datetime import datetime
 from sqlalchemy import or_, desc, asc
 
 news_bp = Blueprint('news', __name__)
 
+# Feed bodies, compressed once, keyed by the feed's ETag
+_feed_bodies = {}
+
+# News list pages, serialized and compressed, keyed by their ETag (news version + query)
+_list_bodies = {}
+
 @news_bp.route('', methods=['GET'])
 def get_news():
     """Get all news with optional filtering and sorting"""
@@ -20,22 +33,56 @@ def get_news():
         offset = int(request.args.get('offset', 0))
         sort_by = request.args.get('sortBy', 'date')
         sort_order = request.args.get('sortOrder', 'desc')
+        include = request.args.get('include', '')
+        include_content = 'content' in include.split(',')
+        
+        try:
+            lang = resolve_language()
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid lang',
+                'message': str(e)
+            }), 400
+        
+        # Answer conditional requests before running the query
+        etag, last_modified = list_validators(['news'])
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return vary_on_language(cached)
+        
+        body = _list_bodies.get(etag)
+        CACHE_REQUESTS.inc(cache='news_lists', result='miss' if body is None else 'hit')
+        if body is not None:
+            return with_validators(vary_on_language(body.make_response()), etag, last_modified), 200
         
         # Build query
         query = News.query
         
-        # Apply search filter
+        # Load only the requested language columns; content is deferred
+        # unless explicitly requested with include=content
+        fields = News.MULTILANG_FIELDS if include_content else News.SUMMARY_FIELDS
+        if lang or not include_content:
+            query = query.options(News.language_load_options(lang, fields))
+        
+        # Apply search filter: ranked full-text search when FTS5 is available,
+        # plain ILIKE matching otherwise
+        hits = None
         if search:
-            query = query.filter(
-                or_(
-                    News.title_ru.ilike(f'%{search}%'),
-                    News.title_uz.ilike(f'%{search}%'),
-                    News.title_en.ilike(f'%{search}%'),
-                    News.content_ru.ilike(f'%{search}%'),
-                    News.content_uz.ilike(f'%{search}%'),
-                    News.content_en.ilike(f'%{search}%')
+            match_query = NEWS_INDEX.match_query(search)
+            if match_query and fts_enabled(db.session.connection()):
+                hits = NEWS_INDEX.hits(match_query)
+                query = query.join(hits, News.id == hits.c.id)
+            else:
+                query = query.filter(
+                    or_(
+                        News.title_ru.ilike(f'%{search}%'),
+                        News.title_uz.ilike(f'%{search}%'),
+                        News.title_en.ilike(f'%{search}%'),
+                        News.content_ru.ilike(f'%{search}%'),
+                        News.content_uz.ilike(f'%{search}%'),
+                        News.content_en.ilike(f'%{search}%')
+                    )
                 )
-            )
         
         # Apply date filters
         if date_from:
@@ -59,11 +106,14 @@ def get_news():
                 }), 400
         
         # Apply sorting
-        if sort_by == 'title':
+        if sort_by == 'relevance' and hits is not None:
+            query = query.order_by(asc(hits.c.rank), desc(News.date))
+        elif sort_by == 'title':
+            title_column = getattr(News, f'title_{lang or "ru"}')
             if sort_order == 'asc':
-                query = query.order_by(asc(News.title_ru))
+                query = query.order_by(asc(title_column))
             else:
-                query = query.order_by(desc(News.title_ru))
+                query = query.order_by(desc(title_column))
         else:  # sort by date (default)
             if sort_order == 'asc':
                 query = query.order_by(asc(News.date))
@@ -74,14 +124,27 @@ def get_news():
         total = query.count()
         
         # Apply pagination and get results
-        news_items = query.offset(offset).limit(limit).all()
+        rows = query.offset(offset).limit(limit).all()
         
-        return jsonify({
-            'news': [news.to_dict() for news in news_items],
+        news_items = [news.to_dict(lang, include_content) for news in rows]
+        
+        # Highlight search matches for the returned page only
+        if hits is not None:
+            snippets = NEWS_INDEX.highlights(db.session, [news.id for news in rows], search, lang)
+            for item in news_items:
+                item['highlight'] = snippets.get(item['id'])
+        
+        body = PrecompressedBody(jsonify({
+            'news': news_items,
             'total': total,
             'limit': limit,
             'offset': offset
-        }), 200
+        }).get_data(), 'application/json')
+        if len(_list_bodies) >= 64:
+            _list_bodies.clear()
+        _list_bodies[etag] = body
+        
+        return with_validators(vary_on_language(body.make_response()), etag, last_modified), 200
         
     except Exception as e:
         return jsonify({
@@ -94,17 +157,79 @@ def get_news():
 def get_news_item(news_id):
     """Get specific news by ID"""
     try:
-        news = News.query.get(news_id)
+        try:
+            lang = resolve_language()
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid lang',
+                'message': str(e)
+            }), 400
         
-        if not news:
+        # Check validators using only the timestamp before loading the row
+        row = db.session.query(News.updated_at).filter(News.id == news_id).first()
+        
+        if not row:
             return jsonify({
                 'error': 'Not Found',
                 'message': 'News not found'
             }), 404
         
-        return jsonify(news.to_dict()), 200
+        etag, last_modified = item_validators('news', news_id, row.updated_at)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return vary_on_language(cached)
+        
+        query = News.query
+        if lang:
+            query = query.options(News.language_load_options(lang))
+        news = query.get(news_id)
+        
+        response = vary_on_language(jsonify(news.to_dict(lang)))
+        return with_validators(response, etag, last_modified), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': 'Internal Server Error',
+            'message': str(e),
+            'timestamp': datetime.utcnow().isoformat() + 'Z'
+        }), 500
+
+@news_bp.route('/feed.<any(xml, json):fmt>', methods=['GET'])
+def get_news_feed(fmt):
+    """Serve the pre-rendered RSS (feed.xml) or JSON Feed (feed.json)"""
+    try:
+        try:
+            lang = resolve_language() or 'ru'
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid lang',
+                'message': str(e)
+            }), 400
+        
+        # Rendered by init_db and on every news write
+        feed = Feed.query.get(feed_name(lang, fmt))
+        if not feed:
+            return jsonify({
+                'error': 'Not Found',
+                'message': 'Feed not found'
+            }), 404
+        
+        cached = not_modified(feed.etag, feed.updated_at)
+        if cached:
+            return vary_on_language(cached)
+        
+        body = _feed_bodies.get(feed.etag)
+        CACHE_REQUESTS.inc(cache='news_feeds', result='miss' if body is None else 'hit')
+        if body is None:
+            body = PrecompressedBody(feed.body.encode('utf-8'), feed.content_type)
+            if len(_feed_bodies) >= 64:
+                _feed_bodies.clear()
+            _feed_bodies[feed.etag] = body
+        
+        return with_validators(vary_on_language(body.make_response()), feed.etag, feed.updated_at), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'error': 'Internal Server Error',
             'message': str(e),
@@ -155,6 +280,7 @@ def create_news(current_user):
         )
         
         db.session.add(news)
+        rebuild_news_feeds()
         db.session.commit()
         
         return jsonify(news.to_dict()), 201
@@ -217,6 +343,7 @@ def update_news(current_user, news_id):
         news.image_url = data.get('imageUrl')
         news.updated_at = datetime.utcnow()
         
+        rebuild_news_feeds()
         db.session.commit()
         
         return jsonify(news.to_dict()), 200
@@ -243,6 +370,7 @@ def delete_news(current_user, news_id):
             }), 404
         
         db.session.delete(news)
+        rebuild_news_feeds()
         db.session.commit()
         
         return '', 204
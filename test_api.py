@@ -3,10 +3,48 @@
 Simple test script to validate the Veterans Backend API functionality
 """
 import requests
+import hashlib
+import io
 import json
+import re
+import time
+import uuid
+from PIL import Image
 
 BASE_URL = "http://localhost:5000"
 
+def make_pdf(pages):
+    """Minimal PDF with one line of text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               "<< /Type /Pages /Kids [%s] /Count %d >>" % (
+                   ' '.join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages)),
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+def wait_for_file(file_id, field, pending, timeout=10):
+    """Poll a file until a background task has filled in the given field"""
+    deadline = time.time() + timeout
+    while True:
+        data = requests.get(f"{BASE_URL}/api/files/{file_id}").json()
+        if data[field] != pending or time.time() > deadline:
+            return data
+        time.sleep(0.2)
+
 def test_health_check():
     """Test health check endpoint"""
     response = requests.get(f"{BASE_URL}/health")
@@ -37,6 +75,20 @@ def test_authentication():
     
     return token
 
+def test_logout_revocation():
+    """Test that a token stops working after logout, and only that token"""
+    login_data = {"username": "admin", "password": "admin"}
+    tokens = [requests.post(f"{BASE_URL}/api/auth/login", json=login_data).json()['token'] for _ in range(2)]
+    first, second = ({"Authorization": f"Bearer {token}"} for token in tokens)
+    assert requests.get(f"{BASE_URL}/api/auth/verify", headers=first).status_code == 200
+    
+    response = requests.post(f"{BASE_URL}/api/auth/logout", headers=first)
+    assert response.status_code == 204
+    assert requests.get(f"{BASE_URL}/api/auth/verify", headers=first).status_code == 401
+    assert requests.post(f"{BASE_URL}/api/auth/logout", headers=first).status_code == 401
+    assert requests.get(f"{BASE_URL}/api/auth/verify", headers=second).status_code == 200
+    print("✓ Logout revocation passed")
+
 def test_laws_api():
     """Test laws API endpoints"""
     # Test get all laws
@@ -75,6 +127,530 @@ def test_news_api():
         assert 'id' in news_data
         print("✓ News API get specific passed")
 
+def test_language_scoped_responses(token):
+    """Test that ?lang= returns the text fields in a single language"""
+    headers = {"Authorization": f"Bearer {token}"}
+    news_data = {"title": {"ru": "Заголовок", "uz": "Sarlavha", "en": "Headline"},
+                 "content": {"ru": "Текст", "uz": "Matn", "en": "Text"},
+                 "summary": {"ru": "Кратко", "uz": "Qisqacha", "en": "Summary"},
+                 "date": "1999-05-09"}
+    response = requests.post(f"{BASE_URL}/api/news", headers=headers, json=news_data)
+    assert response.status_code == 201
+    news_id = response.json()['id']
+    
+    try:
+        response = requests.get(f"{BASE_URL}/api/news/{news_id}?lang=uz")
+        assert response.status_code == 200
+        data = response.json()
+        assert data['lang'] == 'uz'
+        assert data['title'] == 'Sarlavha'
+        assert data['content'] == 'Matn'
+    
+        # Without lang every language is returned
+        response = requests.get(f"{BASE_URL}/api/news/{news_id}")
+        assert response.json()['title'] == news_data['title']
+    
+        response = requests.get(f"{BASE_URL}/api/news/{news_id}?lang=auto",
+                                headers={"Accept-Language": "en-US,en;q=0.9"})
+        assert response.json()['title'] == 'Headline'
+        assert 'Accept-Language' in response.headers['Vary']
+    
+        response = requests.get(f"{BASE_URL}/api/news?lang=ru&dateFrom=1999-05-09&dateTo=1999-05-09")
+        item = next(item for item in response.json()['news'] if item['id'] == news_id)
+        assert item['title'] == 'Заголовок'
+    
+        response = requests.get(f"{BASE_URL}/api/laws?lang=xx")
+        assert response.status_code == 400
+        print("✓ Language-scoped responses passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/news/{news_id}", headers=headers)
+
+def test_news_summary_listing(token):
+    """Test that news lists leave out the content unless include=content"""
+    headers = {"Authorization": f"Bearer {token}"}
+    text = {"ru": "Полный текст", "uz": "To'liq matn", "en": "Full text"}
+    news_data = {"title": text, "content": text, "summary": text, "date": "1999-05-10"}
+    response = requests.post(f"{BASE_URL}/api/news", headers=headers, json=news_data)
+    assert response.status_code == 201
+    news_id = response.json()['id']
+    query = "dateFrom=1999-05-10&dateTo=1999-05-10"
+    
+    try:
+        response = requests.get(f"{BASE_URL}/api/news?{query}")
+        assert response.status_code == 200
+        item = next(item for item in response.json()['news'] if item['id'] == news_id)
+        assert 'content' not in item
+        assert item['summary'] == text
+    
+        response = requests.get(f"{BASE_URL}/api/news?{query}&include=content&lang=en")
+        item = next(item for item in response.json()['news'] if item['id'] == news_id)
+        assert item['content'] == 'Full text'
+    
+        # A single news item always has its content
+        response = requests.get(f"{BASE_URL}/api/news/{news_id}")
+        assert response.json()['content'] == text
+        print("✓ News summary listing passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/news/{news_id}", headers=headers)
+
+def test_news_feeds():
+    """Test pre-rendered news feeds and conditional requests"""
+    response = requests.get(f"{BASE_URL}/api/news/feed.xml")
+    assert response.status_code == 200
+    assert '<rss' in response.text
+    etag = response.headers['ETag']
+    response = requests.get(f"{BASE_URL}/api/news/feed.xml", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    print("✓ News RSS feed passed")
+    
+    response = requests.get(f"{BASE_URL}/api/news/feed.json?lang=en")
+    assert response.status_code == 200
+    data = response.json()
+    assert data['language'] == 'en'
+    assert 'items' in data
+    print("✓ News JSON feed passed")
+
+def test_news_search_highlight(token):
+    """Test that search highlights escape the stored text"""
+    headers = {"Authorization": f"Bearer {token}"}
+    text = {"ru": "Ветераны <script>alert(1)</script> & друзья",
+            "uz": "Faxriylar <script>alert(1)</script> & do'stlar",
+            "en": "Veterans <script>alert(1)</script> & friends"}
+    news_data = {"title": text, "content": text, "summary": text, "date": "2024-01-15"}
+    response = requests.post(f"{BASE_URL}/api/news", headers=headers, json=news_data)
+    assert response.status_code == 201
+    news_id = response.json()['id']
+    
+    try:
+        response = requests.get(f"{BASE_URL}/api/news?search=veterans&lang=en")
+        assert response.status_code == 200
+        item = next(item for item in response.json()['news'] if item['id'] == news_id)
+        assert '<mark>Veterans</mark>' in item['highlight']
+        assert '<script>' not in item['highlight']
+        assert '&lt;script&gt;' in item['highlight']
+        print("✓ News search highlight escaping passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/news/{news_id}", headers=headers)
+
+def test_full_text_search(token):
+    """Test ranked full-text search over news and its index updates"""
+    headers = {"Authorization": f"Bearer {token}"}
+    word = f"zq{uuid.uuid4().hex[:8]}"
+    
+    def news_data(title, content, date):
+        return {"title": {"ru": title, "uz": title, "en": title},
+                "content": {"ru": content, "uz": content, "en": content},
+                "summary": {"ru": "-", "uz": "-", "en": "-"}, "date": date}
+    
+    response = requests.post(f"{BASE_URL}/api/news", headers=headers,
+                             json=news_data(f"{word} report", f"All about {word}", "2024-01-01"))
+    assert response.status_code == 201
+    strong_id = response.json()['id']
+    response = requests.post(f"{BASE_URL}/api/news", headers=headers,
+                             json=news_data("Other report", f"Mentions {word} once", "2024-06-01"))
+    assert response.status_code == 201
+    weak_id = response.json()['id']
+    
+    try:
+        response = requests.get(f"{BASE_URL}/api/news?search={word}&sortBy=relevance")
+        assert response.status_code == 200
+        data = response.json()
+        assert data['total'] == 2
+        assert [item['id'] for item in data['news']] == [strong_id, weak_id]
+    
+        # Newest first unless sorted by relevance
+        response = requests.get(f"{BASE_URL}/api/news?search={word}")
+        assert [item['id'] for item in response.json()['news']] == [weak_id, strong_id]
+    
+        # Edits and deletes are reflected in the index at once
+        response = requests.put(f"{BASE_URL}/api/news/{weak_id}", headers=headers,
+                                json=news_data("Other report", "Nothing here", "2024-06-01"))
+        assert response.status_code == 200
+        response = requests.get(f"{BASE_URL}/api/news?search={word}")
+        assert [item['id'] for item in response.json()['news']] == [strong_id]
+    
+        requests.delete(f"{BASE_URL}/api/news/{strong_id}", headers=headers)
+        response = requests.get(f"{BASE_URL}/api/news?search={word}")
+        assert response.json()['total'] == 0
+        print("✓ Full-text search passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/news/{strong_id}", headers=headers)
+        requests.delete(f"{BASE_URL}/api/news/{weak_id}", headers=headers)
+
+def test_search_stemming(token):
+    """Test that search matches inflected, differently spelled and transliterated words"""
+    headers = {"Authorization": f"Bearer {token}"}
+    news_data = {"title": {"ru": "Пенсии ветеранов и ёлки", "uz": "Veteranlarga imtiyozlar",
+                           "en": "Benefits for veterans"},
+                 "content": {"ru": "Льготы", "uz": "Muhim o‘zgarishlar", "en": "Changes"},
+                 "summary": {"ru": "-", "uz": "-", "en": "-"},
+                 "date": "1999-05-11"}
+    response = requests.post(f"{BASE_URL}/api/news", headers=headers, json=news_data)
+    assert response.status_code == 201
+    news_id = response.json()['id']
+    
+    try:
+        # Russian case endings and ё, Uzbek suffixes, Cyrillic spelling and
+        # apostrophes, English plurals
+        for search in ("ветеранами", "пенсия", "елка", "ветеранлар", "veteran",
+                       "ozgarish", "benefit"):
+            response = requests.get(f"{BASE_URL}/api/news",
+                                    params={"search": search, "dateFrom": "1999-05-11",
+                                            "dateTo": "1999-05-11"})
+            assert response.status_code == 200
+            assert news_id in [item['id'] for item in response.json()['news']], search
+        print("✓ Search stemming and folding passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/news/{news_id}", headers=headers)
+
+def test_law_categories(token):
+    """Test the category taxonomy: reuse by name, filters and law counts"""
+    headers = {"Authorization": f"Bearer {token}"}
+    suffix = uuid.uuid4().hex[:8]
+    law_data = {"title": {"ru": "Указ", "uz": "Farmon", "en": "Decree"},
+                "description": {"ru": "Описание", "uz": "Tavsif", "en": "Description"},
+                "category": {"ru": f"Указы {suffix}", "uz": f"Farmonlar {suffix}", "en": f"Decrees {suffix}"},
+                "date": "2024-01-01"}
+    law_ids = []
+    
+    def category_entry(category_id):
+        response = requests.get(f"{BASE_URL}/api/laws/categories?lang=en")
+        assert response.status_code == 200
+        return next(item for item in response.json()['categories'] if item['id'] == category_id)
+    
+    try:
+        # Laws with the same category names share one category
+        for _ in range(2):
+            response = requests.post(f"{BASE_URL}/api/laws", headers=headers, json=law_data)
+            assert response.status_code == 201
+            law_ids.append(response.json()['id'])
+            category_id = response.json()['categoryId']
+        assert requests.get(f"{BASE_URL}/api/laws/{law_ids[0]}").json()['categoryId'] == category_id
+    
+        entry = category_entry(category_id)
+        assert entry['name'] == f"Decrees {suffix}"
+        assert entry['lawCount'] == 2
+    
+        response = requests.get(f"{BASE_URL}/api/laws?categoryId={category_id}")
+        assert sorted(law['id'] for law in response.json()['laws']) == sorted(law_ids)
+        response = requests.get(f"{BASE_URL}/api/laws?category=decrees {suffix.upper()}")
+        assert sorted(law['id'] for law in response.json()['laws']) == sorted(law_ids)
+        response = requests.get(f"{BASE_URL}/api/laws?categoryId=x")
+        assert response.status_code == 400
+    
+        # A category without laws stays listed
+        for law_id in law_ids:
+            assert requests.delete(f"{BASE_URL}/api/laws/{law_id}", headers=headers).status_code == 204
+        assert category_entry(category_id)['lawCount'] == 0
+        print("✓ Law categories passed")
+    finally:
+        for law_id in law_ids:
+            requests.delete(f"{BASE_URL}/api/laws/{law_id}", headers=headers)
+
+def test_laws_snapshot(token):
+    """Test that law reads served from the snapshot follow every write at once"""
+    headers = {"Authorization": f"Bearer {token}"}
+    suffix = uuid.uuid4().hex[:8]
+    law_data = {"title": {"ru": "Новый закон", "uz": "Yangi qonun", "en": "New law"},
+                "description": {"ru": "Описание", "uz": "Tavsif", "en": "Description"},
+                "category": {"ru": f"Кодексы {suffix}", "uz": f"Kodekslar {suffix}", "en": f"Codes {suffix}"},
+                "date": "2099-01-01"}
+    response = requests.post(f"{BASE_URL}/api/laws", headers=headers, json=law_data)
+    assert response.status_code == 201
+    law_id = response.json()['id']
+    category_id = response.json()['categoryId']
+    
+    try:
+        # Newest first: the law dated 2099 heads the list
+        response = requests.get(f"{BASE_URL}/api/laws?limit=1&lang=en")
+        data = response.json()
+        assert data['laws'][0]['id'] == law_id
+        assert data['laws'][0]['title'] == 'New law'
+        assert data['limit'] == 1
+    
+        law_data['title']['en'] = 'Amended law'
+        response = requests.put(f"{BASE_URL}/api/laws/{law_id}", headers=headers, json=law_data)
+        assert response.status_code == 200
+        assert requests.get(f"{BASE_URL}/api/laws/{law_id}?lang=en").json()['title'] == 'Amended law'
+        response = requests.get(f"{BASE_URL}/api/laws?categoryId={category_id}&lang=en")
+        assert [law['title'] for law in response.json()['laws']] == ['Amended law']
+    
+        assert requests.delete(f"{BASE_URL}/api/laws/{law_id}", headers=headers).status_code == 204
+        assert requests.get(f"{BASE_URL}/api/laws/{law_id}").status_code == 404
+        assert requests.get(f"{BASE_URL}/api/laws?categoryId={category_id}").json()['total'] == 0
+        print("✓ Laws snapshot passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/laws/{law_id}", headers=headers)
+
+def test_conditional_requests():
+    """Test ETag revalidation of law lists and items"""
+    response = requests.get(f"{BASE_URL}/api/laws")
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    response = requests.get(f"{BASE_URL}/api/laws", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    print("✓ Laws list conditional request passed")
+    
+    laws = requests.get(f"{BASE_URL}/api/laws").json()['laws']
+    if laws:
+        response = requests.get(f"{BASE_URL}/api/laws/{laws[0]['id']}")
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        response = requests.get(f"{BASE_URL}/api/laws/{laws[0]['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        print("✓ Law item conditional request passed")
+
+def test_pdf_text_search(token):
+    """Test that laws are found by the extracted text of their PDF"""
+    headers = {"Authorization": f"Bearer {token}"}
+    word = f"zq{uuid.uuid4().hex[:8]}"
+    pdf = make_pdf(["Introduction", f"Article 7: pensions for {word} are indexed yearly"])
+    response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers,
+                             files={"file": ("act.pdf", pdf)}, data={"type": "pdf", "category": "law"})
+    assert response.status_code == 201
+    file_data = response.json()
+    law_id = None
+    
+    try:
+        assert wait_for_file(file_data['id'], 'textStatus', 'pending')['textStatus'] == 'done'
+    
+        law_data = {"title": {"ru": "Акт", "uz": "Akt", "en": "Act"},
+                    "description": {"ru": "Описание", "uz": "Tavsif", "en": "Description"},
+                    "category": {"ru": "Акты", "uz": "Aktlar", "en": "Acts"},
+                    "date": "2024-01-01", "pdfUrl": file_data['url']}
+        response = requests.post(f"{BASE_URL}/api/laws", headers=headers, json=law_data)
+        assert response.status_code == 201
+        law_id = response.json()['id']
+    
+        response = requests.get(f"{BASE_URL}/api/laws?search={word}")
+        assert response.status_code == 200
+        laws = response.json()['laws']
+        assert [law['id'] for law in laws] == [law_id]
+        assert laws[0]['documentHits'][0]['page'] == 2
+        assert f"<mark>{word}</mark>" in laws[0]['documentHits'][0]['highlight']
+        print("✓ PDF text search passed")
+    finally:
+        if law_id:
+            requests.delete(f"{BASE_URL}/api/laws/{law_id}", headers=headers)
+        requests.delete(f"{BASE_URL}/api/files/{file_data['id']}", headers=headers)
+
+def test_upload_limits(token):
+    """Test upload hashing and the size, type and format checks"""
+    headers = {"Authorization": f"Bearer {token}"}
+    content = f"%PDF-1.4\n% {uuid.uuid4()}\n%%EOF\n".encode() * 100
+    response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers,
+                             files={"file": ("doc.pdf", content)}, data={"type": "pdf"})
+    assert response.status_code == 201
+    file_data = response.json()
+    try:
+        assert file_data['size'] == len(content)
+        assert file_data['sha256'] == hashlib.sha256(content).hexdigest()
+        assert requests.get(file_data['url']).content == content
+        print("✓ Upload hashing passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/files/{file_data['id']}", headers=headers)
+    
+    # Images are limited to 5MB, checked while the upload streams in
+    response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers,
+                             files={"file": ("big.png", b"x" * (5 * 1024 * 1024 + 1))}, data={"type": "image"})
+    assert response.status_code == 400
+    assert response.json()['error'] == 'File size too large'
+    
+    response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers,
+                             files={"file": ("tool.exe", b"MZ")}, data={"type": "pdf"})
+    assert response.status_code == 400
+    assert response.json()['error'] == 'Invalid file format'
+    
+    response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers, data={"type": "pdf"})
+    assert response.status_code == 400
+    print("✓ Upload limits passed")
+
+def test_image_derivatives(token):
+    """Test the resized copies made in the background for uploaded images"""
+    headers = {"Authorization": f"Bearer {token}"}
+    image = io.BytesIO()
+    Image.new('RGB', (2000, 1000), (uuid.uuid4().int % 256, 0, 0)).save(image, 'PNG')
+    response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers,
+                             files={"file": ("photo.png", image.getvalue())}, data={"type": "image"})
+    assert response.status_code == 201
+    file_data = response.json()
+    try:
+        sizes = wait_for_file(file_data['id'], 'sizes', {})['sizes']
+        assert sizes['thumb'] == {'width': 320, 'height': 160}
+        assert sizes['lg'] == {'width': 1600, 'height': 800}
+        
+        response = requests.get(f"{file_data['url']}?size=thumb", headers={"Accept": "image/webp,*/*"})
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'image/webp'
+        assert 'Accept' in response.headers['Vary']
+        assert Image.open(io.BytesIO(response.content)).size == (320, 160)
+        
+        response = requests.get(f"{file_data['url']}?size=md", headers={"Accept": "*/*"})
+        assert response.headers['Content-Type'] == 'image/jpeg'
+        assert Image.open(io.BytesIO(response.content)).size == (800, 400)
+        
+        assert requests.get(f"{file_data['url']}?size=xl").status_code == 400
+        print("✓ Image derivatives passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/files/{file_data['id']}", headers=headers)
+
+def test_uploaded_file_serving(token):
+    """Test caching and Range requests on uploaded files"""
+    headers = {"Authorization": f"Bearer {token}"}
+    content = make_pdf([f"Range test {uuid.uuid4()}"] * 3)
+    response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers,
+                             files={"file": ("range.pdf", content)}, data={"type": "pdf"})
+    assert response.status_code == 201
+    file_data = response.json()
+    try:
+        # Content-addressed names never change content: cache for good
+        response = requests.get(file_data['url'])
+        assert response.status_code == 200
+        assert response.content == content
+        assert 'immutable' in response.headers['Cache-Control']
+        assert response.headers['Accept-Ranges'] == 'bytes'
+        etag = response.headers['ETag']
+        
+        response = requests.get(file_data['url'], headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        
+        response = requests.get(file_data['url'], headers={"Range": "bytes=0-99"})
+        assert response.status_code == 206
+        assert response.headers['Content-Range'] == f"bytes 0-99/{len(content)}"
+        assert response.content == content[:100]
+        
+        # If-Range: the range while the ETag matches, the whole file otherwise
+        response = requests.get(file_data['url'], headers={"Range": "bytes=100-", "If-Range": etag})
+        assert response.status_code == 206
+        assert response.content == content[100:]
+        response = requests.get(file_data['url'], headers={"Range": "bytes=100-", "If-Range": '"other"'})
+        assert response.status_code == 200
+        
+        response = requests.get(file_data['url'], headers={"Range": f"bytes={len(content) + 10}-"})
+        assert response.status_code == 416
+        
+        assert requests.get(f"{BASE_URL}/api/files/uploads/missing.pdf").status_code == 404
+        print("✓ Uploaded file serving passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/files/{file_data['id']}", headers=headers)
+
+def test_response_compression(token):
+    """Test gzip on large API responses and none on small ones"""
+    headers = {"Authorization": f"Bearer {token}"}
+    text = {"ru": "Длинный текст. " * 200, "uz": "Uzun matn. " * 200, "en": "Long text. " * 200}
+    news_data = {"title": text, "content": text, "summary": text, "date": "1999-05-12"}
+    response = requests.post(f"{BASE_URL}/api/news", headers=headers, json=news_data)
+    assert response.status_code == 201
+    news_id = response.json()['id']
+    url = f"{BASE_URL}/api/news?include=content&dateFrom=1999-05-12&dateTo=1999-05-12"
+    
+    try:
+        response = requests.get(url, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        compressed = response.json()
+        etag = response.headers['ETag']
+        
+        response = requests.get(url, headers={"Accept-Encoding": "identity"})
+        assert 'Content-Encoding' not in response.headers
+        assert response.json() == compressed
+        # The same representation in another encoding: one (weak) ETag for both
+        assert response.headers['ETag'] == etag
+        
+        response = requests.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert response.status_code == 304
+        
+        response = requests.get(f"{BASE_URL}/health", headers={"Accept-Encoding": "gzip"})
+        assert 'Content-Encoding' not in response.headers
+        print("✓ Response compression passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/news/{news_id}", headers=headers)
+
+def test_json_serialization(token):
+    """Test the JSON wire format: ISO dates, UTC timestamps and UTF-8 text"""
+    headers = {"Authorization": f"Bearer {token}"}
+    text = {"ru": "Новость дня", "uz": "Kun yangiligi", "en": "News of the day"}
+    news_data = {"title": text, "content": text, "summary": text, "date": "2024-03-08"}
+    response = requests.post(f"{BASE_URL}/api/news", headers=headers, json=news_data)
+    assert response.status_code == 201
+    news_id = response.json()['id']
+    
+    try:
+        response = requests.get(f"{BASE_URL}/api/news/{news_id}?lang=ru", headers={"Accept-Encoding": "identity"})
+        assert response.headers['Content-Type'].startswith('application/json')
+        # Non-ASCII text is sent as UTF-8, not as \u escapes
+        assert "Новость дня".encode('utf-8') in response.content
+        data = response.json()
+        assert data['date'] == '2024-03-08'
+        assert re.fullmatch(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z', data['createdAt'])
+        print("✓ JSON serialization passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/news/{news_id}", headers=headers)
+
+def test_upload_dedup(token):
+    """Test that uploading the same content twice shares one file"""
+    headers = {"Authorization": f"Bearer {token}"}
+    content = f"%PDF-1.4\n% {uuid.uuid4()}\n%%EOF\n".encode()
+    form = {"type": "pdf", "category": "other"}
+    
+    response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers,
+                             files={"file": ("first.pdf", content)}, data=form)
+    assert response.status_code == 201
+    first = response.json()
+    try:
+        response = requests.post(f"{BASE_URL}/api/files/upload", headers=headers,
+                                 files={"file": ("second.pdf", content)}, data=form)
+        assert response.status_code == 201
+        second = response.json()
+        assert second['id'] == first['id']
+        assert second['refCount'] == 2
+        print("✓ Upload deduplication passed")
+    finally:
+        requests.delete(f"{BASE_URL}/api/files/{first['id']}", headers=headers)
+        requests.delete(f"{BASE_URL}/api/files/{first['id']}", headers=headers)
+
+def test_upload_sessions(token):
+    """Test resumable uploads sent in two chunks"""
+    headers = {"Authorization": f"Bearer {token}"}
+    content = f"%PDF-1.4\n% {uuid.uuid4()}\n%%EOF\n".encode()
+    half = len(content) // 2
+    
+    response = requests.post(f"{BASE_URL}/api/files/sessions", headers=headers,
+                             json={"filename": "scan.pdf", "size": len(content), "type": "pdf"})
+    assert response.status_code == 201
+    session_id = response.json()['id']
+    
+    response = requests.put(f"{BASE_URL}/api/files/sessions/{session_id}", headers=headers,
+                            params={"offset": 0}, data=content[:half])
+    assert response.status_code == 200
+    assert response.json()['offset'] == half
+    
+    # A resumed chunk must start where the stored data ends
+    response = requests.put(f"{BASE_URL}/api/files/sessions/{session_id}", headers=headers,
+                            params={"offset": 0}, data=content[half:])
+    assert response.status_code == 409
+    assert response.json()['offset'] == half
+    
+    response = requests.get(f"{BASE_URL}/api/files/sessions/{session_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()['offset'] == half
+    
+    response = requests.put(f"{BASE_URL}/api/files/sessions/{session_id}", headers=headers,
+                            params={"offset": half}, data=content[half:])
+    assert response.status_code == 200
+    assert response.json()['offset'] == len(content)
+    
+    response = requests.post(f"{BASE_URL}/api/files/sessions/{session_id}/complete", headers=headers)
+    assert response.status_code == 201
+    file_data = response.json()
+    assert file_data['size'] == len(content)
+    requests.delete(f"{BASE_URL}/api/files/{file_data['id']}", headers=headers)
+    
+    response = requests.get(f"{BASE_URL}/api/files/sessions/{session_id}", headers=headers)
+    assert response.status_code == 404
+    print("✓ Resumable upload sessions passed")
+
 def test_comrades_api():
     """Test comrades API endpoints"""
     # Test search comrades
@@ -101,6 +677,44 @@ def test_swagger_docs():
     assert 'Veterans Association API' in response.text
     print("✓ Swagger documentation accessible")
 
+def test_docs_caching():
+    """Test that the OpenAPI spec and docs page are served precompressed and cacheable"""
+    for path in ("/api/swagger.json", "/docs/"):
+        response = requests.get(f"{BASE_URL}{path}", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert 'max-age=' in response.headers['Cache-Control']
+        etag = response.headers['ETag']
+        
+        response = requests.get(f"{BASE_URL}{path}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert response.status_code == 304
+        
+        response = requests.get(f"{BASE_URL}{path}", headers={"Accept-Encoding": "identity"})
+        assert 'Content-Encoding' not in response.headers
+    assert requests.get(f"{BASE_URL}/api/swagger.json").json()['paths']
+    print("✓ Docs caching passed")
+
+def test_metrics_auth():
+    """Test that metrics are never served without the token"""
+    response = requests.get(f"{BASE_URL}/metrics")
+    # 404 while METRICS_ENABLED is off (the default), 401 otherwise
+    assert response.status_code in (401, 404)
+    response = requests.get(f"{BASE_URL}/metrics", headers={"Authorization": "Bearer wrong-token"})
+    assert response.status_code in (401, 404)
+    print("✓ Metrics authentication passed")
+
+def test_login_throttle():
+    """Test that repeated failed logins for one username are throttled"""
+    login_data = {"username": f"throttle-{uuid.uuid4()}", "password": "wrong"}
+    for _ in range(20):
+        response = requests.post(f"{BASE_URL}/api/auth/login", json=login_data)
+        if response.status_code != 401:
+            break
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    print("✓ Login throttling passed")
+
 def main():
     """Run all tests"""
     print("Running Veterans Backend API Tests...")
@@ -109,10 +723,32 @@ def main():
     try:
         test_health_check()
         token = test_authentication()
+        test_logout_revocation()
         test_laws_api()
+        test_law_categories(token)
+        test_laws_snapshot(token)
+        test_response_compression(token)
+        test_json_serialization(token)
         test_news_api()
+        test_language_scoped_responses(token)
+        test_news_summary_listing(token)
+        test_news_feeds()
+        test_news_search_highlight(token)
+        test_full_text_search(token)
+        test_search_stemming(token)
+        test_conditional_requests()
+        test_pdf_text_search(token)
+        test_upload_limits(token)
+        test_image_derivatives(token)
+        test_uploaded_file_serving(token)
+        test_upload_dedup(token)
+        test_upload_sessions(token)
         test_comrades_api()
         test_swagger_docs()
+        test_docs_caching()
+        test_metrics_auth()
+        # Last: uses up attempts of the client's login budget
+        test_login_throttle()
         
         print("="*50)
         print("All tests passed! ✓")
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+In-process tests for what test_api.py cannot reach over HTTP: maintenance
+commands, storage backends and settings. The app runs on a temporary database
+and upload folder.
+"""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from PIL import Image
+
+WORK_DIR = tempfile.mkdtemp()
+UPLOAD_DIR = os.path.join(WORK_DIR, 'uploads')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORK_DIR, 'test.db')
+os.environ['UPLOAD_FOLDER'] = UPLOAD_DIR
+
+from sqlalchemy import event
+from app import create_app, init_db
+from models import db
+from models.file import File
+from models.user import User
+from models.revoked_token import RevokedToken
+from utils.revocation import prune_revoked_tokens
+from utils.storage import S3Storage, shard_path
+
+def login(client):
+    """Authorization header of the sample admin"""
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin'})
+    assert response.status_code == 200
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+def upload(client, headers, name, content, file_type='pdf'):
+    """Upload a file and wait for its background text extraction"""
+    response = client.post('/api/files/upload', headers=headers,
+                           data={'type': file_type, 'file': (io.BytesIO(content), name)})
+    assert response.status_code == 201
+    file_data = response.json
+    wait_until(lambda: client.get(f"/api/files/{file_data['id']}").json['textStatus'] != 'pending')
+    return file_data
+
+def wait_until(condition, timeout=10):
+    """Poll until condition() is true"""
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out waiting for a background task'
+        time.sleep(0.1)
+
+def create_law(client, headers, pdf_url):
+    law_data = {"title": {"ru": "Закон", "uz": "Qonun", "en": "Law"},
+                "description": {"ru": "Описание", "uz": "Tavsif", "en": "Description"},
+                "category": {"ru": "Законы", "uz": "Qonunlar", "en": "Laws"},
+                "date": "2024-01-01", "pdfUrl": pdf_url}
+    response = client.post('/api/laws', headers=headers, json=law_data)
+    assert response.status_code == 201
+    return response.json['id']
+
+def test_gc_uploads(app):
+    """Test that gc-uploads --delete removes only unreferenced and stray uploads"""
+    client = app.test_client()
+    headers = login(client)
+    runner = app.test_cli_runner()
+    
+    def unique_pdf():
+        return f"%PDF-1.4\n% {uuid.uuid4()}\n%%EOF\n".encode()
+    
+    used = upload(client, headers, 'used.pdf', unique_pdf())
+    kept = upload(client, headers, 'kept.pdf', unique_pdf())
+    orphan = upload(client, headers, 'orphan.pdf', unique_pdf())
+    gone = upload(client, headers, 'gone.pdf', unique_pdf())
+    # Referenced through another host and a relative URL
+    law_ids = [create_law(client, headers, used['url'].replace('localhost', 'cdn.example.org')),
+               create_law(client, headers, f"uploads/{kept['filename']}")]
+    os.remove(os.path.join(UPLOAD_DIR, shard_path(kept['filename'])))
+    os.remove(os.path.join(UPLOAD_DIR, shard_path(gone['filename'])))
+    with open(os.path.join(UPLOAD_DIR, 'stray.bin'), 'wb') as stray:
+        stray.write(b'x' * 42)
+    
+    try:
+        # New uploads are spared for UPLOAD_GC_MIN_AGE
+        result = runner.invoke(args=['gc-uploads', '--delete'])
+        assert result.exit_code == 0
+        assert client.get(f"/api/files/{orphan['id']}").status_code == 200
+    
+        result = runner.invoke(args=['gc-uploads', '--min-age', '0'])
+        assert 'Dry run' in result.output
+        assert 'still referenced, kept' in result.output
+        assert client.get(f"/api/files/{orphan['id']}").status_code == 200
+    
+        result = runner.invoke(args=['gc-uploads', '--min-age', '0', '--delete', '--batch-size', '1'])
+        assert result.exit_code == 0
+        assert 'Deleted 3 items' in result.output
+        assert client.get(f"/api/files/{orphan['id']}").status_code == 404
+        assert not os.path.exists(os.path.join(UPLOAD_DIR, shard_path(orphan['filename'])))
+        assert client.get(f"/api/files/{gone['id']}").status_code == 404
+        assert not os.path.exists(os.path.join(UPLOAD_DIR, 'stray.bin'))
+    
+        # Referenced files stay, even when their content is missing
+        assert client.get(f"/api/files/{used['id']}").status_code == 200
+        assert os.path.exists(os.path.join(UPLOAD_DIR, shard_path(used['filename'])))
+        assert client.get(f"/api/files/{kept['id']}").status_code == 200
+        print("✓ gc-uploads passed")
+    finally:
+        for law_id in law_ids:
+            client.delete(f"/api/laws/{law_id}", headers=headers)
+        for file_data in (used, kept, orphan, gone):
+            client.delete(f"/api/files/{file_data['id']}", headers=headers)
+
+def test_migrate_uploads(app):
+    """Test that migrate-uploads moves flat-layout files into shards"""
+    client = app.test_client()
+    headers = login(client)
+    runner = app.test_cli_runner()
+    suffix = uuid.uuid4().hex[:8]
+    sha = uuid.uuid4().hex * 2
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    
+    # Files as stored by older versions: directly in UPLOAD_FOLDER
+    names = [f'legacy{i}_{suffix}.pdf' for i in range(3)] + [f'{sha}.png']
+    with app.app_context():
+        for name in names:
+            with open(os.path.join(UPLOAD_DIR, name), 'wb') as stored:
+                stored.write(name.encode())
+            file_record = File(filename=name, original_name=name, url=f'http://localhost/api/files/uploads/{name}',
+                               file_type='image' if name.endswith('.png') else 'pdf', size=len(name))
+            if name.endswith('.png'):
+                file_record.sha256 = sha
+                file_record.set_derivatives({'thumb': {'width': 1, 'height': 1, 'formats': {'jpeg': f'{sha}_thumb.jpeg'}}})
+            db.session.add(file_record)
+        db.session.commit()
+        file_ids = [file_record.id for file_record in File.query.filter(File.original_name.in_(names))]
+    with open(os.path.join(UPLOAD_DIR, f'{sha}_thumb.jpeg'), 'wb') as stored:
+        stored.write(b'thumb')
+    
+    try:
+        assert client.get(f'/api/files/uploads/{names[0]}').data == names[0].encode()
+    
+        result = runner.invoke(args=['migrate-uploads', '--batch-size', '2'])
+        assert result.exit_code == 0
+        assert 'Migrated 4 files' in result.output
+        for name in names + [f'{sha}_thumb.jpeg']:
+            assert not os.path.exists(os.path.join(UPLOAD_DIR, name))
+            assert os.path.exists(os.path.join(UPLOAD_DIR, shard_path(name)))
+        assert shard_path(f'{sha}.png').startswith(f'{sha[:2]}/{sha[2:4]}/')
+    
+        # Same URLs, records point at the new paths
+        for name in names:
+            assert client.get(f'/api/files/uploads/{name}').data == name.encode()
+        assert client.get(f'/api/files/uploads/{sha}.png?size=thumb').data == b'thumb'
+        with app.app_context():
+            assert File.query.get(file_ids[0]).filename == shard_path(names[0])
+    
+        result = runner.invoke(args=['migrate-uploads'])
+        assert 'Migrated 0 files' in result.output
+        print("✓ migrate-uploads passed")
+    finally:
+        for file_id in file_ids:
+            client.delete(f'/api/files/{file_id}', headers=headers)
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls made by S3Storage"""
+    
+    class NoSuchKey(Exception):
+        response = {'Error': {'Code': 'NoSuchKey'}}
+    
+    def __init__(self):
+        self.objects = {}
+        self.writable = threading.Event()
+        self.writable.set()
+    
+    def upload_fileobj(self, source, bucket, key, ExtraArgs=None):
+        self.writable.wait()
+        self.objects[key] = source.read()
+    
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.NoSuchKey()
+        return {'Body': io.BytesIO(self.objects[Key])}
+    
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.NoSuchKey()
+        return {}
+    
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+    
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.example.org/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+def test_s3_storage():
+    """Test the S3 backend against an in-memory client, with queued writes"""
+    spool = os.path.join(WORK_DIR, 's3-spool')
+    app = create_app()
+    app.config['UPLOAD_FOLDER'] = spool
+    s3 = FakeS3Client()
+    app.extensions['storage'] = S3Storage('uploads', spool, prefix='media', client=s3, async_writes=True)
+    client = app.test_client()
+    headers = login(client)
+    content = f"%PDF-1.4\n% {uuid.uuid4()}\n%%EOF\n".encode()
+    
+    # Until the queued write reaches the bucket the file is served from the spool
+    s3.writable.clear()
+    file_data = upload(client, headers, 'queued.pdf', content)
+    key = f"media/{shard_path(file_data['filename'])}"
+    try:
+        assert key not in s3.objects
+        response = client.get(f"/api/files/uploads/{file_data['filename']}")
+        assert response.status_code == 200
+        assert response.data == content
+    
+        s3.writable.set()
+        wait_until(lambda: key in s3.objects)
+        assert s3.objects[key] == content
+        wait_until(lambda: not os.listdir(os.path.join(spool, '.pending')))
+    
+        # Then downloads are redirected to a presigned URL
+        response = client.get(f"/api/files/uploads/{file_data['filename']}")
+        assert response.status_code == 302
+        assert response.location.startswith(f"https://s3.example.org/uploads/{key}?")
+    
+        result = app.test_cli_runner().invoke(args=['migrate-uploads'])
+        assert result.exit_code != 0
+    
+        assert client.delete(f"/api/files/{file_data['id']}", headers=headers).status_code == 204
+        assert key not in s3.objects
+        print("✓ S3 storage passed")
+    finally:
+        s3.writable.set()
+        client.delete(f"/api/files/{file_data['id']}", headers=headers)
+
+def test_image_optimization():
+    """Test that with IMAGE_OPTIMIZE a smaller copy without metadata is served"""
+    app = create_app()
+    app.config.update(IMAGE_OPTIMIZE=True, IMAGE_MAX_DIMENSION=1000)
+    client = app.test_client()
+    headers = login(client)
+    
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    photo = Image.merge('RGB', [Image.linear_gradient('L').resize((3000, 1500)),
+                                Image.linear_gradient('L').rotate(90).resize((3000, 1500)),
+                                Image.effect_noise((3000, 1500), 20)])
+    original = io.BytesIO()
+    photo.save(original, 'JPEG', quality=95, exif=exif)
+    file_data = upload(client, headers, 'photo.jpg', original.getvalue(), 'image')
+    try:
+        wait_until(lambda: client.get(f"/api/files/{file_data['id']}").json['optimizedSize'] is not None)
+        assert client.get(f"/api/files/{file_data['id']}").json['optimizedSize'] < file_data['size']
+    
+        response = client.get(f"/api/files/uploads/{file_data['filename']}", headers={'Accept': '*/*'})
+        assert response.status_code == 200
+        assert response.mimetype == 'image/jpeg'
+        assert 'Accept' in response.headers['Vary']
+        served = Image.open(io.BytesIO(response.data))
+        assert served.size == (1000, 500)
+        assert not dict(served.getexif())
+    
+        response = client.get(f"/api/files/uploads/{file_data['filename']}", headers={'Accept': 'image/webp,*/*'})
+        assert response.mimetype in ('image/webp', 'image/jpeg')
+        assert Image.open(io.BytesIO(response.data)).size == (1000, 500)
+        print("✓ Image optimization passed")
+    finally:
+        client.delete(f"/api/files/{file_data['id']}", headers=headers)
+
+def test_user_cache(app):
+    """Test that authenticated users are cached and changes apply at once"""
+    client = app.test_client()
+    username = f"editor-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        db.session.add(User(username=username, password='secret', role='admin'))
+        db.session.commit()
+    response = client.post('/api/auth/login', json={'username': username, 'password': 'secret'})
+    headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+    
+    user_queries = []
+    
+    def count_user_queries(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM users' in statement:
+            user_queries.append(statement)
+    
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_user_queries)
+    try:
+        for _ in range(5):
+            response = client.get('/api/auth/verify', headers=headers)
+            assert response.get_json()['user']['role'] == 'admin'
+        assert len(user_queries) <= 1
+    
+        # Changes made through this process invalidate the cached entry
+        with app.app_context():
+            User.query.filter_by(username=username).first().role = 'user'
+            db.session.commit()
+        assert client.get('/api/auth/verify', headers=headers).get_json()['user']['role'] == 'user'
+    
+        with app.app_context():
+            db.session.delete(User.query.filter_by(username=username).first())
+            db.session.commit()
+        assert client.get('/api/files', headers=headers).status_code == 401
+        print("✓ User cache passed")
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', count_user_queries)
+
+def test_revocation_sync(app):
+    """Test that a logout on one worker process reaches the others, and pruning"""
+    other = create_app()
+    other.config['REVOCATION_SYNC_INTERVAL'] = 1
+    client, other_client = app.test_client(), other.test_client()
+    headers = login(client)
+    assert other_client.get('/api/auth/verify', headers=headers).status_code == 200
+    
+    assert client.post('/api/auth/logout', headers=headers).status_code == 204
+    assert client.get('/api/auth/verify', headers=headers).status_code == 401
+    wait_until(lambda: other_client.get('/api/auth/verify', headers=headers).status_code == 401, timeout=5)
+    
+    with app.app_context():
+        db.session.add(RevokedToken(jti=f'expired-{uuid.uuid4()}', expires_at=datetime.utcnow() - timedelta(hours=1)))
+        db.session.commit()
+        prune_revoked_tokens()
+        assert RevokedToken.query.filter(RevokedToken.expires_at < datetime.utcnow()).count() == 0
+        assert RevokedToken.query.count() >= 1
+    print("✓ Revocation sync passed")
+
+def main():
+    """Run all tests"""
+    print("Running Veterans Backend in-process tests...")
+    print("="*50)
+    
+    try:
+        app = create_app()
+        init_db(app)
+        test_gc_uploads(app)
+        test_migrate_uploads(app)
+        test_s3_storage()
+        test_image_optimization()
+        test_user_cache(app)
+        test_revocation_sync(app)
+    
+        print("="*50)
+        print("All tests passed! ✓")
+        return True
+    except Exception as e:
+        print(f"Test failed: {e}")
+        return False
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Search text analyzer for the multilingual news and law columns.
+
+The same pipeline runs when a column is indexed and when a query is parsed,
+so inflected forms meet on a common stem:
+
+    fold (case, ё, apostrophes) -> transliterate (uz Cyrillic -> Latin)
+    -> tokenize -> light stemming (ru / uz / en suffix stripping)
+"""
+
+import html
+import re
+import unicodedata
+
+# Words may contain Uzbek apostrophes (o‘zbek, ta'lim); they are folded away
+WORD_RE = re.compile(r"\w+(?:['‘’ʻʼ`]\w+)*")
+APOSTROPHES_RE = re.compile(r"['‘’ʻʼ`]")
+TOKEN_RE = re.compile(r'\w+')
+
+UZ_CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '',
+    'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya', 'ў': 'o', 'қ': 'q',
+    'ғ': 'g', 'ҳ': 'h'
+}
+UZ_TRANSLITERATION = str.maketrans(UZ_CYRILLIC_TO_LATIN)
+
+# Nominal and adjectival endings, longest first
+RU_SUFFIXES = sorted({
+    'иями', 'ями', 'ами', 'иях', 'ях', 'ах', 'ией', 'ии', 'ия', 'ий', 'ов', 'ев',
+    'ам', 'ям', 'ью', 'ье', 'ьи', 'ья', 'ими', 'ыми', 'его', 'ого', 'ему', 'ому',
+    'ее', 'ие', 'ые', 'ое', 'ей', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых',
+    'ую', 'юю', 'ая', 'яя', 'ою', 'ею', 'ться', 'тся', 'ть',
+    'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю', 'я'
+}, key=len, reverse=True)
+RU_MIN_STEM = 3
+
+# Uzbek suffixes are stripped group by group: case, possessive, plural
+UZ_SUFFIX_GROUPS = (
+    ('ning', 'dagi', 'dan', 'tan', 'da', 'ta', 'ga', 'ka', 'qa', 'ni', 'gi'),
+    ('ingiz', 'imiz', 'lari', 'ngiz', 'miz', 'si', 'im', 'ing', 'i'),
+    ('lar',),
+)
+UZ_MIN_STEM = 3
+
+def fold(text, lang):
+    """Case fold and normalize a text for one language"""
+    text = APOSTROPHES_RE.sub('', text.casefold())
+    if lang == 'uz':
+        return text.translate(UZ_TRANSLITERATION)
+    if lang == 'ru':
+        return text.replace('ё', 'е')
+    # Strip accents from Latin text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def _stem_ru(word):
+    for suffix in RU_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= RU_MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+def _stem_uz(word):
+    for group in UZ_SUFFIX_GROUPS:
+        for suffix in group:
+            if word.endswith(suffix) and len(word) - len(suffix) >= UZ_MIN_STEM:
+                word = word[:-len(suffix)]
+                break
+    return word
+
+def _stem_en(word):
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    for suffix in ('ing', 'ed'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    if word.endswith('es') and word[:-2].endswith(('s', 'x', 'z', 'ch', 'sh')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')) and len(word) > 3:
+        return word[:-1]
+    return word
+
+STEMMERS = {
+    'ru': _stem_ru,
+    'uz': _stem_uz,
+    'en': _stem_en
+}
+
+def analyze(text, lang):
+    """Split a text into folded, stemmed search terms"""
+    if not text:
+        return []
+    stem = STEMMERS[lang]
+    return [stem(token) for token in TOKEN_RE.findall(fold(text, lang))]
+
+def analyze_text(text, lang):
+    """Analyzed form of a column value, as stored in the full-text index"""
+    return ' '.join(analyze(text, lang))
+
+def _matches(word, terms, lang):
+    return any(stem.startswith(term) for stem in analyze(word, lang) for term in terms)
+
+def highlight(text, terms, lang, size=16, mark=('<mark>', '</mark>'), ellipsis='…'):
+    """
+    Snippet of the original text around the first word matching the query terms
+
+    Args:
+        text: Original column value
+        terms: Analyzed query terms (matched as prefixes, like the index query)
+        lang: Language of the column
+        size: Maximum number of words in the snippet
+
+    Returns:
+        HTML snippet: the text escaped, matches wrapped in mark tags; None without a match
+    """
+    if not text or not terms:
+        return None
+
+    words = list(WORD_RE.finditer(text))
+    hits = {i for i, word in enumerate(words) if _matches(word.group(), terms, lang)}
+    if not hits:
+        return None
+
+    first = max(0, min(hits) - size // 4)
+    last = min(len(words), first + size)
+
+    parts = []
+    position = words[first].start()
+    for i in range(first, last):
+        word = words[i]
+        parts.append(html.escape(text[position:word.start()]))
+        word_html = html.escape(word.group())
+        parts.append(f'{mark[0]}{word_html}{mark[1]}' if i in hits else word_html)
+        position = word.end()
+
+    snippet = ''.join(parts)
+    if first > 0:
+        snippet = ellipsis + snippet
+    if last < len(words):
+        snippet += ellipsis
+    return snippet
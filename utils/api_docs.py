@@ -0,0 +1,1027 @@
+"""
+Content of the API documentation: the HTML page at /docs and the OpenAPI
+specification at /api/swagger.json. Both are serialized and compressed once
+when the application is created (see create_app).
+"""
+
+# Swagger documentation page
+DOCS_HTML = '''
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Veterans Association API Documentation</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
+                .container { background: white; padding: 30px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+                h1 { color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
+                h2 { color: #34495e; margin-top: 30px; }
+                .endpoint { background: #ecf0f1; padding: 15px; margin: 10px 0; border-radius: 5px; }
+                .method { display: inline-block; padding: 5px 10px; border-radius: 3px; font-weight: bold; }
+                .get { background: #27ae60; color: white; }
+                .post { background: #e74c3c; color: white; }
+                .put { background: #f39c12; color: white; }
+                .delete { background: #e74c3c; color: white; }
+                .auth { color: #e67e22; font-weight: bold; }
+                code { background: #34495e; color: white; padding: 2px 5px; border-radius: 3px; }
+                .json-spec { background: #2c3e50; color: #ecf0f1; padding: 20px; border-radius: 5px; overflow: auto; }
+                .btn { background: #3498db; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <h1>Veterans Association API Documentation</h1>
+                <p>Complete REST API for managing laws, news, comrades search, and file uploads.</p>
+                <p><strong>Base URL:</strong> <code>/api</code></p>
+                
+                <p><a href="/api/swagger.json" class="btn">View OpenAPI 3.0 Specification</a></p>
+                
+                <h2>Authentication</h2>
+                <div class="endpoint">
+                    <span class="method post">POST</span> <code>/auth/login</code>
+                    <p>Login with username/password to get JWT token</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method post">POST</span> <code>/auth/logout</code> <span class="auth">[Auth Required]</span>
+                    <p>Logout and invalidate token</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/auth/verify</code> <span class="auth">[Auth Required]</span>
+                    <p>Verify token validity</p>
+                </div>
+
+                <h2>Laws Management</h2>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/laws</code>
+                    <p>Get all laws with filtering (category, full-text search, pagination, lang)</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/laws/categories</code>
+                    <p>Get law categories with the number of laws in each</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/laws/{id}</code>
+                    <p>Get specific law by ID</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method post">POST</span> <code>/laws</code> <span class="auth">[Auth Required]</span>
+                    <p>Create new law with multilingual support</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method put">PUT</span> <code>/laws/{id}</code> <span class="auth">[Auth Required]</span>
+                    <p>Update existing law</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method delete">DELETE</span> <code>/laws/{id}</code> <span class="auth">[Auth Required]</span>
+                    <p>Delete law</p>
+                </div>
+
+                <h2>News Management</h2>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/news</code>
+                    <p>Get all news with filtering, sorting, and pagination (content only with include=content)</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/news/feed.xml</code>, <code>/news/feed.json</code>
+                    <p>Latest news as RSS or JSON Feed</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/news/{id}</code>
+                    <p>Get specific news by ID</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method post">POST</span> <code>/news</code> <span class="auth">[Auth Required]</span>
+                    <p>Create new news with multilingual support</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method put">PUT</span> <code>/news/{id}</code> <span class="auth">[Auth Required]</span>
+                    <p>Update existing news</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method delete">DELETE</span> <code>/news/{id}</code> <span class="auth">[Auth Required]</span>
+                    <p>Delete news</p>
+                </div>
+
+                <h2>Comrades Search</h2>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/comrades</code>
+                    <p>Search comrades with filters (name, unit, region, years, rank)</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/comrades/{id}</code>
+                    <p>Get specific comrade by ID</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method post">POST</span> <code>/comrades</code>
+                    <p>Add new comrade information</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method put">PUT</span> <code>/comrades/{id}</code> <span class="auth">[Auth Required]</span>
+                    <p>Update comrade information</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method delete">DELETE</span> <code>/comrades/{id}</code> <span class="auth">[Auth Required]</span>
+                    <p>Delete comrade information</p>
+                </div>
+
+                <h2>File Management</h2>
+                <div class="endpoint">
+                    <span class="method post">POST</span> <code>/files/upload</code> <span class="auth">[Auth Required]</span>
+                    <p>Upload PDF or image files</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method post">POST</span> <code>/files/sessions</code> <span class="auth">[Auth Required]</span>
+                    <p>Start a resumable upload; send chunks with PUT <code>/files/sessions/{id}?offset=N</code>, then POST <code>/files/sessions/{id}/complete</code></p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/files/uploads/{filename}</code>
+                    <p>Download a file; images also resized with ?size=thumb|md|lg</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/files</code> <span class="auth">[Auth Required]</span>
+                    <p>List uploaded files with filtering</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method get">GET</span> <code>/files/{id}</code>
+                    <p>Get file metadata by ID</p>
+                </div>
+                <div class="endpoint">
+                    <span class="method delete">DELETE</span> <code>/files/{id}</code> <span class="auth">[Auth Required]</span>
+                    <p>Delete file and metadata</p>
+                </div>
+
+                <h2>Example Usage</h2>
+                <h3>Login:</h3>
+                <pre><code>curl -X POST http://localhost:5000/api/auth/login \\
+  -H "Content-Type: application/json" \\
+  -d '{"username":"admin","password":"admin"}'</code></pre>
+
+                <h3>Get Laws:</h3>
+                <pre><code>curl http://localhost:5000/api/laws?limit=10&category=федеральный</code></pre>
+
+                <h3>Create News (with token):</h3>
+                <pre><code>curl -X POST http://localhost:5000/api/news \\
+  -H "Authorization: Bearer &lt;token&gt;" \\
+  -H "Content-Type: application/json" \\
+  -d '{"title": {"ru":"Новость","uz":"Yangilik","en":"News"}, ...}'</code></pre>
+
+                <p><strong>Default Admin:</strong> username: <code>admin</code>, password: <code>admin</code></p>
+            </div>
+        </body>
+        </html>
+        '''
+
+# OpenAPI specification
+OPENAPI_SPEC = {
+    "openapi": "3.0.0",
+    "info": {
+        "title": "Veterans Association API",
+        "description": "API для Ассоциации Ветеранов - управление законами, новостями, поиск сослуживцев и файлы",
+        "version": "1.0.0"
+    },
+    "servers": [
+        {"url": "/api", "description": "API server"}
+    ],
+    "components": {
+        "securitySchemes": {
+            "Bearer": {
+                "type": "http",
+                "scheme": "bearer",
+                "bearerFormat": "JWT",
+                "description": "JWT token for authentication"
+            }
+        },
+        "parameters": {
+            "Lang": {
+                "name": "lang",
+                "in": "query",
+                "schema": {"type": "string", "enum": ["ru", "uz", "en", "auto"]},
+                "description": "Return text fields as plain strings in one language; auto picks it from Accept-Language. Without it all languages are returned"
+            }
+        },
+        "responses": {
+            "NotModified": {"description": "Not modified since the ETag sent in If-None-Match (or the date in If-Modified-Since)"}
+        },
+        "schemas": {
+            "MultiLangText": {
+                "type": "object",
+                "properties": {
+                    "ru": {"type": "string", "description": "Russian text"},
+                    "uz": {"type": "string", "description": "Uzbek text"},
+                    "en": {"type": "string", "description": "English text"}
+                },
+                "required": ["ru", "uz", "en"]
+            },
+            "Law": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "title": {"$ref": "#/components/schemas/MultiLangText"},
+                    "description": {"$ref": "#/components/schemas/MultiLangText"},
+                    "category": {"$ref": "#/components/schemas/MultiLangText"},
+                    "categoryId": {"type": "integer", "nullable": True},
+                    "date": {"type": "string", "format": "date"},
+                    "pdfUrl": {"type": "string", "nullable": True},
+                    "createdAt": {"type": "string", "format": "date-time"},
+                    "updatedAt": {"type": "string", "format": "date-time"},
+                    "lang": {"type": "string", "description": "Language of the text fields, only with ?lang (they are then plain strings)"},
+                    "highlight": {"type": "string", "nullable": True, "description": "HTML snippet with <mark> around the matches, only in full-text search results"},
+                    "documentHits": {
+                        "type": "array",
+                        "description": "Pages of the law's PDF that match, only in full-text search results",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "page": {"type": "integer"},
+                                "highlight": {"type": "string"}
+                            }
+                        }
+                    }
+                }
+            },
+            "LawCategory": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "name": {"$ref": "#/components/schemas/MultiLangText"},
+                    "lawCount": {"type": "integer"},
+                    "lang": {"type": "string"}
+                }
+            },
+            "News": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "title": {"$ref": "#/components/schemas/MultiLangText"},
+                    "content": {"$ref": "#/components/schemas/MultiLangText"},
+                    "summary": {"$ref": "#/components/schemas/MultiLangText"},
+                    "date": {"type": "string", "format": "date"},
+                    "imageUrl": {"type": "string", "nullable": True},
+                    "createdAt": {"type": "string", "format": "date-time"},
+                    "updatedAt": {"type": "string", "format": "date-time"},
+                    "lang": {"type": "string", "description": "Language of the text fields, only with ?lang (they are then plain strings)"},
+                    "highlight": {"type": "string", "nullable": True, "description": "HTML snippet with <mark> around the matches, only in full-text search results"}
+                }
+            },
+            "Comrade": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "firstName": {"type": "string"},
+                    "lastName": {"type": "string"},
+                    "middleName": {"type": "string", "nullable": True},
+                    "unit": {"type": "string"},
+                    "region": {"type": "string"},
+                    "yearOfServiceFrom": {"type": "integer"},
+                    "yearOfServiceTo": {"type": "integer", "nullable": True},
+                    "rank": {"type": "string", "nullable": True},
+                    "photoUrl": {"type": "string", "nullable": True},
+                    "contactInfo": {"type": "object"},
+                    "additionalInfo": {"type": "string", "nullable": True},
+                    "isVerified": {"type": "boolean"},
+                    "createdAt": {"type": "string", "format": "date-time"},
+                    "updatedAt": {"type": "string", "format": "date-time"}
+                }
+            },
+            "File": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "filename": {"type": "string"},
+                    "originalName": {"type": "string"},
+                    "url": {"type": "string"},
+                    "type": {"type": "string", "enum": ["pdf", "image"]},
+                    "category": {"type": "string"},
+                    "size": {"type": "integer"},
+                    "optimizedSize": {"type": "integer", "nullable": True, "description": "Size of the optimized copy served for images with IMAGE_OPTIMIZE"},
+                    "sha256": {"type": "string", "description": "Content hash; uploads of the same content share one stored file"},
+                    "refCount": {"type": "integer", "description": "Number of uploads of this content"},
+                    "textStatus": {"type": "string", "nullable": True, "description": "PDF text extraction: pending, done, failed or unavailable"},
+                    "sizes": {
+                        "type": "object",
+                        "description": "Resized image copies available as ?size=<name>, with their dimensions",
+                        "additionalProperties": {
+                            "type": "object",
+                            "properties": {
+                                "width": {"type": "integer"},
+                                "height": {"type": "integer"}
+                            }
+                        }
+                    },
+                    "uploadedAt": {"type": "string", "format": "date-time"}
+                }
+            },
+            "UploadSession": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "filename": {"type": "string"},
+                    "type": {"type": "string", "enum": ["pdf", "image"]},
+                    "category": {"type": "string"},
+                    "size": {"type": "integer"},
+                    "offset": {"type": "integer", "description": "Bytes received so far; the next chunk starts here"},
+                    "createdAt": {"type": "string", "format": "date-time"},
+                    "expiresAt": {"type": "string", "format": "date-time"}
+                }
+            },
+            "LoginRequest": {
+                "type": "object",
+                "properties": {
+                    "username": {"type": "string"},
+                    "password": {"type": "string"}
+                },
+                "required": ["username", "password"]
+            },
+            "Error": {
+                "type": "object",
+                "properties": {
+                    "error": {"type": "string"},
+                    "message": {"type": "string"},
+                    "timestamp": {"type": "string", "format": "date-time"}
+                }
+            }
+        }
+    },
+    "paths": {
+        "/auth/login": {
+            "post": {
+                "tags": ["Authentication"],
+                "summary": "Login user",
+                "description": "Authenticate user and return JWT token",
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/LoginRequest"}
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {
+                        "description": "Login successful",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "token": {"type": "string"},
+                                        "user": {"type": "object"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "401": {
+                        "description": "Invalid credentials",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Error"}
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        "/auth/logout": {
+            "post": {
+                "tags": ["Authentication"],
+                "summary": "Logout user",
+                "description": "Deactivate JWT token",
+                "security": [{"Bearer": []}],
+                "responses": {
+                    "204": {"description": "Logout successful"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/auth/verify": {
+            "get": {
+                "tags": ["Authentication"],
+                "summary": "Verify token",
+                "description": "Verify JWT token validity",
+                "security": [{"Bearer": []}],
+                "responses": {
+                    "200": {
+                        "description": "Token is valid",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "valid": {"type": "boolean"},
+                                        "user": {"type": "object"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "401": {"description": "Token invalid"}
+                }
+            }
+        },
+        "/laws": {
+            "get": {
+                "tags": ["Laws"],
+                "summary": "Get all laws",
+                "description": "Get all laws with optional filtering. Responses carry an ETag and Last-Modified for conditional requests",
+                "parameters": [
+                    {"name": "category", "in": "query", "schema": {"type": "string"}, "description": "Filter by category name (substring in any language)"},
+                    {"name": "categoryId", "in": "query", "schema": {"type": "integer"}, "description": "Filter by category ID (see /laws/categories)"},
+                    {"name": "search", "in": "query", "schema": {"type": "string"}, "description": "Full-text search in title, description and the text of the law's PDF; results get highlight and documentHits"},
+                    {"name": "sortBy", "in": "query", "schema": {"type": "string", "enum": ["date", "relevance"], "default": "date"}, "description": "relevance applies to search results"},
+                    {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 50}, "description": "Number of results"},
+                    {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}, "description": "Offset for pagination"},
+                    {"$ref": "#/components/parameters/Lang"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "List of laws",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "laws": {"type": "array", "items": {"$ref": "#/components/schemas/Law"}},
+                                        "total": {"type": "integer"},
+                                        "limit": {"type": "integer"},
+                                        "offset": {"type": "integer"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "400": {"description": "Invalid lang or categoryId"}
+                }
+            },
+            "post": {
+                "tags": ["Laws"],
+                "summary": "Create law",
+                "description": "Create new law",
+                "security": [{"Bearer": []}],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "title": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "description": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "category": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "date": {"type": "string", "format": "date"},
+                                    "pdfUrl": {"type": "string"}
+                                },
+                                "required": ["title", "description", "category", "date"]
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "201": {
+                        "description": "Law created",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Law"}
+                            }
+                        }
+                    },
+                    "400": {"description": "Validation error"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/laws/categories": {
+            "get": {
+                "tags": ["Laws"],
+                "summary": "Get law categories",
+                "description": "Categories that have laws, with the number of laws in each, sorted by name",
+                "parameters": [{"$ref": "#/components/parameters/Lang"}],
+                "responses": {
+                    "200": {
+                        "description": "List of categories",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "categories": {"type": "array", "items": {"$ref": "#/components/schemas/LawCategory"}},
+                                        "total": {"type": "integer"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "400": {"description": "Invalid lang"}
+                }
+            }
+        },
+        "/laws/{id}": {
+            "get": {
+                "tags": ["Laws"],
+                "summary": "Get law by ID",
+                "parameters": [
+                    {"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}},
+                    {"$ref": "#/components/parameters/Lang"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Law details",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/Law"}
+                            }
+                        }
+                    },
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "400": {"description": "Invalid lang"},
+                    "404": {"description": "Law not found"}
+                }
+            },
+            "put": {
+                "tags": ["Laws"],
+                "summary": "Update law",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "title": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "description": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "category": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "date": {"type": "string", "format": "date"},
+                                    "pdfUrl": {"type": "string"}
+                                }
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {"description": "Law updated"},
+                    "404": {"description": "Law not found"},
+                    "401": {"description": "Unauthorized"}
+                }
+            },
+            "delete": {
+                "tags": ["Laws"],
+                "summary": "Delete law",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
+                "responses": {
+                    "204": {"description": "Law deleted"},
+                    "404": {"description": "Law not found"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/news": {
+            "get": {
+                "tags": ["News"],
+                "summary": "Get all news",
+                "description": "Get all news with optional filtering and sorting. Items are returned without content unless include=content. Responses carry an ETag and Last-Modified for conditional requests",
+                "parameters": [
+                    {"name": "search", "in": "query", "schema": {"type": "string"}, "description": "Full-text search in title, summary and content; results get highlight"},
+                    {"name": "dateFrom", "in": "query", "schema": {"type": "string", "format": "date"}},
+                    {"name": "dateTo", "in": "query", "schema": {"type": "string", "format": "date"}},
+                    {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 20}},
+                    {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}},
+                    {"name": "sortBy", "in": "query", "schema": {"type": "string", "enum": ["date", "title", "relevance"], "default": "date"}, "description": "relevance applies to search results"},
+                    {"name": "sortOrder", "in": "query", "schema": {"type": "string", "enum": ["asc", "desc"], "default": "desc"}},
+                    {"name": "include", "in": "query", "schema": {"type": "string", "enum": ["content"]}, "description": "include=content adds the full text of each item"},
+                    {"$ref": "#/components/parameters/Lang"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "List of news",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "news": {"type": "array", "items": {"$ref": "#/components/schemas/News"}},
+                                        "total": {"type": "integer"},
+                                        "limit": {"type": "integer"},
+                                        "offset": {"type": "integer"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "400": {"description": "Invalid lang"}
+                }
+            },
+            "post": {
+                "tags": ["News"],
+                "summary": "Create news",
+                "security": [{"Bearer": []}],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "title": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "content": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "summary": {"$ref": "#/components/schemas/MultiLangText"},
+                                    "date": {"type": "string", "format": "date"},
+                                    "imageUrl": {"type": "string"}
+                                },
+                                "required": ["title", "content", "summary", "date"]
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "201": {"description": "News created"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/news/feed.{format}": {
+            "get": {
+                "tags": ["News"],
+                "summary": "News feed",
+                "description": "Latest news as RSS 2.0 (feed.xml) or JSON Feed 1.1 (feed.json), in Russian unless lang is set",
+                "parameters": [
+                    {"name": "format", "in": "path", "required": True, "schema": {"type": "string", "enum": ["xml", "json"]}},
+                    {"$ref": "#/components/parameters/Lang"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Feed",
+                        "content": {
+                            "application/rss+xml": {"schema": {"type": "string"}},
+                            "application/feed+json": {"schema": {"type": "object"}}
+                        }
+                    },
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "400": {"description": "Invalid lang"}
+                }
+            }
+        },
+        "/news/{id}": {
+            "get": {
+                "tags": ["News"],
+                "summary": "Get news by ID",
+                "description": "Always includes content",
+                "parameters": [
+                    {"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}},
+                    {"$ref": "#/components/parameters/Lang"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "News details",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/News"}
+                            }
+                        }
+                    },
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "400": {"description": "Invalid lang"},
+                    "404": {"description": "News not found"}
+                }
+            },
+            "put": {
+                "tags": ["News"],
+                "summary": "Update news",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
+                "responses": {
+                    "200": {"description": "News updated"},
+                    "401": {"description": "Unauthorized"}
+                }
+            },
+            "delete": {
+                "tags": ["News"],
+                "summary": "Delete news",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
+                "responses": {
+                    "204": {"description": "News deleted"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/comrades": {
+            "get": {
+                "tags": ["Comrades"],
+                "summary": "Search comrades",
+                "parameters": [
+                    {"name": "name", "in": "query", "schema": {"type": "string"}},
+                    {"name": "unit", "in": "query", "schema": {"type": "string"}},
+                    {"name": "region", "in": "query", "schema": {"type": "string"}},
+                    {"name": "yearFrom", "in": "query", "schema": {"type": "integer"}},
+                    {"name": "yearTo", "in": "query", "schema": {"type": "integer"}},
+                    {"name": "rank", "in": "query", "schema": {"type": "string"}},
+                    {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 50}},
+                    {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}}
+                ],
+                "responses": {
+                    "200": {"description": "Search results"}
+                }
+            },
+            "post": {
+                "tags": ["Comrades"],
+                "summary": "Add comrade",
+                "responses": {
+                    "201": {"description": "Comrade added"}
+                }
+            }
+        },
+        "/comrades/{id}": {
+            "get": {
+                "tags": ["Comrades"],
+                "summary": "Get comrade by ID",
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
+                "responses": {
+                    "200": {"description": "Comrade details"},
+                    "404": {"description": "Comrade not found"}
+                }
+            },
+            "put": {
+                "tags": ["Comrades"],
+                "summary": "Update comrade",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
+                "responses": {
+                    "200": {"description": "Comrade updated"},
+                    "401": {"description": "Unauthorized"}
+                }
+            },
+            "delete": {
+                "tags": ["Comrades"],
+                "summary": "Delete comrade",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}],
+                "responses": {
+                    "204": {"description": "Comrade deleted"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/files/upload": {
+            "post": {
+                "tags": ["Files"],
+                "summary": "Upload file",
+                "security": [{"Bearer": []}],
+                "requestBody": {
+                    "content": {
+                        "multipart/form-data": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "file": {"type": "string", "format": "binary"},
+                                    "type": {"type": "string", "enum": ["pdf", "image"]},
+                                    "category": {"type": "string", "enum": ["law", "news", "photo", "other"]}
+                                },
+                                "required": ["file", "type"]
+                            }
+                        }
+                    }
+                },
+                "description": "Uploading content that is already stored returns the existing file with refCount increased",
+                "responses": {
+                    "201": {
+                        "description": "File stored",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/File"}
+                            }
+                        }
+                    },
+                    "400": {"description": "Invalid file"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/files/sessions": {
+            "post": {
+                "tags": ["Files"],
+                "summary": "Start resumable upload",
+                "description": "Create an upload session; send the file in chunks with PUT /files/sessions/{session_id}, then complete it",
+                "security": [{"Bearer": []}],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "filename": {"type": "string"},
+                                    "size": {"type": "integer", "description": "Total size in bytes"},
+                                    "type": {"type": "string", "enum": ["pdf", "image"]},
+                                    "category": {"type": "string", "enum": ["law", "news", "photo", "other"]}
+                                },
+                                "required": ["filename", "size", "type"]
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "201": {
+                        "description": "Upload session",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/UploadSession"}
+                            }
+                        }
+                    },
+                    "400": {"description": "Invalid file name, type or size"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/files/sessions/{session_id}": {
+            "get": {
+                "tags": ["Files"],
+                "summary": "Get upload session",
+                "description": "offset tells where to resume after an interrupted chunk",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "session_id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                "responses": {
+                    "200": {
+                        "description": "Upload session",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/UploadSession"}
+                            }
+                        }
+                    },
+                    "401": {"description": "Unauthorized"},
+                    "404": {"description": "Session not found or expired"}
+                }
+            },
+            "put": {
+                "tags": ["Files"],
+                "summary": "Upload chunk",
+                "description": "Append the raw request body at offset, which must equal the session's current offset",
+                "security": [{"Bearer": []}],
+                "parameters": [
+                    {"name": "session_id", "in": "path", "required": True, "schema": {"type": "string"}},
+                    {"name": "offset", "in": "query", "required": True, "schema": {"type": "integer"}}
+                ],
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/octet-stream": {
+                            "schema": {"type": "string", "format": "binary"}
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {
+                        "description": "Upload session with the new offset",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/UploadSession"}
+                            }
+                        }
+                    },
+                    "400": {"description": "Missing offset or chunk past the declared size"},
+                    "401": {"description": "Unauthorized"},
+                    "404": {"description": "Session not found or expired"},
+                    "409": {"description": "Offset mismatch; the response carries the offset to continue from"}
+                }
+            },
+            "delete": {
+                "tags": ["Files"],
+                "summary": "Cancel upload session",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "session_id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                "responses": {
+                    "204": {"description": "Session cancelled"},
+                    "401": {"description": "Unauthorized"},
+                    "404": {"description": "Session not found or expired"}
+                }
+            }
+        },
+        "/files/sessions/{session_id}/complete": {
+            "post": {
+                "tags": ["Files"],
+                "summary": "Complete resumable upload",
+                "description": "Store the received file and end the session",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "session_id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                "responses": {
+                    "201": {
+                        "description": "File stored",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/File"}
+                            }
+                        }
+                    },
+                    "401": {"description": "Unauthorized"},
+                    "404": {"description": "Session not found or expired"},
+                    "409": {"description": "Upload incomplete; the response carries the offset received so far"}
+                }
+            }
+        },
+        "/files/uploads/{filename}": {
+            "get": {
+                "tags": ["Files"],
+                "summary": "Download file",
+                "description": "Serve a stored file; supports Range requests and conditional GET. Images can be requested resized, as WebP when the Accept header allows it and JPEG otherwise; the original is served until the resized copies are ready",
+                "parameters": [
+                    {"name": "filename", "in": "path", "required": True, "schema": {"type": "string"}},
+                    {"name": "size", "in": "query", "schema": {"type": "string", "enum": ["thumb", "md", "lg"]}, "description": "Resized image copy"}
+                ],
+                "responses": {
+                    "200": {"description": "File content"},
+                    "206": {"description": "Requested byte range"},
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "400": {"description": "Invalid size"},
+                    "404": {"description": "File not found"}
+                }
+            }
+        },
+        "/files": {
+            "get": {
+                "tags": ["Files"],
+                "summary": "List files",
+                "security": [{"Bearer": []}],
+                "parameters": [
+                    {"name": "type", "in": "query", "schema": {"type": "string", "enum": ["pdf", "image"]}},
+                    {"name": "category", "in": "query", "schema": {"type": "string"}},
+                    {"name": "limit", "in": "query", "schema": {"type": "integer", "default": 50}},
+                    {"name": "offset", "in": "query", "schema": {"type": "integer", "default": 0}}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "File list",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "files": {"type": "array", "items": {"$ref": "#/components/schemas/File"}},
+                                        "total": {"type": "integer"},
+                                        "limit": {"type": "integer"},
+                                        "offset": {"type": "integer"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/files/{id}": {
+            "get": {
+                "tags": ["Files"],
+                "summary": "Get file metadata",
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                "responses": {
+                    "200": {
+                        "description": "File metadata",
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/File"}
+                            }
+                        }
+                    },
+                    "304": {"$ref": "#/components/responses/NotModified"},
+                    "404": {"description": "File not found"}
+                }
+            },
+            "delete": {
+                "tags": ["Files"],
+                "summary": "Delete file",
+                "security": [{"Bearer": []}],
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                "responses": {
+                    "204": {"description": "File deleted"},
+                    "401": {"description": "Unauthorized"}
+                }
+            }
+        },
+        "/metrics": {
+            "servers": [{"url": "/", "description": "Served outside /api"}],
+            "get": {
+                "tags": ["Monitoring"],
+                "summary": "Metrics",
+                "description": "Request, database and cache metrics of the worker process in Prometheus text format. Only registered with METRICS_ENABLED; requires METRICS_TOKEN as a Bearer token",
+                "security": [{"Bearer": []}],
+                "responses": {
+                    "200": {
+                        "description": "Metrics",
+                        "content": {
+                            "text/plain": {"schema": {"type": "string"}}
+                        }
+                    },
+                    "401": {"description": "Missing or wrong token, or no METRICS_TOKEN configured"},
+                    "404": {"description": "Metrics disabled"}
+                }
+            }
+        }
+    }
+}
\ No newline at end of file
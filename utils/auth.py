@@ -1,7 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, current_app, has_app_context
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from models.user import User
+from utils.metrics import CACHE_REQUESTS
+
+_lock = threading.Lock()
+
+# Cache entry marker for "not cached", None caches a user that does not exist
+_MISSING = object()
+
+class AuthUser:
+    """The authenticated user handed to route handlers (detached from the database session)"""
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'role': self.role
+        }
+
+class UserCache:
+    """Per-process LRU cache of user id -> AuthUser (None: no such user) with a TTL"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return _MISSING
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return _MISSING
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user_id, user, generation):
+        """Cache a lookup unless users were invalidated since it started (generation)"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[user_id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids=None):
+        """Drop the given users, or all of them"""
+        with self._lock:
+            self.generation += 1
+            if user_ids is None:
+                self._entries.clear()
+            for user_id in user_ids or ():
+                self._entries.pop(user_id, None)
+
+def get_user_cache(app):
+    """User cache of the application, or None when USER_CACHE_TTL is 0"""
+    if not app.config.get('USER_CACHE_TTL'):
+        return None
+    cache = app.extensions.get('user_cache')
+    if cache is None:
+        with _lock:
+            cache = app.extensions.get('user_cache')
+            if cache is None:
+                cache = UserCache(app.config.get('USER_CACHE_SIZE', 1024), app.config['USER_CACHE_TTL'])
+                app.extensions['user_cache'] = cache
+    return cache
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    changed = {obj.id for obj in session.new | session.dirty | session.deleted if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault('changed_users', set()).update(changed)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    changed = session.info.pop('changed_users', None)
+    if changed and has_app_context():
+        cache = current_app.extensions.get('user_cache')
+        if cache is not None:
+            cache.invalidate(changed)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_users', None)
+
+def load_user(user_id):
+    """User with the given id as AuthUser (cached), or None when it does not exist"""
+    cache = get_user_cache(current_app)
+    if cache is None:
+        user = User.query.get(user_id)
+        return AuthUser(user.id, user.username, user.role) if user else None
+
+    user = cache.get(user_id)
+    CACHE_REQUESTS.inc(cache='users', result='miss' if user is _MISSING else 'hit')
+    if user is _MISSING:
+        generation = cache.generation
+        record = User.query.get(user_id)
+        user = AuthUser(record.id, record.username, record.role) if record else None
+        cache.put(user_id, user, generation)
+    return user
+
+def current_auth_user():
+    """
+    User of the current token: taken from its signed claims with
+    JWT_TRUST_ROLE_CLAIM, otherwise looked up (cached)
+    """
+    claims = get_jwt()
+    if current_app.config.get('JWT_TRUST_ROLE_CLAIM') and 'role' in claims:
+        return AuthUser(get_jwt_identity(), claims.get('username'), claims['role'])
+    return load_user(get_jwt_identity())
 
 def token_required(f):
     """Decorator for routes that require authentication"""
@@ -9,8 +133,7 @@ def token_required(f):
     @jwt_required()
     def decorated(*args, **kwargs):
         try:
-            current_user_id = get_jwt_identity()
-            current_user = User.query.get(current_user_id)
+            current_user = current_auth_user()
             
             if not current_user:
                 return jsonify({
@@ -33,8 +156,7 @@ def admin_required(f):
     @jwt_required()
     def decorated(*args, **kwargs):
         try:
-            current_user_id = get_jwt_identity()
-            current_user = User.query.get(current_user_id)
+            current_user = current_auth_user()
             
             if not current_user:
                 return jsonify({
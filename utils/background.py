@@ -0,0 +1,44 @@
+"""
+Shared worker pool for work that must not block a request (PDF text
+extraction, image processing, ...). Tasks run inside an application context
+with their own database session.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+_lock = threading.Lock()
+
+def get_executor(app):
+    """Worker pool of the application, created on first use"""
+    executor = app.extensions.get('background_executor')
+    if executor is None:
+        with _lock:
+            executor = app.extensions.get('background_executor')
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=app.config.get('BACKGROUND_WORKERS', 2),
+                    thread_name_prefix='background'
+                )
+                app.extensions['background_executor'] = executor
+    return executor
+
+def submit(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the worker pool
+
+    Returns:
+        concurrent.futures.Future of the task
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                app.logger.exception('Background task %s failed', fn.__name__)
+                raise
+
+    return get_executor(app).submit(run)
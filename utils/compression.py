@@ -0,0 +1,160 @@
+"""
+Content-Encoding negotiation and compressed response bodies.
+
+init_compression() registers an after_request hook that compresses text
+responses (JSON, HTML, feeds) of at least COMPRESS_MIN_SIZE bytes with gzip
+(COMPRESS_GZIP_LEVEL) or brotli (COMPRESS_BR_LEVEL), whichever the client
+prefers. Streamed responses are compressed chunk by chunk as they are sent.
+
+Bodies that are served many times (the docs, cached lists, feeds) are kept as
+PrecompressedBody, compressed once at maximum level per encoding; the hook
+leaves responses that already carry a Content-Encoding alone.
+
+gzip is always available; brotli ('br') is offered when the optional brotli
+package is installed (pip install brotli).
+"""
+
+import gzip
+import hashlib
+import zlib
+from flask import request, current_app, make_response
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Encodings we can produce, preferred first when the client accepts several
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+def compress(data, encoding, level=None):
+    """Compress bytes with the given encoding at level (None: the maximum)"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if level is None else level)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f'Unsupported encoding: {encoding}')
+
+def _compress_stream(chunks, encoding, level):
+    """Compress an iterable of byte chunks, flushing after each so none is held back"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+def negotiate(encodings=ENCODINGS):
+    """Best of the encodings accepted by the client, or None for identity"""
+    accepted = request.accept_encodings
+    best = None
+    for encoding in encodings:
+        quality = accepted[encoding]
+        if quality and (best is None or quality > accepted[best]):
+            best = encoding
+    return best
+
+def _level(encoding):
+    return current_app.config['COMPRESS_BR_LEVEL' if encoding == 'br' else 'COMPRESS_GZIP_LEVEL']
+
+def _compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return False
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return False
+    return response.mimetype in current_app.config['COMPRESS_MIMETYPES']
+
+def compress_response(response):
+    """after_request hook: compress the body in the encoding negotiated with the client"""
+    if not current_app.config.get('COMPRESS_RESPONSES') or not _compressible(response):
+        return response
+
+    if response.is_streamed:
+        # Size unknown up front: always worth compressing
+        encoding = negotiate()
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.response = _compress_stream(response.iter_encoded(), encoding, _level(encoding))
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Length', None)
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = negotiate()
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.set_data(compress(data, encoding, _level(encoding)))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_compression(app):
+    """Compress the application's responses (see compress_response)"""
+    app.after_request(compress_response)
+
+class PrecompressedBody:
+    """
+    A response body that is served many times. Each encoding is compressed
+    once, at maximum level, the first time a client asks for it.
+    """
+
+    def __init__(self, data, content_type):
+        self.data = data
+        self.content_type = content_type
+        self.etag = hashlib.sha1(data).hexdigest()
+        self._encoded = {None: data}
+
+    def encoded(self, encoding):
+        """Body in the given encoding (None: identity)"""
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = compress(self.data, encoding)
+        return data
+
+    def _encoding(self):
+        config = current_app.config
+        if not config.get('COMPRESS_RESPONSES') or len(self.data) < config['COMPRESS_MIN_SIZE']:
+            return None
+        return negotiate()
+
+    def make_response(self):
+        """Response with the body in the encoding negotiated with the client; the caller adds validators"""
+        encoding = self._encoding()
+        response = make_response(self.encoded(encoding))
+        response.content_type = self.content_type
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def response(self, max_age=0):
+        """
+        Response for a body that never changes while the app runs, with a
+        strong ETag per encoding (304 when the client's copy is current)
+        """
+        encoding = self._encoding()
+        etag = f'{self.etag}-{encoding}' if encoding else self.etag
+
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+            response.vary.add('Accept-Encoding')
+        else:
+            response = self.make_response()
+        response.set_etag(etag)
+        response.cache_control.public = True
+        if max_age:
+            response.cache_control.max_age = max_age
+        else:
+            response.cache_control.no_cache = True
+        return response
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+RSS 2.0 and JSON Feed rendering for news.
+
+Feeds are rendered for every language at startup and when news are created,
+updated or deleted, and stored in the feeds table, so polling clients are
+answered from a single stored document (usually with 304 Not Modified).
+Links are built from SITE_URL; the same news always render the same bytes.
+"""
+
+import hashlib
+import json
+import mimetypes
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from email.utils import format_datetime
+from xml.etree import ElementTree
+from flask import current_app
+from models import db
+from models.feed import Feed
+from models.news import News
+from models.multilang import LANGUAGES
+
+FEED_TITLES = {
+    'ru': 'Ассоциация ветеранов - новости',
+    'uz': 'Veteranlar uyushmasi - yangiliklar',
+    'en': 'Veterans Association - News'
+}
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+ElementTree.register_namespace('atom', ATOM_NS)
+
+def feed_name(lang, fmt):
+    """Stored feed name, e.g. news-ru.xml"""
+    return f'news-{lang}.{fmt}'
+
+def _site_url():
+    return (current_app.config.get('SITE_URL') or 'http://localhost:5000').rstrip('/')
+
+def _feed_url(site_url, fmt, lang):
+    parts = urlsplit(site_url)
+    adapter = current_app.url_map.bind(parts.netloc, script_name=parts.path or '/',
+                                       url_scheme=parts.scheme)
+    return adapter.build('news.get_news_feed', {'fmt': fmt, 'lang': lang}, force_external=True)
+
+def _utc(value):
+    return value.replace(tzinfo=timezone.utc)
+
+def _published(news):
+    return datetime(news.date.year, news.date.month, news.date.day, tzinfo=timezone.utc)
+
+def render_rss(items, lang, feed_url, site_url):
+    """Render an RSS 2.0 document for the given news"""
+    rss = ElementTree.Element('rss', {'version': '2.0'})
+    channel = ElementTree.SubElement(rss, 'channel')
+    ElementTree.SubElement(channel, 'title').text = FEED_TITLES[lang]
+    ElementTree.SubElement(channel, 'link').text = site_url
+    ElementTree.SubElement(channel, 'description').text = FEED_TITLES[lang]
+    ElementTree.SubElement(channel, 'language').text = lang
+    if items:
+        # Newest change among the items, so an unchanged feed renders identically
+        last_change = max(news.updated_at for news in items)
+        ElementTree.SubElement(channel, 'lastBuildDate').text = format_datetime(_utc(last_change))
+    ElementTree.SubElement(channel, f'{{{ATOM_NS}}}link',
+                           {'href': feed_url, 'rel': 'self', 'type': 'application/rss+xml'})
+
+    for news in items:
+        item = ElementTree.SubElement(channel, 'item')
+        ElementTree.SubElement(item, 'title').text = news.multilang_value('title', lang)
+        ElementTree.SubElement(item, 'link').text = f'{site_url}/news/{news.id}'
+        ElementTree.SubElement(item, 'guid', {'isPermaLink': 'false'}).text = f'news-{news.id}'
+        ElementTree.SubElement(item, 'description').text = news.multilang_value('summary', lang)
+        ElementTree.SubElement(item, 'pubDate').text = format_datetime(_published(news))
+        if news.image_url:
+            image_type = mimetypes.guess_type(news.image_url)[0] or 'image/jpeg'
+            ElementTree.SubElement(item, 'enclosure', {'url': news.image_url, 'type': image_type, 'length': '0'})
+
+    return ElementTree.tostring(rss, encoding='unicode', xml_declaration=True)
+
+def render_json_feed(items, lang, feed_url, site_url):
+    """Render a JSON Feed 1.1 document for the given news"""
+    feed = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': FEED_TITLES[lang],
+        'home_page_url': site_url,
+        'feed_url': feed_url,
+        'language': lang,
+        'items': []
+    }
+    for news in items:
+        item = {
+            'id': f'news-{news.id}',
+            'url': f'{site_url}/news/{news.id}',
+            'title': news.multilang_value('title', lang),
+            'summary': news.multilang_value('summary', lang),
+            'date_published': _published(news).isoformat(),
+            'date_modified': _utc(news.updated_at).isoformat()
+        }
+        if news.image_url:
+            item['image'] = news.image_url
+        feed['items'].append(item)
+    return json.dumps(feed, ensure_ascii=False)
+
+def _store(name, content_type, body):
+    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+    feed = Feed.query.get(name)
+    if feed is None:
+        feed = Feed(name=name)
+        db.session.add(feed)
+    elif feed.etag == etag:
+        return feed
+    feed.content_type = content_type
+    feed.body = body
+    feed.etag = etag
+    feed.updated_at = datetime.utcnow()
+    return feed
+
+def rebuild_news_feeds():
+    """
+    Re-render the RSS and JSON feeds for every language from the latest news.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    size = current_app.config.get('FEED_SIZE', 20)
+    items = News.query.options(News.language_load_options(None, News.SUMMARY_FIELDS)) \
+        .order_by(News.date.desc(), News.id.desc()).limit(size).all()
+    site_url = _site_url()
+
+    for lang in LANGUAGES:
+        rss_url = _feed_url(site_url, 'xml', lang)
+        json_url = _feed_url(site_url, 'json', lang)
+        _store(feed_name(lang, 'xml'), 'application/rss+xml; charset=utf-8',
+               render_rss(items, lang, rss_url, site_url))
+        _store(feed_name(lang, 'json'), 'application/feed+json; charset=utf-8',
+               render_json_feed(items, lang, json_url, site_url))
@@ -0,0 +1,73 @@
+"""
+Password verification off the request threads.
+
+Password hashes (PBKDF2/scrypt) are slow on purpose. They are checked on a
+small dedicated pool, so a burst of logins keeps at most LOGIN_HASH_WORKERS
+cores busy and leaves the others to the rest of the traffic. Logins beyond
+LOGIN_HASH_QUEUE waiting checks are refused at once instead of piling up.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import check_password_hash
+from utils.metrics import counter, gauge, histogram
+
+HASH_SECONDS = histogram('login_password_hash_seconds', 'Time spent verifying a password hash',
+                         buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+HASH_WAIT_SECONDS = histogram('login_password_queue_seconds', 'Time a password check waited for a worker')
+HASH_IN_FLIGHT = gauge('login_password_checks_in_flight', 'Password checks queued or running')
+HASH_REJECTED = counter('login_password_checks_rejected', 'Password checks refused because the queue was full')
+
+_lock = threading.Lock()
+
+class HashPoolBusy(Exception):
+    """Too many password checks are already waiting"""
+
+class HashPool:
+    def __init__(self, workers, max_queue):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+
+    def check(self, password_hash, password):
+        """
+        Verify a password against its hash on the pool
+
+        Raises:
+            HashPoolBusy: the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            HASH_REJECTED.inc()
+            raise HashPoolBusy()
+        HASH_IN_FLIGHT.inc()
+        queued_at = time.perf_counter()
+
+        def run():
+            started_at = time.perf_counter()
+            HASH_WAIT_SECONDS.observe(started_at - queued_at)
+            try:
+                return check_password_hash(password_hash, password)
+            finally:
+                HASH_SECONDS.observe(time.perf_counter() - started_at)
+
+        try:
+            return self.executor.submit(run).result()
+        finally:
+            HASH_IN_FLIGHT.dec()
+            self._slots.release()
+
+def get_hash_pool(app):
+    """Password hashing pool of the application, created on first use"""
+    pool = app.extensions.get('hash_pool')
+    if pool is None:
+        with _lock:
+            pool = app.extensions.get('hash_pool')
+            if pool is None:
+                pool = HashPool(app.config.get('LOGIN_HASH_WORKERS', 2), app.config.get('LOGIN_HASH_QUEUE', 16))
+                app.extensions['hash_pool'] = pool
+    return pool
+
+def check_password(password_hash, password):
+    """check_password_hash on the bounded pool (see HashPool.check)"""
+    return get_hash_pool(current_app).check(password_hash, password)
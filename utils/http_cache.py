@@ -0,0 +1,79 @@
+"""
+HTTP validators (ETag / Last-Modified) and Cache-Control for read endpoints.
+
+Item ETags are derived from the table, id and updated_at of the row; list ETags
+from the change counters in table_versions plus the normalized query. Routes
+check the validators before loading or serializing anything:
+
+    etag, last_modified = list_validators(['news'])
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+    ...
+    return with_validators(jsonify(data), etag, last_modified), 200
+"""
+
+import hashlib
+from datetime import timezone
+from flask import request, current_app, make_response
+from models.table_version import TableVersion
+
+def _query_key():
+    """Normalized query string, plus the negotiated language header when relevant"""
+    args = sorted(request.args.items(multi=True))
+    key = '&'.join(f'{name}={value}' for name, value in args)
+    if (request.args.get('lang') or '').lower() == 'auto':
+        key += '|' + request.headers.get('Accept-Language', '')
+    return key
+
+def _make_etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def item_validators(table_name, item_id, updated_at):
+    """ETag and Last-Modified for a single row"""
+    etag = _make_etag(table_name, item_id, updated_at.isoformat() if updated_at else '', _query_key())
+    return etag, updated_at
+
+def list_validators(table_names):
+    """ETag and Last-Modified for a list built from the given tables"""
+    versions = TableVersion.get_versions(table_names)
+    parts = [f'{name}:{versions[name][0]}' for name in sorted(versions)]
+    timestamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    etag = _make_etag(request.path, *parts, _query_key())
+    return etag, max(timestamps) if timestamps else None
+
+def _utc(value):
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value.tzinfo is None else value
+
+def with_validators(response, etag, last_modified=None, private=False):
+    """Attach ETag, Last-Modified and Cache-Control to a response"""
+    # Weak validators: the same representation may be sent with different encodings
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = _utc(last_modified)
+
+    max_age = current_app.config.get('HTTP_CACHE_MAX_AGE', 0)
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def not_modified(etag, last_modified=None, private=False):
+    """
+    Return a 304 response when the client's cached copy is still current,
+    otherwise None. If-None-Match takes precedence over If-Modified-Since.
+    """
+    if request.if_none_match:
+        if not request.if_none_match.contains_weak(etag):
+            return None
+    elif not (last_modified and request.if_modified_since
+              and _utc(last_modified) <= request.if_modified_since):
+        return None
+
+    response = make_response('', 304)
+    return with_validators(response, etag, last_modified, private)
@@ -0,0 +1,34 @@
+from flask import request
+from models.multilang import LANGUAGES
+
+def resolve_language():
+    """
+    Resolve the response language from the `lang` query parameter.
+
+    `lang=ru|uz|en` selects the language explicitly, `lang=auto` negotiates it
+    from the Accept-Language header. Without `lang` all languages are returned.
+
+    Returns:
+        Language code or None for all languages
+
+    Raises:
+        ValueError: If the requested language is not supported
+    """
+    lang = request.args.get('lang')
+    if not lang:
+        return None
+
+    lang = lang.lower()
+    if lang == 'auto':
+        return request.accept_languages.best_match(LANGUAGES, default=LANGUAGES[0])
+
+    if lang not in LANGUAGES:
+        raise ValueError(f'lang must be one of: {", ".join(LANGUAGES)}, auto')
+
+    return lang
+
+def vary_on_language(response):
+    """Mark negotiated responses as varying on Accept-Language for caches"""
+    if (request.args.get('lang') or '').lower() == 'auto':
+        response.vary.add('Accept-Language')
+    return response
@@ -0,0 +1,225 @@
+"""
+Responsive image derivatives.
+
+After an image upload is committed, resized copies are generated on the worker
+pool for every size in DERIVATIVE_SIZES, in WebP and JPEG, and recorded in
+File.derivatives. GET /api/files/uploads/<filename>?size=thumb|md|lg serves
+them, choosing WebP when the client accepts it.
+
+With IMAGE_OPTIMIZE the same task also makes an optimized full-size copy
+(File.optimized): metadata stripped, capped to IMAGE_MAX_DIMENSION and
+re-encoded at IMAGE_QUALITY, PNG photos as JPEG, plus WebP when that is smaller
+still. The original URL serves it instead of the uploaded file.
+"""
+
+import io
+import os
+from flask import current_app
+from PIL import Image, ImageOps, features
+from sqlalchemy.orm.exc import StaleDataError
+from models import db
+from models.file import File
+from utils.background import submit
+from utils.storage import get_storage
+
+# Longest edge in pixels; images are never upscaled
+DERIVATIVE_SIZES = {
+    'thumb': 320,
+    'md': 800,
+    'lg': 1600
+}
+
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+
+MIMETYPES = {
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png'
+}
+
+# Metadata that is dropped by re-encoding (the ICC colour profile is kept)
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+
+def _formats():
+    return [name for name in DERIVATIVE_FORMATS if name != 'webp' or features.check('webp')]
+
+def _flatten(image):
+    """RGB version of the image, transparent areas on white (JPEG has no alpha)"""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+def derivative_filename(file_record, size, fmt):
+    """Name of a derivative next to its blob, e.g. <sha256>_thumb.webp"""
+    stem = os.path.basename(file_record.filename).rsplit('.', 1)[0]
+    return f'{stem}_{size}.{fmt}'
+
+def _encode(image, fmt, quality, icc_profile):
+    buffer = io.BytesIO()
+    options = {'icc_profile': icc_profile} if icc_profile else {}
+    if fmt == 'jpeg':
+        _flatten(image).save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True, **options)
+    elif fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=quality, method=4, **options)
+    else:
+        image.save(buffer, 'PNG', optimize=True, **options)
+    return buffer.getvalue()
+
+def _is_photo(image):
+    """Opaque with more colours than a palette holds, unlike screenshots and drawings"""
+    return image.mode == 'RGB' and image.getcolors(256) is None
+
+def optimize_image(file_record, source, source_format, info, storage):
+    """
+    Store the optimized full-size copy of an image
+
+    Args:
+        source: the decoded image, rotated and in RGB or RGBA
+        source_format, info: format and info of the uploaded file
+
+    Returns:
+        (variant, bytes of its smallest format), or (None, None) when
+        re-encoding gains nothing over the original
+    """
+    edge = current_app.config['IMAGE_MAX_DIMENSION']
+    quality = current_app.config['IMAGE_QUALITY']
+    image = source.copy()
+    image.thumbnail((edge, edge), Image.LANCZOS)
+
+    # Lossy JPEG for photos; screenshots, drawings and transparent images stay PNG
+    fallback = 'jpeg' if source_format == 'JPEG' or _is_photo(image) else 'png'
+    encoded = {fallback: _encode(image, fallback, quality, info.get('icc_profile'))}
+    if 'webp' in _formats():
+        encoded['webp'] = _encode(image, 'webp', quality, info.get('icc_profile'))
+
+    # A copy that is resized or drops metadata (e.g. GPS position) is kept even when larger
+    must_replace = image.size != source.size or any(key in info for key in METADATA_KEYS)
+    kept = {fmt: data for fmt, data in encoded.items() if must_replace or len(data) < file_record.size}
+    if 'webp' in kept and fallback in kept and len(kept['webp']) >= len(kept[fallback]):
+        del kept['webp']
+    if not kept:
+        return None, None
+
+    variant = {'width': image.width, 'height': image.height, 'formats': {}}
+    for fmt, data in kept.items():
+        filename = derivative_filename(file_record, 'opt', fmt)
+        storage.put(filename, io.BytesIO(data))
+        variant['formats'][fmt] = filename
+    return variant, min(len(data) for data in kept.values())
+
+def generate_image_derivatives(file_id):
+    """Create every size/format of a stored image and record them on the file"""
+    file_record = File.query.get(file_id)
+    if not file_record or file_record.file_type != 'image':
+        return
+
+    storage = get_storage()
+    derivatives = {}
+    optimized, optimized_size = None, None
+    try:
+        with storage.open(file_record.filename) as blob, Image.open(blob) as source:
+            source_format, info = source.format, dict(source.info)
+            animated = getattr(source, 'is_animated', False)
+
+            # Apply camera rotation before resizing; animations use their first frame
+            source = ImageOps.exif_transpose(source)
+            if source.mode not in ('RGB', 'RGBA'):
+                transparent = 'A' in source.getbands() or 'transparency' in source.info
+                source = source.convert('RGBA' if transparent else 'RGB')
+
+            # Animations are served as uploaded
+            if current_app.config['IMAGE_OPTIMIZE']:
+                if not animated:
+                    optimized, optimized_size = optimize_image(file_record, source, source_format, info, storage)
+                optimized_size = optimized_size or file_record.size
+
+            for size, edge in DERIVATIVE_SIZES.items():
+                image = source.copy()
+                image.thumbnail((edge, edge), Image.LANCZOS)
+                variant = {'width': image.width, 'height': image.height, 'formats': {}}
+                for fmt in _formats():
+                    pil_format, options = DERIVATIVE_FORMATS[fmt]
+                    filename = derivative_filename(file_record, size, fmt)
+                    output = image if fmt == 'webp' else _flatten(image)
+                    buffer = io.BytesIO()
+                    output.save(buffer, pil_format, **options)
+                    buffer.seek(0)
+                    storage.put(filename, buffer)
+                    variant['formats'][fmt] = filename
+                derivatives[size] = variant
+    except Exception as e:
+        current_app.logger.warning('Image derivatives failed for %s: %s', file_id, e)
+
+    # An empty mapping marks a failed image, so it is not retried on every start
+    file_record.set_derivatives(derivatives)
+    file_record.set_optimized(optimized)
+    file_record.optimized_size = optimized_size
+    try:
+        db.session.commit()
+    except StaleDataError:
+        # The file was deleted meanwhile; its derivatives are left to gc-uploads
+        db.session.rollback()
+
+def image_variants(file_record):
+    """Derivatives and the optimized copy of an image"""
+    variants = list(file_record.get_derivatives().values())
+    optimized = file_record.get_optimized()
+    if optimized:
+        variants.append(optimized)
+    return variants
+
+def remove_image_derivatives(file_record):
+    """Delete the derivative files and the optimized copy of an image"""
+    storage = get_storage()
+    for variant in image_variants(file_record):
+        for filename in variant['formats'].values():
+            storage.delete(filename)
+
+def _pick_format(variant, accept_mimetypes):
+    formats = variant['formats']
+    # WebP only when asked for explicitly; */* alone does not prove support
+    accepts_webp = any(mimetype == MIMETYPES['webp'] and quality > 0 for mimetype, quality in accept_mimetypes)
+    fallback = next((fmt for fmt in formats if fmt != 'webp'), None)
+    fmt = 'webp' if accepts_webp and 'webp' in formats else fallback
+    if fmt is None:
+        return None
+    return formats[fmt], MIMETYPES[fmt]
+
+def pick_derivative(file_record, size, accept_mimetypes):
+    """
+    Derivative to serve for ?size=, in the best format the client accepts
+
+    Returns:
+        (filename, mimetype), or None when the derivatives are not ready
+    """
+    variant = file_record.get_derivatives().get(size)
+    if not variant:
+        return None
+    return _pick_format(variant, accept_mimetypes)
+
+def pick_optimized(file_record, accept_mimetypes):
+    """
+    Optimized copy to serve instead of the original, or None when the
+    original is served (not smaller, or only as WebP and not accepted)
+    """
+    optimized = file_record.get_optimized()
+    if not optimized:
+        return None
+    return _pick_format(optimized, accept_mimetypes)
+
+def queue_image_derivatives(file_id):
+    """Schedule derivative generation for an uploaded image"""
+    return submit(generate_image_derivatives, file_id)
+
+def queue_pending_derivatives():
+    """Schedule derivatives for images uploaded before they existed or interrupted"""
+    file_ids = [file_id for (file_id,) in db.session.query(File.id).filter(
+        File.file_type == 'image',
+        File.derivatives.is_(None)
+    )]
+    return [queue_image_derivatives(file_id) for file_id in file_ids]
@@ -0,0 +1,92 @@
+"""
+Request and database instrumentation, exposed with the other metrics at /metrics.
+
+init_metrics() registers request hooks that record per-endpoint and
+per-blueprint latency, status codes, requests in flight and response sizes
+(as sent, after compression), plus SQLAlchemy engine events that time every
+statement and count statements and SQL time per request. Metrics are kept per
+worker process; scrape each worker, or run a single process per address.
+"""
+
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.metrics import counter, gauge, histogram
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+REQUEST_SECONDS = histogram('http_request_duration_seconds', 'Request latency by endpoint',
+                            ['endpoint', 'method'])
+BLUEPRINT_SECONDS = histogram('http_blueprint_request_duration_seconds', 'Request latency by blueprint',
+                              ['blueprint'])
+REQUESTS = counter('http_requests', 'Requests by endpoint, method and status', ['endpoint', 'method', 'status'])
+IN_FLIGHT = gauge('http_requests_in_flight', 'Requests being handled by blueprint', ['blueprint'])
+RESPONSE_BYTES = histogram('http_response_size_bytes', 'Response body size by endpoint', ['endpoint'],
+                           buckets=SIZE_BUCKETS)
+QUERY_SECONDS = histogram('db_query_duration_seconds', 'SQL statement execution time', buckets=QUERY_BUCKETS)
+REQUEST_QUERIES = histogram('http_request_db_queries', 'SQL statements per request by endpoint', ['endpoint'],
+                            buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+REQUEST_QUERY_SECONDS = histogram('http_request_db_seconds', 'Time spent in SQL per request by endpoint',
+                                  ['endpoint'])
+
+def _labels():
+    # Unrouted requests (404, 405) share one label so bad URLs cannot add series
+    return request.endpoint or 'unmatched', request.blueprint or 'app'
+
+def _before_request():
+    g.metrics_started_at = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_query_seconds = 0.0
+    IN_FLIGHT.inc(blueprint=_labels()[1])
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    if response.content_length is not None:
+        RESPONSE_BYTES.observe(response.content_length, endpoint=_labels()[0])
+    return response
+
+def _teardown_request(error):
+    started_at = g.pop('metrics_started_at', None)
+    if started_at is None:
+        return
+    elapsed = time.perf_counter() - started_at
+    endpoint, blueprint = _labels()
+
+    IN_FLIGHT.dec(blueprint=blueprint)
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method)
+    BLUEPRINT_SECONDS.observe(elapsed, blueprint=blueprint)
+    # No status when the view raised past the error handlers
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=g.pop('metrics_status', 500))
+    REQUEST_QUERIES.observe(g.metrics_queries, endpoint=endpoint)
+    REQUEST_QUERY_SECONDS.observe(g.metrics_query_seconds, endpoint=endpoint)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started_at', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_started_at'].pop()
+    QUERY_SECONDS.observe(elapsed)
+    # Statements run by background workers are only timed globally
+    if has_request_context() and 'metrics_started_at' in g:
+        g.metrics_queries += 1
+        g.metrics_query_seconds += elapsed
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('metrics_started_at'):
+        context.connection.info['metrics_started_at'].pop()
+
+def init_metrics(app):
+    """Instrument the application's requests and all database engines"""
+    # Registered before other after_request hooks, so it runs after them
+    # and sees the final (compressed) response
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
\ No newline at end of file
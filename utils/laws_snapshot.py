@@ -0,0 +1,94 @@
+"""
+Read-optimized, in-process snapshot of the laws catalogue.
+
+The laws table is small and read far more often than written, so list and
+detail reads without a search are answered from an immutable snapshot holding
+every law already serialized (multilingual and per language), sorted by date,
+with a prebuilt category index.
+
+Writes in this process swap in a fresh snapshot right after commit. Other
+workers notice a change through the laws/law_categories counters in
+table_versions, which are compared on every read before the snapshot is used.
+"""
+
+import threading
+from types import MappingProxyType
+from flask import current_app
+from models.law import Law
+from models.law_category import LawCategory
+from models.multilang import LANGUAGES
+from models.table_version import TableVersion
+from utils.metrics import CACHE_REQUESTS
+
+SNAPSHOT_TABLES = ('laws', 'law_categories')
+
+_lock = threading.Lock()
+
+class LawsSnapshot:
+    """Immutable view of all laws; never modify the returned dicts"""
+
+    def __init__(self, version, laws, categories):
+        self.version = version
+        ordered = sorted(laws, key=lambda law: (law.date, law.id), reverse=True)
+
+        # Newest first, like GET /api/laws
+        self.ids = tuple(law.id for law in ordered)
+        self.updated_at = MappingProxyType({law.id: law.updated_at for law in ordered})
+        self.category_of = MappingProxyType({law.id: law.category_id for law in ordered})
+        self.items = MappingProxyType({
+            law.id: MappingProxyType({lang: law.to_dict(lang) for lang in (None,) + LANGUAGES})
+            for law in ordered
+        })
+
+        by_category = {}
+        for law in ordered:
+            by_category.setdefault(law.category_id, []).append(law.id)
+        self.by_category = MappingProxyType({key: tuple(ids) for key, ids in by_category.items()})
+
+        # Lower-cased names of each category for the ?category= substring filter
+        self.category_names = MappingProxyType({
+            category.id: tuple(category.multilang_value('name', lang).casefold() for lang in LANGUAGES)
+            for category in categories
+        })
+
+    def item(self, law_id, lang=None):
+        """Serialized law, or None when it does not exist"""
+        items = self.items.get(law_id)
+        return items[lang] if items else None
+
+    def filter(self, category_id=None, category=None):
+        """Ids of the laws in the given category (by id and/or name), newest first"""
+        ids = self.ids if category_id is None else self.by_category.get(category_id, ())
+        if category:
+            needle = category.casefold()
+            matching = {key for key, names in self.category_names.items()
+                        if any(needle in name for name in names)}
+            ids = tuple(law_id for law_id in ids if self.category_of[law_id] in matching)
+        return ids
+
+def _current_version():
+    versions = TableVersion.get_versions(SNAPSHOT_TABLES)
+    return tuple(versions[name][0] for name in SNAPSHOT_TABLES)
+
+def refresh_laws_snapshot(version=None):
+    """Rebuild the snapshot from the database and swap it in (call after commit)"""
+    app = current_app._get_current_object()
+    with _lock:
+        # The version is read before the rows: a write racing with the load
+        # leaves the snapshot one version behind, so it is rebuilt on next read
+        version = version or _current_version()
+        snapshot = app.extensions.get('laws_snapshot')
+        if snapshot is None or snapshot.version != version:
+            snapshot = LawsSnapshot(version, Law.query.all(), LawCategory.query.all())
+            app.extensions['laws_snapshot'] = snapshot
+    return snapshot
+
+def get_laws_snapshot():
+    """Current snapshot, rebuilt when another worker changed the tables"""
+    version = _current_version()
+    snapshot = current_app.extensions.get('laws_snapshot')
+    if snapshot is not None and snapshot.version == version:
+        CACHE_REQUESTS.inc(cache='laws_snapshot', result='hit')
+        return snapshot
+    CACHE_REQUESTS.inc(cache='laws_snapshot', result='miss')
+    return refresh_laws_snapshot(version)
@@ -0,0 +1,171 @@
+"""
+In-process metrics: counters, gauges and histograms with labels.
+
+Metrics are created once at import time through counter(), gauge() and
+histogram(), which register them by name, and updated from request and worker
+threads. Updates take a short per-metric lock and allocate nothing but the
+first time a label combination is seen. render() writes every registered
+metric in the Prometheus text exposition format (served at /metrics).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+REGISTRY = {}
+
+_lock = threading.Lock()
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """[(name suffix, {label: value}, value)] of every label combination"""
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Value that only goes up"""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [('_total', dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. work in progress"""
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [('', dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+class Histogram(Metric):
+    """Distribution of observed values (e.g. seconds) over cumulative buckets"""
+    type = 'histogram'
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Count per bucket (the last one is +Inf), then the sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(self.buckets)
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent in the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return sum(state[:-1]) if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        samples = []
+        for key, state in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), state[:-1]):
+                cumulative += count
+                samples.append(('_bucket', dict(labels, le=str(bound)), cumulative))
+            samples.append(('_sum', labels, state[-1]))
+            samples.append(('_count', labels, cumulative))
+        return samples
+
+def _register(cls, name, *args, **kwargs):
+    with _lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = REGISTRY[name] = cls(name, *args, **kwargs)
+        return metric
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n')
+
+def _escape_label(value):
+    return _escape(str(value)).replace('"', '\\"')
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render():
+    """Text exposition of the registered metrics (Prometheus format 0.0.4)"""
+    lines = []
+    for name, metric in sorted(REGISTRY.items()):
+        # Counter samples are name_total, and so is the name they are declared under
+        family = name + '_total' if metric.type == 'counter' else name
+        lines.append(f'# HELP {family} {_escape(metric.documentation)}')
+        lines.append(f'# TYPE {family} {metric.type}')
+        for suffix, labels, value in metric.samples():
+            if labels:
+                label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+                lines.append(f'{name}{suffix}{{{label_text}}} {_format_value(value)}')
+            else:
+                lines.append(f'{name}{suffix} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter, name, documentation, labelnames)
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge, name, documentation, labelnames)
+
+def histogram(name, documentation, labelnames=(), buckets=Histogram.DEFAULT_BUCKETS):
+    return _register(Histogram, name, documentation, labelnames, buckets)
+
+# Lookups in the in-process caches; hit ratio = hit / (hit + miss) per cache
+CACHE_REQUESTS = counter('cache_requests', 'In-process cache lookups by cache and result (hit, miss)', ['cache', 'result'])
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Schema upgrades for databases created by older versions.
+
+db.create_all() only creates missing tables, so columns added to existing
+tables are applied here. Every step is idempotent and runs from init_db.
+"""
+
+from sqlalchemy import inspect, text
+from models.file import File
+from models.table_version import bump_versions
+
+def add_column_if_missing(connection, table_name, column_name, ddl):
+    """Add a column to an existing table unless it is already there"""
+    columns = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    if column_name in columns:
+        return False
+    connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}'))
+    return True
+
+def migrate_law_categories(connection):
+    """Move the category strings repeated on every law into law_categories"""
+    add_column_if_missing(connection, 'laws', 'category_id',
+                          'INTEGER REFERENCES law_categories(id)')
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_laws_category_id ON laws (category_id)'))
+
+    # One category per distinct (ru, uz, en) triple still stored only on laws
+    inserted = connection.execute(text(
+        "INSERT INTO law_categories (name_ru, name_uz, name_en, created_at, updated_at) "
+        "SELECT DISTINCT l.category_ru, l.category_uz, l.category_en, "
+        "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP FROM laws l "
+        "WHERE l.category_id IS NULL AND NOT EXISTS ("
+        "  SELECT 1 FROM law_categories c WHERE c.name_ru = l.category_ru "
+        "  AND c.name_uz = l.category_uz AND c.name_en = l.category_en)"
+    ))
+    linked = connection.execute(text(
+        "UPDATE laws SET category_id = ("
+        "  SELECT c.id FROM law_categories c WHERE c.name_ru = laws.category_ru "
+        "  AND c.name_uz = laws.category_uz AND c.name_en = laws.category_en) "
+        "WHERE category_id IS NULL"
+    ))
+
+    # Raw SQL skips the ORM hooks; invalidate cached lists and snapshots here
+    changed = set()
+    if inserted.rowcount:
+        changed.add('law_categories')
+    if linked.rowcount:
+        changed.add('laws')
+    bump_versions(connection, changed)
+
+def migrate_upload_names(connection):
+    """Store the file name behind every upload URL, so references join on equality"""
+    if add_column_if_missing(connection, 'files', 'stored_name', 'VARCHAR(255)'):
+        connection.execute(text(
+            "UPDATE files SET stored_name = CASE WHEN filename LIKE '__/__/%' "
+            "THEN substr(filename, 7) ELSE filename END"
+        ))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_files_stored_name ON files (stored_name)'))
+
+    for table_name, url_column, name_column in (('laws', 'pdf_url', 'pdf_upload_name'),
+                                                ('news', 'image_url', 'image_upload_name'),
+                                                ('comrades', 'photo_url', 'photo_upload_name')):
+        if add_column_if_missing(connection, table_name, name_column, 'VARCHAR(255)'):
+            rows = connection.execute(text(
+                f'SELECT id, {url_column} FROM {table_name} WHERE {url_column} IS NOT NULL'
+            )).all()
+            for row_id, url in rows:
+                connection.execute(text(f'UPDATE {table_name} SET {name_column} = :name WHERE id = :id'),
+                                   {'name': File.name_in_url(url), 'id': row_id})
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{table_name}_{name_column} ON {table_name} ({name_column})'
+        ))
+
+def run_migrations(db):
+    """Bring an existing database up to the current schema"""
+    with db.engine.begin() as connection:
+        migrate_law_categories(connection)
+        add_column_if_missing(connection, 'files', 'text_status', 'VARCHAR(20)')
+        add_column_if_missing(connection, 'files', 'sha256', 'VARCHAR(64)')
+        connection.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_files_sha256 ON files (sha256)'))
+        add_column_if_missing(connection, 'files', 'ref_count', 'INTEGER NOT NULL DEFAULT 1')
+        add_column_if_missing(connection, 'files', 'derivatives', 'TEXT')
+        add_column_if_missing(connection, 'files', 'optimized', 'TEXT')
+        add_column_if_missing(connection, 'files', 'optimized_size', 'INTEGER')
+        if add_column_if_missing(connection, 'files', 'updated_at', 'DATETIME'):
+            connection.execute(text('UPDATE files SET updated_at = uploaded_at'))
+        migrate_upload_names(connection)
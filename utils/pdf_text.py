@@ -0,0 +1,72 @@
+"""
+Background text extraction from uploaded PDF documents.
+
+After a PDF upload is committed, its pages are extracted on the worker pool and
+stored as DocumentPage rows, which are indexed for full-text search next to the
+title and description of the laws referencing the file.
+"""
+
+from flask import current_app
+from sqlalchemy.orm.exc import StaleDataError
+from models import db
+from models.file import File
+from models.document_page import DocumentPage
+from utils.background import submit
+from utils.storage import get_storage
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # extraction is skipped when pypdf is not installed
+    PdfReader = None
+
+def remove_document_text(file_id):
+    """Delete the extracted pages of a file (through the ORM, so the index follows)"""
+    for page in DocumentPage.query.filter_by(file_id=file_id).all():
+        db.session.delete(page)
+
+def _commit():
+    try:
+        db.session.commit()
+    except StaleDataError:
+        # The file was deleted while its text was being extracted
+        db.session.rollback()
+
+def extract_pdf_text(file_id):
+    """Extract the text of every page of a stored PDF and save it for search"""
+    file_record = File.query.get(file_id)
+    if not file_record or file_record.file_type != 'pdf':
+        return
+    
+    if PdfReader is None:
+        file_record.text_status = 'unavailable'
+        _commit()
+        return
+    
+    try:
+        with get_storage().open(file_record.filename) as source:
+            reader = PdfReader(source)
+            pages = [(number, page.extract_text() or '') for number, page in enumerate(reader.pages, start=1)]
+    except Exception as e:
+        current_app.logger.warning('PDF text extraction failed for %s: %s', file_id, e)
+        file_record.text_status = 'failed'
+        _commit()
+        return
+    
+    remove_document_text(file_id)
+    for number, text in pages:
+        if text.strip():
+            db.session.add(DocumentPage(file_id=file_id, page=number, text=text))
+    file_record.text_status = 'done'
+    _commit()
+
+def queue_text_extraction(file_id):
+    """Schedule text extraction for an uploaded PDF"""
+    return submit(extract_pdf_text, file_id)
+
+def queue_pending_extractions():
+    """Schedule extraction for PDFs uploaded before extraction existed or interrupted"""
+    file_ids = [file_id for (file_id,) in db.session.query(File.id).filter(
+        File.file_type == 'pdf',
+        db.or_(File.text_status.is_(None), File.text_status == 'pending')
+    )]
+    return [queue_text_extraction(file_id) for file_id in file_ids]
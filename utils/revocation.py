@@ -0,0 +1,155 @@
+"""
+Revoked JWTs shared by all worker processes.
+
+Logged-out tokens are stored in the revoked_tokens table until their exp, so
+every process sees them and the table does not grow past the tokens that are
+still alive. Each process keeps a Bloom filter of the revoked JTIs in front of
+the table: the check for an ordinary token is a few bit lookups, and only a
+filter hit (a revoked token or a rare false positive) is confirmed in the
+database. The filter picks up revocations made by other processes every
+REVOCATION_SYNC_INTERVAL seconds, and is rebuilt after expired entries are
+pruned every REVOCATION_PRUNE_INTERVAL seconds.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from models import db
+from models.revoked_token import RevokedToken
+
+_lock = threading.Lock()
+
+# Rows committed by other processes just before a sync may carry a slightly
+# older revoked_at than the last one seen, so every sync looks back this far
+SYNC_OVERLAP = timedelta(seconds=60)
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class RevocationStore:
+    """Bloom filter of revoked JTIs, synchronised with the revoked_tokens table"""
+
+    def __init__(self, capacity, sync_interval, prune_interval):
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self._lock = threading.Lock()
+        self._filter = None
+        self._watermark = None
+        self._synced_at = 0
+        self._pruned_at = 0
+
+    def _rebuild(self):
+        """Load every live revocation into a new filter"""
+        rows = db.session.query(RevokedToken.jti, RevokedToken.revoked_at).all()
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)))
+        for jti, _ in rows:
+            bloom.add(jti)
+        self._filter = bloom
+        self._watermark = max((revoked_at for _, revoked_at in rows), default=None)
+
+    def _sync(self):
+        """Add revocations made by other processes since the last sync"""
+        query = db.session.query(RevokedToken.jti, RevokedToken.revoked_at)
+        if self._watermark is not None:
+            query = query.filter(RevokedToken.revoked_at >= self._watermark - SYNC_OVERLAP)
+        for jti, revoked_at in query:
+            if jti not in self._filter:
+                self._filter.add(jti)
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+        # An overfull filter answers "maybe" too often: start a larger one
+        if self._filter.count > self._filter.capacity:
+            self._rebuild()
+
+    def refresh(self):
+        """Sync the filter (and prune) when the intervals have passed"""
+        now = time.monotonic()
+        if self._filter is not None and now - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self._filter is not None and now - self._synced_at < self.sync_interval:
+                return
+            if self._filter is None or now - self._pruned_at >= self.prune_interval:
+                prune_revoked_tokens()
+                self._rebuild()
+                self._pruned_at = now
+            else:
+                self._sync()
+            self._synced_at = now
+
+    def revoke(self, jti, expires_at):
+        """Store a revocation and add it to this process's filter at once"""
+        try:
+            db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+            db.session.commit()
+        except IntegrityError:
+            # Already revoked (e.g. logout sent twice)
+            db.session.rollback()
+        self.refresh()
+        with self._lock:
+            self._filter.add(jti)
+
+    def is_revoked(self, jti):
+        self.refresh()
+        if jti not in self._filter:
+            return False
+        # Confirm filter hits: the token may be revoked or a false positive
+        return RevokedToken.query.get(jti) is not None
+
+def prune_revoked_tokens():
+    """Delete revocations of tokens that have expired; returns how many were removed"""
+    # On its own connection, so it never commits the work of the current request
+    with db.engine.begin() as connection:
+        result = connection.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow()))
+    return result.rowcount
+
+def get_revocation_store(app):
+    """Revocation store of the application, created on first use"""
+    store = app.extensions.get('token_revocations')
+    if store is None:
+        with _lock:
+            store = app.extensions.get('token_revocations')
+            if store is None:
+                store = RevocationStore(
+                    app.config.get('REVOCATION_BLOOM_CAPACITY', 100000),
+                    app.config.get('REVOCATION_SYNC_INTERVAL', 5),
+                    app.config.get('REVOCATION_PRUNE_INTERVAL', 3600)
+                )
+                app.extensions['token_revocations'] = store
+    return store
+
+def revoke_token(jwt_payload):
+    """Revoke a decoded token until its exp"""
+    expires_at = datetime.utcfromtimestamp(jwt_payload['exp']) if 'exp' in jwt_payload \
+        else datetime.utcnow() + current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+    get_revocation_store(current_app).revoke(jwt_payload['jti'], expires_at)
+
+def is_token_revoked(jwt_payload):
+    """Whether a decoded token has been revoked (by any process)"""
+    return get_revocation_store(current_app).is_revoked(jwt_payload['jti'])
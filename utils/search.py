@@ -0,0 +1,287 @@
+"""
+Full-text search for news and laws backed by SQLite FTS5.
+
+Each searchable model gets a standalone FTS5 table holding the analyzed form
+(see utils.analyzer) of its multilingual text columns, one FTS column per
+language column. The tables are kept in sync from the ORM write path (mapper
+events run inside the same transaction as the change), and queries are ranked
+with BM25. Text extracted from law PDFs (document_pages) is indexed the same
+way, once per language analyzer. On databases without FTS5 support the routes
+keep using the plain ILIKE filters.
+"""
+
+from sqlalchemy import event, text, func, literal_column, select, table, column, union_all
+from models.multilang import LANGUAGES
+from utils.analyzer import analyze, analyze_text, highlight
+from models.news import News
+from models.law import Law
+from models.file import File
+from models.document_page import DocumentPage
+
+# Per-engine cache of whether the FTS tables exist
+_fts_enabled = {}
+
+class SearchIndex:
+    """FTS5 index over the multilingual text fields of one model"""
+
+    def __init__(self, model, table_name, fields, weights, multilang=True):
+        """
+        Args:
+            model: Indexed model
+            table_name: Name of the FTS5 table
+            fields: Text fields; with multilang each field has one model column per
+                language (title_ru, ...), otherwise a single column of unknown
+                language is indexed once per language analyzer
+            weights: BM25 weight per field (default 1.0)
+        """
+        self.model = model
+        self.table_name = table_name
+        self.columns = [f'{field}_{lang}' for field in fields for lang in LANGUAGES]
+        self.sources = {f'{field}_{lang}': f'{field}_{lang}' if multilang else field
+                        for field in fields for lang in LANGUAGES}
+        self.weights = [weights.get(field, 1.0) for field in fields for lang in LANGUAGES]
+        self.fts = table(table_name, column('rowid'))
+
+    def create(self, connection):
+        """Create the FTS5 table if it does not exist; returns whether it was created"""
+        exists = connection.execute(
+            text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': self.table_name}
+        ).scalar()
+        if exists:
+            return False
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table_name} "
+            f"USING fts5({', '.join(self.columns)}, tokenize='unicode61 remove_diacritics 2')"
+        ))
+        return True
+
+    def in_sync(self, connection):
+        """Whether the index holds as many entries as the model has rows"""
+        indexed = connection.execute(text(f"SELECT count(*) FROM {self.table_name}")).scalar()
+        rows = connection.execute(text(f"SELECT count(*) FROM {self.model.__tablename__}")).scalar()
+        return indexed == rows
+
+    def _insert_statement(self):
+        placeholders = ', '.join(f':{name}' for name in self.columns)
+        return text(
+            f"INSERT INTO {self.table_name}(rowid, {', '.join(self.columns)}) "
+            f"VALUES (:rowid, {placeholders})"
+        )
+
+    def _entry(self, row_id, values):
+        """Index parameters: every column analyzed with its own language"""
+        entry = {name: analyze_text(values[self.sources[name]], language_of(name))
+                 for name in self.columns}
+        entry['rowid'] = row_id
+        return entry
+
+    def rebuild(self, connection, batch_size=500):
+        """Re-index every row of the model"""
+        connection.execute(text(f"DELETE FROM {self.table_name}"))
+        sources = ', '.join(sorted(set(self.sources.values())))
+        select_rows = text(
+            f"SELECT id, {sources} FROM {self.model.__tablename__} "
+            f"WHERE id > :last_id ORDER BY id LIMIT :limit"
+        )
+        last_id = 0
+        while True:
+            rows = connection.execute(select_rows, {'last_id': last_id, 'limit': batch_size}).fetchall()
+            if not rows:
+                break
+            connection.execute(self._insert_statement(),
+                               [self._entry(row.id, row._mapping) for row in rows])
+            last_id = rows[-1].id
+
+    def index(self, connection, target):
+        """Insert or replace the index entry for one object"""
+        self.remove(connection, target)
+        values = {source: getattr(target, source) for source in self.sources.values()}
+        connection.execute(self._insert_statement(), self._entry(target.id, values))
+
+    def remove(self, connection, target):
+        """Delete the index entry for one object"""
+        connection.execute(text(f"DELETE FROM {self.table_name} WHERE rowid = :rowid"),
+                           {'rowid': target.id})
+
+    def match_query(self, search):
+        """
+        Turn free text into an FTS5 query. The text is analyzed once per language
+        and matched against that language's columns; every term must match as a
+        prefix. Returns None when the text contains no searchable words.
+        """
+        groups = []
+        for lang in LANGUAGES:
+            terms = analyze(search, lang)
+            if not terms:
+                continue
+            columns = ' '.join(name for name in self.columns if language_of(name) == lang)
+            phrases = ' AND '.join(f'"{term}"*' for term in terms)
+            groups.append(f'{{{columns}}} : ({phrases})')
+        return ' OR '.join(groups) or None
+
+    def hits(self, match_query):
+        """
+        Subquery of matching ids with their BM25 rank.
+        Lower rank means a better match.
+        """
+        fts = literal_column(self.table_name)
+        # LIMIT -1 keeps SQLite from flattening the subquery into an outer
+        # aggregate, where bm25() cannot be evaluated
+        return select(
+            self.fts.c.rowid.label('id'),
+            func.bm25(fts, *self.weights).label('rank')
+        ).select_from(self.fts).where(fts.op('MATCH')(match_query)).limit(-1).subquery()
+
+    def highlights(self, session, ids, search, lang=None):
+        """
+        Highlighted snippet per id, taken from the first column (titles first)
+        containing a match. Only the text of the given ids is loaded.
+        """
+        if not ids:
+            return {}
+        languages = (lang,) if lang else LANGUAGES
+        terms = {code: analyze(search, code) for code in languages}
+        columns = [name for name in self.columns if language_of(name) in languages]
+        rows = session.query(self.model.id, *[getattr(self.model, self.sources[name]) for name in columns]) \
+            .filter(self.model.id.in_(ids))
+
+        snippets = {}
+        for row in rows:
+            for name, value in zip(columns, row[1:]):
+                code = language_of(name)
+                snippet = highlight(value, terms[code], code)
+                if snippet:
+                    snippets[row.id] = snippet
+                    break
+        return snippets
+
+    def listen(self):
+        """Keep the index in sync with inserts, updates and deletes of the model"""
+        def after_write(mapper, connection, target):
+            if fts_enabled(connection):
+                self.index(connection, target)
+
+        def after_delete(mapper, connection, target):
+            if fts_enabled(connection):
+                self.remove(connection, target)
+
+        event.listen(self.model, 'after_insert', after_write)
+        event.listen(self.model, 'after_update', after_write)
+        event.listen(self.model, 'after_delete', after_delete)
+
+def language_of(column_name):
+    """Language code of a multilingual column name such as title_ru"""
+    return column_name.rsplit('_', 1)[1]
+
+NEWS_INDEX = SearchIndex(News, 'news_fts', ('title', 'content'), {'title': 10.0})
+LAWS_INDEX = SearchIndex(Law, 'laws_fts', ('title', 'description'), {'title': 10.0})
+PAGES_INDEX = SearchIndex(DocumentPage, 'document_pages_fts', ('text',), {}, multilang=False)
+SEARCH_INDEXES = (NEWS_INDEX, LAWS_INDEX, PAGES_INDEX)
+
+# Matches in a law's PDF rank below matches in its title or description
+DOCUMENT_RANK_FACTOR = 0.5
+
+for _index in SEARCH_INDEXES:
+    _index.listen()
+
+def fts_supported(connection):
+    """Check whether the database is SQLite compiled with FTS5"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    try:
+        connection.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)"))
+        connection.execute(text("DROP TABLE temp.fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+def fts_enabled(connection):
+    """Check (once per engine) whether the FTS tables are available"""
+    key = str(connection.engine.url)
+    if key not in _fts_enabled:
+        enabled = False
+        if connection.dialect.name == 'sqlite':
+            names = [index.table_name for index in SEARCH_INDEXES]
+            found = connection.execute(
+                text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ("
+                     + ', '.join(f"'{name}'" for name in names) + ")")
+            ).scalar()
+            enabled = found == len(names)
+        _fts_enabled[key] = enabled
+    return _fts_enabled[key]
+
+def init_search(db):
+    """
+    Create the FTS tables when the database supports them, and backfill those
+    that are new or out of step with their table (the mapper events keep them
+    in sync afterwards)
+    """
+    with db.engine.begin() as connection:
+        if not fts_supported(connection):
+            return False
+        for index in SEARCH_INDEXES:
+            if index.create(connection) or not index.in_sync(connection):
+                index.rebuild(connection)
+    _fts_enabled.pop(str(db.engine.url), None)
+    return True
+
+def _document_pages(search):
+    """Subquery of matching PDF page ids with their rank, or None"""
+    match_query = PAGES_INDEX.match_query(search)
+    if not match_query:
+        return None
+    return PAGES_INDEX.hits(match_query)
+
+def law_hits(search):
+    """
+    Subquery of law ids matching the search in their title/description or in
+    the text of their PDF document (the File named in Law.pdf_url),
+    with the best rank of either. Returns None when the search has no words.
+    """
+    match_query = LAWS_INDEX.match_query(search)
+    if not match_query:
+        return None
+    metadata = LAWS_INDEX.hits(match_query)
+    pages = _document_pages(search)
+    documents = select(Law.id.label('id'), (func.min(pages.c.rank) * DOCUMENT_RANK_FACTOR).label('rank')) \
+        .select_from(pages) \
+        .join(DocumentPage, DocumentPage.id == pages.c.id) \
+        .join(File, File.id == DocumentPage.file_id) \
+        .join(Law, File.is_referenced_by(Law.pdf_upload_name)) \
+        .group_by(Law.id)
+    combined = union_all(select(metadata.c.id, metadata.c.rank), documents).subquery()
+    return select(combined.c.id, func.min(combined.c.rank).label('rank')) \
+        .group_by(combined.c.id).subquery()
+
+def document_page_hits(session, law_ids, search, per_law=3):
+    """
+    Best matching PDF pages for each of the given laws
+
+    Returns:
+        {law_id: [{'page': number, 'highlight': snippet}, ...]}
+    """
+    pages = _document_pages(search) if law_ids else None
+    if pages is None:
+        return {}
+    rows = session.query(Law.id, DocumentPage.page, DocumentPage.text) \
+        .select_from(pages) \
+        .join(DocumentPage, DocumentPage.id == pages.c.id) \
+        .join(File, File.id == DocumentPage.file_id) \
+        .join(Law, File.is_referenced_by(Law.pdf_upload_name)) \
+        .filter(Law.id.in_(law_ids)) \
+        .order_by(pages.c.rank)
+
+    terms = {lang: analyze(search, lang) for lang in LANGUAGES}
+    results = {}
+    for law_id, page, page_text in rows:
+        matches = results.setdefault(law_id, [])
+        if len(matches) >= per_law:
+            continue
+        snippet = None
+        for lang in LANGUAGES:
+            snippet = highlight(page_text, terms[lang], lang)
+            if snippet:
+                break
+        matches.append({'page': page, 'highlight': snippet})
+    return results
@@ -0,0 +1,67 @@
+"""
+Application-wide JSON provider (jsonify, request.get_json, app.json).
+
+Serializes with orjson when installed, which writes dicts, lists, strings and
+datetimes natively and returns UTF-8 bytes that go straight into the response,
+and falls back to the standard library otherwise. Either way datetimes are
+written as ISO 8601 with a 'Z' suffix for UTC (naive values are taken as UTC) and
+dates as YYYY-MM-DD, so models hand datetime and date values to jsonify as is.
+Keys keep their insertion order.
+"""
+
+from datetime import date, datetime, timedelta
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # the standard library json module is used instead
+    orjson = None
+
+if orjson:
+    _OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+def _isoformat(value):
+    # Same output as orjson: 'Z' for naive and UTC values, the offset otherwise
+    if value.tzinfo is None or value.utcoffset() == timedelta(0):
+        return value.replace(tzinfo=None).isoformat() + 'Z'
+    return value.isoformat()
+
+def _default(value):
+    """Values neither encoder handles itself"""
+    if isinstance(value, datetime):
+        return _isoformat(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+class FastJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+    ensure_ascii = False
+    default = staticmethod(_default)
+
+    def _options(self, indent=None):
+        return _OPTIONS | orjson.OPT_INDENT_2 if indent else _OPTIONS
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        data = orjson.dumps(obj, default=_default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+def init_json(app):
+    """Use FastJSONProvider for the application"""
+    # Extensions such as flask_jwt_extended look up the class for its default()
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+Delivery of uploaded files.
+
+Blobs and their image derivatives are named by content hash, so their names
+never point to different bytes: they get the name as a strong ETag and are
+cached as immutable for a year. Range requests (partial PDF viewing) and
+If-None-Match/If-Range are answered by Werkzeug's conditional responses.
+
+With UPLOAD_SENDFILE set, the transfer is handed to the front proxy instead
+('x-accel' for nginx X-Accel-Redirect, 'x-sendfile' for Apache/lighttpd), which
+then also handles Range and validators, so no worker is busy streaming bytes.
+Files kept in a bucket (UPLOAD_STORAGE = 's3') are answered with a redirect to
+a presigned URL carrying the same caching headers.
+"""
+
+import mimetypes
+import os
+import re
+from flask import current_app, redirect, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from utils.storage import get_storage
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# <sha256>.<ext> or <sha256>_<size>.<ext>
+CONTENT_ADDRESSED_NAME = re.compile(r'^[0-9a-f]{64}(_[a-z]+)?\.[A-Za-z0-9]+$')
+
+def is_immutable(filename):
+    """Whether the name is derived from the file content"""
+    return CONTENT_ADDRESSED_NAME.match(filename) is not None
+
+def _delegated_response(directory, stored_path, mimetype, immutable):
+    path = safe_join(directory, stored_path)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    response = current_app.response_class(
+        mimetype=mimetype or mimetypes.guess_type(stored_path)[0] or 'application/octet-stream'
+    )
+    if current_app.config['UPLOAD_SENDFILE'] == 'x-accel':
+        prefix = current_app.config.get('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + stored_path
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def _redirect_response(storage, filename, mimetype, immutable):
+    cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if immutable else 'no-cache'
+    url = storage.url(filename, mimetype=mimetype or mimetypes.guess_type(filename)[0],
+                      cache_control=cache_control)
+    if url is None:
+        raise NotFound()
+    response = redirect(url)
+    # The presigned URL expires, so the redirect may only be reused for part of its lifetime
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['UPLOAD_URL_EXPIRY'] // 2
+    return response
+
+def send_upload(filename, mimetype=None, cacheable=True):
+    """
+    Response for a stored upload, with validators, ranges and caching.
+    cacheable=False serves the file without long-lived caching, e.g. when it
+    stands in for a representation that does not exist yet.
+    """
+    if '/' in filename or filename.startswith('.'):
+        raise NotFound()
+    storage = get_storage()
+    immutable = cacheable and is_immutable(filename)
+    path = storage.local_path(filename)
+    if path is None:
+        return _redirect_response(storage, filename, mimetype, immutable)
+
+    directory = storage.local_root
+    stored_path = os.path.relpath(path, directory).replace(os.sep, '/')
+    if current_app.config.get('UPLOAD_SENDFILE'):
+        return _delegated_response(directory, stored_path, mimetype, immutable)
+
+    if immutable:
+        response = send_from_directory(directory, stored_path, mimetype=mimetype,
+                                       etag=filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+    else:
+        # Legacy timestamped names: revalidate with the mtime/size based ETag
+        response = send_from_directory(directory, stored_path, mimetype=mimetype)
+
+    # Tell PDF viewers that they may fetch pages with Range requests
+    if response.status_code == 200:
+        response.accept_ranges = 'bytes'
+    return response
@@ -0,0 +1,418 @@
+"""
+Storage of uploaded files.
+
+Stored files are addressed by their bare name (<sha256>.<ext>, derivatives
+<sha256>_<size>.<ext>) and kept in two levels of hash-prefix directories, e.g.
+3a/7b/3a7b...e4.pdf, so no directory grows past a few hundred entries.
+Content-addressed names are sharded by their own hash prefix, other (legacy)
+names by a hash of the name, so the location always follows from the name.
+
+URLs keep the bare name (/api/files/uploads/<name>); File.filename holds the
+sharded path. Files from the old flat layout are still found until
+`flask migrate-uploads` has moved them.
+
+Backends (UPLOAD_STORAGE):
+- 'local': the UPLOAD_FOLDER directory
+- 's3': an S3-compatible bucket (AWS, MinIO, ...; needs boto3), downloads are
+  redirected to presigned URLs
+
+UPLOAD_FOLDER always holds temporary files: uploads being received, resumable
+upload sessions and, with UPLOAD_ASYNC_WRITES, files waiting in the write
+queue to be sent to the bucket, which are served from there meanwhile.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db
+from models.file import File
+from utils.background import submit
+
+try:
+    import boto3
+except ImportError:  # only needed for UPLOAD_STORAGE = 's3'
+    boto3 = None
+
+CHUNK_SIZE = 64 * 1024
+
+HASH_PREFIX = re.compile(r'^[0-9a-f]{4}')
+
+# Write queue directory inside UPLOAD_FOLDER
+PENDING_DIR = '.pending'
+
+_lock = threading.Lock()
+
+def shard_path(name):
+    """Relative sharded path of a stored file name, e.g. 3a/7b/<name>"""
+    name = os.path.basename(name)
+    key = name if HASH_PREFIX.match(name) else hashlib.sha1(name.encode('utf-8')).hexdigest()
+    return f'{key[:2]}/{key[2:4]}/{name}'
+
+def resolve_upload(upload_dir, name):
+    """
+    Path of a stored file relative to the upload directory: its sharded
+    location, or the flat legacy one when it has not been migrated yet
+    """
+    sharded = shard_path(name)
+    if os.path.exists(os.path.join(upload_dir, sharded)):
+        return sharded
+    flat = os.path.basename(name)
+    if os.path.exists(os.path.join(upload_dir, flat)):
+        return flat
+    return sharded
+
+def upload_path(upload_dir, name):
+    """Absolute path of a stored file (see resolve_upload)"""
+    return os.path.join(upload_dir, resolve_upload(upload_dir, name))
+
+def prepare_path(upload_dir, name):
+    """Absolute sharded path for a new file, with its directories created"""
+    path = os.path.join(upload_dir, shard_path(name))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def upload_folder():
+    """Absolute path of UPLOAD_FOLDER (relative to the working directory)"""
+    return os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+
+class Storage:
+    """
+    Interface of the storage backends. Methods take stored file names (bare or
+    sharded); files in the write queue are answered from the local copy.
+    """
+
+    def __init__(self, local_root, async_writes=False):
+        self.local_root = local_root
+        self.async_writes = async_writes
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    # Backend operations
+
+    def put(self, name, source):
+        """Store the content of a readable binary file object, streamed"""
+        raise NotImplementedError
+
+    def _open(self, name):
+        raise NotImplementedError
+
+    def _exists(self, name):
+        raise NotImplementedError
+
+    def _delete(self, name):
+        raise NotImplementedError
+
+    def delete_path(self, path):
+        """Delete an object by its path as returned by list()"""
+        raise NotImplementedError
+
+    def list(self):
+        """{path: (size, mtime)} of every stored object"""
+        raise NotImplementedError
+
+    def url(self, name, mimetype=None, cache_control=None):
+        """Direct download URL of a stored file, or None when the application serves it"""
+        return None
+
+    def _local_path(self, name):
+        return None
+
+    # Write queue
+
+    def _pending_path(self, name):
+        with self._lock:
+            return self._pending.get(os.path.basename(name))
+
+    def save(self, name, path):
+        """
+        Move a finished local file (in UPLOAD_FOLDER) into storage; with
+        async_writes it is queued and sent on the worker pool
+        """
+        if not self.async_writes:
+            self._store(name, path)
+            return None
+        name = os.path.basename(name)
+        pending = os.path.join(self.local_root, PENDING_DIR, name)
+        os.makedirs(os.path.dirname(pending), exist_ok=True)
+        os.replace(path, pending)
+        return self._queue(name, pending)
+
+    def _store(self, name, path):
+        with open(path, 'rb') as source:
+            self.put(name, source)
+        os.remove(path)
+
+    def _queue(self, name, pending):
+        with self._lock:
+            self._pending[name] = pending
+        return submit(self._flush, name, pending)
+
+    def _flush(self, name, pending):
+        try:
+            with open(pending, 'rb') as source:
+                self.put(name, source)
+        except FileNotFoundError:
+            # Deleted while it was waiting
+            return
+        with self._lock:
+            if self._pending.get(name) == pending:
+                del self._pending[name]
+                os.remove(pending)
+
+    def pending_names(self):
+        """Names in the write queue on this node's disk, including those of other processes"""
+        directory = os.path.join(self.local_root, PENDING_DIR)
+        return set(os.listdir(directory)) if os.path.isdir(directory) else set()
+
+    def resume_writes(self):
+        """Queue again the files left in the write queue by a previous run"""
+        directory = os.path.join(self.local_root, PENDING_DIR)
+        if not os.path.isdir(directory):
+            return []
+        return [self._queue(name, os.path.join(directory, name)) for name in sorted(os.listdir(directory))]
+
+    # Reads and deletion, looking at the write queue first
+
+    def open(self, name):
+        """
+        Seekable binary file object with the content of a stored file
+
+        Raises:
+            FileNotFoundError: nothing is stored under the name
+        """
+        pending = self._pending_path(name)
+        if pending:
+            try:
+                return open(pending, 'rb')
+            except FileNotFoundError:
+                pass  # flushed meanwhile
+        return self._open(name)
+
+    def exists(self, name):
+        return self._pending_path(name) is not None or self._exists(name)
+
+    def delete(self, name):
+        """Delete a stored file; deleting a missing file is not an error"""
+        with self._lock:
+            pending = self._pending.pop(os.path.basename(name), None)
+        if pending and os.path.exists(pending):
+            os.remove(pending)
+        self._delete(name)
+
+    def local_path(self, name):
+        """Absolute path of a stored file on the local disk, or None"""
+        pending = self._pending_path(name)
+        if pending and os.path.exists(pending):
+            return pending
+        return self._local_path(name)
+
+class LocalStorage(Storage):
+    """Files in the sharded layout of a local directory"""
+
+    def __init__(self, root):
+        # Moving a file within the directory is instant, there is nothing to queue
+        super().__init__(root, async_writes=False)
+        self.root = root
+
+    def put(self, name, source):
+        path = prepare_path(self.root, name)
+        # Write to a temporary name so readers never see a partial file
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.', suffix='.part',
+                                         delete=False) as target:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                target.write(chunk)
+        os.replace(target.name, path)
+
+    def _store(self, name, path):
+        os.replace(path, prepare_path(self.root, name))
+
+    def _open(self, name):
+        return open(upload_path(self.root, name), 'rb')
+
+    def _exists(self, name):
+        return os.path.exists(upload_path(self.root, name))
+
+    def _delete(self, name):
+        path = upload_path(self.root, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def delete_path(self, path):
+        path = os.path.join(self.root, path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def list(self):
+        found = {}
+        for directory, subdirectories, names in os.walk(self.root):
+            # Temporary files, upload sessions and the write queue are not stored files
+            subdirectories[:] = [subdirectory for subdirectory in subdirectories if not subdirectory.startswith('.')]
+            for name in names:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found[os.path.relpath(path, self.root).replace(os.sep, '/')] = (stat.st_size, stat.st_mtime)
+        return found
+
+    def _local_path(self, name):
+        path = upload_path(self.root, name)
+        return path if os.path.isfile(path) else None
+
+def _missing(error):
+    """Whether a boto3 error means that the object does not exist"""
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in ('404', 'NoSuchKey', 'NotFound')
+
+class S3Storage(Storage):
+    """Files in an S3-compatible bucket, under prefix + sharded path"""
+
+    def __init__(self, bucket, local_root, prefix='', client=None, url_expiry=3600,
+                 async_writes=False, **client_options):
+        super().__init__(local_root, async_writes)
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("UPLOAD_STORAGE = 's3' requires boto3 (pip install boto3)")
+            client = boto3.client('s3', **{key: value for key, value in client_options.items() if value})
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.url_expiry = url_expiry
+
+    def _key(self, name):
+        return self.prefix + shard_path(name)
+
+    def put(self, name, source):
+        # upload_fileobj streams large files as a multipart upload
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.client.upload_fileobj(source, self.bucket, self._key(name), ExtraArgs={'ContentType': content_type})
+
+    def _open(self, name):
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(name))['Body']
+        except Exception as e:
+            if _missing(e):
+                raise FileNotFoundError(name) from e
+            raise
+        # Spooled to memory or disk: Pillow and pypdf need to seek
+        spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, dir=self.local_root)
+        for chunk in iter(lambda: body.read(CHUNK_SIZE), b''):
+            spool.write(chunk)
+        body.close()
+        spool.seek(0)
+        return spool
+
+    def _exists(self, name):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except Exception as e:
+            if _missing(e):
+                return False
+            raise
+        return True
+
+    def _delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+    def delete_path(self, path):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + path)
+
+    def list(self):
+        found = {}
+        for page in self.client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get('Contents', []):
+                found[item['Key'][len(self.prefix):]] = (item['Size'], item['LastModified'].timestamp())
+        return found
+
+    def url(self, name, mimetype=None, cache_control=None):
+        params = {'Bucket': self.bucket, 'Key': self._key(name)}
+        if mimetype:
+            params['ResponseContentType'] = mimetype
+        if cache_control:
+            params['ResponseCacheControl'] = cache_control
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.url_expiry)
+
+def create_storage(config):
+    """Storage backend configured by UPLOAD_STORAGE"""
+    root = os.path.abspath(config['UPLOAD_FOLDER'])
+    os.makedirs(root, exist_ok=True)
+    backend = config.get('UPLOAD_STORAGE', 'local')
+    if backend == 'local':
+        return LocalStorage(root)
+    if backend == 's3':
+        return S3Storage(
+            config['S3_BUCKET'], root,
+            prefix=config.get('S3_PREFIX', ''),
+            url_expiry=config.get('UPLOAD_URL_EXPIRY', 3600),
+            async_writes=config.get('UPLOAD_ASYNC_WRITES', False),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region_name=config.get('S3_REGION'),
+            aws_access_key_id=config.get('S3_ACCESS_KEY_ID'),
+            aws_secret_access_key=config.get('S3_SECRET_ACCESS_KEY')
+        )
+    raise ValueError(f'Unknown UPLOAD_STORAGE: {backend}')
+
+def get_storage():
+    """Storage backend of the application, created on first use"""
+    app = current_app._get_current_object()
+    storage = app.extensions.get('storage')
+    if storage is None:
+        with _lock:
+            storage = app.extensions.get('storage')
+            if storage is None:
+                storage = create_storage(app.config)
+                app.extensions['storage'] = storage
+    return storage
+
+def _move(upload_dir, name):
+    source = os.path.join(upload_dir, os.path.basename(name))
+    if os.path.exists(source):
+        destination = prepare_path(upload_dir, name)
+        if os.path.exists(destination):
+            os.remove(source)
+        else:
+            os.replace(source, destination)
+
+def migrate_flat_uploads(upload_dir, batch_size=100):
+    """
+    Move files of the flat layout into shards, batch by batch. Each batch is
+    committed on its own and files are resolved in both places meanwhile, so
+    this can run while the application serves requests.
+
+    Returns:
+        Number of migrated File records
+    """
+    migrated = 0
+    while True:
+        batch = File.query.filter(~File.filename.contains('/')) \
+            .order_by(File.uploaded_at).limit(batch_size).all()
+        if not batch:
+            return migrated
+        for file_record in batch:
+            _move(upload_dir, file_record.filename)
+            for variant in file_record.get_derivatives().values():
+                for name in variant['formats'].values():
+                    _move(upload_dir, name)
+            file_record.filename = shard_path(file_record.filename)
+        db.session.commit()
+        migrated += len(batch)
+
+@click.command('migrate-uploads')
+@click.option('--batch-size', default=100, show_default=True, help='Files moved per transaction.')
+@with_appcontext
+def migrate_uploads_command(batch_size):
+    """Move uploads from the flat directory into the sharded layout."""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise click.ClickException('The flat layout only exists with UPLOAD_STORAGE = local')
+    migrated = migrate_flat_uploads(storage.root, batch_size)
+    click.echo(f'Migrated {migrated} files')
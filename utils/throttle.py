@@ -0,0 +1,56 @@
+"""
+Token-bucket rate limiting per key (client IP, username, ...).
+
+Each key gets a bucket of `burst` tokens, refilled at `per_minute` tokens a
+minute; an attempt takes one token and is refused while the bucket is empty.
+Buckets live in the process (limits apply per worker process) and the least
+recently used ones are dropped beyond `max_keys`, a full bucket being
+equivalent to no bucket.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_lock = threading.Lock()
+
+class RateLimiter:
+    def __init__(self, burst, per_minute, max_keys=10000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated at)
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """
+        Take a token for key
+
+        Returns:
+            0 when allowed, otherwise the seconds until a token is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate if self.rate else 60.0
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+def get_rate_limiter(app, name):
+    """RateLimiter of the application configured by <name>_BURST and <name>_PER_MINUTE"""
+    limiters = app.extensions.setdefault('rate_limiters', {})
+    limiter = limiters.get(name)
+    if limiter is None:
+        with _lock:
+            limiter = limiters.get(name)
+            if limiter is None:
+                limiter = RateLimiter(app.config[f'{name}_BURST'], app.config[f'{name}_PER_MINUTE'])
+                limiters[name] = limiter
+    return limiter
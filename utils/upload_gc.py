@@ -0,0 +1,196 @@
+"""
+Garbage collection of uploads.
+
+Finds, with set-based queries and a single listing of the storage backend:
+- unreferenced files: File rows not uploaded or changed within the grace
+  period whose file name no Law.pdf_url, News.image_url or Comrade.photo_url
+  points to (joined on the indexed names stored with the URLs)
+- missing files: File rows older than the grace period whose blob is neither
+  stored nor waiting in the write queue
+- stray files: stored files that belong to no File row or derivative, and
+  temporary files in UPLOAD_FOLDER of no active upload session (including
+  abandoned uploads)
+
+Run as `flask --app app gc-uploads` for a dry-run report, add --delete to
+remove what was found. Unreferenced records are deleted with their files;
+missing files that are still referenced are only reported. Deletion happens
+in batches, each committed on its own, and stops after --limit items, so large
+backlogs can be worked off over several runs.
+"""
+
+import os
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, or_
+from models import db
+from models.file import File
+from models.law import Law
+from models.news import News
+from models.comrade import Comrade
+from models.upload_session import UploadSession
+from models.table_version import bump_versions
+from utils.pdf_text import remove_document_text
+from utils.images import remove_image_derivatives, image_variants
+from utils.uploads import remove_expired_upload_sessions
+from utils.storage import shard_path, get_storage, upload_folder
+
+def _referenced():
+    """EXISTS clause: the File is referenced by a law, news item or comrade"""
+    return or_(
+        db.session.query(Law.id).filter(File.is_referenced_by(Law.pdf_upload_name)).exists(),
+        db.session.query(News.id).filter(File.is_referenced_by(News.image_upload_name)).exists(),
+        db.session.query(Comrade.id).filter(File.is_referenced_by(Comrade.photo_upload_name)).exists()
+    )
+
+def _changed_at():
+    """Last upload of the file or change to its record (a new reference bumps it)"""
+    return func.coalesce(File.updated_at, File.uploaded_at)
+
+def _staging(upload_dir):
+    """{relative path: (size, mtime)} of temporary uploads and upload session files"""
+    found = {}
+    for directory, prefix in ((upload_dir, '.upload-'), (os.path.join(upload_dir, '.sessions'), '')):
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if not name.startswith(prefix) or not os.path.isfile(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            found[os.path.relpath(path, upload_dir).replace(os.sep, '/')] = (stat.st_size, stat.st_mtime)
+    return found
+
+def find_garbage(upload_dir, min_age):
+    """
+    Collect what can be deleted
+
+    Returns:
+        {'unreferenced': [File], 'missing': [File], 'stray': [(path, size)],
+         'cutoff': datetime}; unreferenced rows may be missing as well
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+    # Rows are read before storage is listed: a row committed in between is
+    # not seen at all, rather than seen without its blob
+    unreferenced = File.query.filter(_changed_at() < cutoff, ~_referenced()) \
+        .order_by(File.uploaded_at).all()
+    records = File.query.order_by(File.uploaded_at).all()
+
+    storage = get_storage()
+    on_disk = storage.list()
+    on_disk.update(_staging(upload_dir))
+    # The write queue (.pending) is left alone: it holds the only copy until sent
+    pending = storage.pending_names()
+
+    # Stored files may still be in the flat layout until migrate-uploads has run
+    known = set()
+    missing = []
+    for file_record in records:
+        names = [file_record.filename]
+        for variant in image_variants(file_record):
+            names.extend(variant['formats'].values())
+        for name in names:
+            known.update((shard_path(name), os.path.basename(name)))
+        # Young rows may belong to an upload whose blob is still being written
+        if file_record.uploaded_at >= cutoff:
+            continue
+        name = os.path.basename(file_record.filename)
+        if shard_path(file_record.filename) not in on_disk and name not in on_disk and name not in pending:
+            missing.append(file_record)
+
+    sessions = {session_id for (session_id,) in db.session.query(UploadSession.id)
+                .filter(UploadSession.expires_at >= datetime.utcnow())}
+    known.update(f'.sessions/{session_id}.part' for session_id in sessions)
+
+    # Files younger than the grace period may belong to an upload in progress
+    stray_cutoff = cutoff.timestamp() if min_age else float('inf')
+    stray = sorted(
+        (path, size) for path, (size, mtime) in on_disk.items()
+        if path not in known and (mtime < stray_cutoff or path.startswith('.sessions'))
+    )
+
+    return {
+        'unreferenced': unreferenced,
+        'missing': missing,
+        'stray': stray,
+        'cutoff': cutoff
+    }
+
+def _delete_records(records, cutoff):
+    """Delete a batch of records with their files; returns how many were deleted"""
+    # Take the write lock before checking again (SQLite; row locks elsewhere),
+    # so an upload cannot add a reference between the check and the delete
+    bump_versions(db.session.connection(), {File.__tablename__})
+    current = File.query.filter(File.id.in_([file_record.id for file_record in records]),
+                                _changed_at() < cutoff, ~_referenced()) \
+        .with_for_update().populate_existing().all()
+
+    storage = get_storage()
+    for file_record in current:
+        remove_document_text(file_record.id)
+        db.session.delete(file_record)
+        storage.delete(file_record.filename)
+        remove_image_derivatives(file_record)
+    db.session.commit()
+    return len(current)
+
+def collect_garbage(upload_dir, garbage, batch_size=100, limit=1000):
+    """Delete found garbage in committed batches; returns the number of deleted items"""
+    remove_expired_upload_sessions(upload_dir)
+
+    # Missing files that are still referenced are left for an upload to restore
+    records = garbage['unreferenced'][:limit]
+    deleted = 0
+    for start in range(0, len(records), batch_size):
+        deleted += _delete_records(records[start:start + batch_size], garbage['cutoff'])
+
+    storage = get_storage()
+    stray = garbage['stray'][:max(limit - len(records), 0)]
+    for path, _ in stray:
+        # Temporary files are always local, stored files belong to the backend
+        if not path.startswith('.'):
+            storage.delete_path(path)
+        elif os.path.exists(os.path.join(upload_dir, path)):
+            os.remove(os.path.join(upload_dir, path))
+    return deleted + len(stray)
+
+@click.command('gc-uploads')
+@click.option('--delete', is_flag=True, help='Delete what is found (default: report only).')
+@click.option('--batch-size', default=100, show_default=True, help='Records deleted per transaction.')
+@click.option('--limit', default=1000, show_default=True, help='Maximum items deleted in this run.')
+@click.option('--min-age', type=int, default=None,
+              help='Grace period in seconds for new uploads (default: UPLOAD_GC_MIN_AGE).')
+@with_appcontext
+def gc_uploads_command(delete, batch_size, limit, min_age):
+    """Find and delete unreferenced, missing and stray uploads."""
+    upload_dir = upload_folder()
+    if min_age is None:
+        min_age = current_app.config['UPLOAD_GC_MIN_AGE']
+    garbage = find_garbage(upload_dir, min_age)
+
+    missing_ids = {file_record.id for file_record in garbage['missing']}
+    unreferenced_ids = {file_record.id for file_record in garbage['unreferenced']}
+    for file_record in garbage['unreferenced']:
+        if file_record.id not in missing_ids:
+            click.echo(f'unreferenced  {file_record.filename}  {file_record.size} bytes  ({file_record.original_name})')
+    for file_record in garbage['missing']:
+        state = 'unreferenced' if file_record.id in unreferenced_ids else 'still referenced, kept'
+        click.echo(f'missing       {file_record.filename}  ({file_record.original_name}; {state})')
+    for path, size in garbage['stray']:
+        click.echo(f'stray         {path}  {size} bytes')
+
+    reclaimable = sum(file_record.size for file_record in garbage['unreferenced']
+                      if file_record.id not in missing_ids) \
+        + sum(size for _, size in garbage['stray'])
+    click.echo(f"{len(garbage['unreferenced'])} unreferenced, {len(garbage['missing'])} missing, "
+               f"{len(garbage['stray'])} stray; {reclaimable} bytes reclaimable")
+
+    if not delete:
+        click.echo('Dry run, nothing deleted (use --delete)')
+        return
+    deleted = collect_garbage(upload_dir, garbage, batch_size, limit)
+    click.echo(f'Deleted {deleted} items')
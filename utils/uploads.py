@@ -0,0 +1,201 @@
+"""
+Streaming upload handling.
+
+A single-shot multipart request body is decoded chunk by chunk and the
+uploaded file is written straight to a temporary file in the upload directory
+while its SHA-256 is computed, so a large upload is never held in memory or
+copied twice. The size limit is enforced during the stream: the upload is
+aborted as soon as it is exceeded instead of after the whole body has been
+received.
+
+Resumable uploads (UploadSession) append raw chunks at a known offset to a
+staging file in uploads/.sessions; the file is hashed once it is complete.
+"""
+
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+from models import db
+from models.upload_session import UploadSession
+
+CHUNK_SIZE = 64 * 1024
+
+class UploadError(ValueError):
+    """The request body is not a usable multipart upload"""
+
+class UploadTooLarge(Exception):
+    """The uploaded file exceeds the size limit of its type"""
+
+    def __init__(self, file_type, max_size):
+        super().__init__(f'Upload exceeds {max_size} bytes')
+        self.file_type = file_type
+        self.max_size = max_size
+
+class StreamedUpload:
+    """A file received by stream_upload, stored in a temporary file until saved"""
+
+    def __init__(self, filename, path, size, sha256):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def save(self, storage, name):
+        """Hand the received file over to storage (moved, not copied, on local disk)"""
+        storage.save(name, self.path)
+        self.path = None
+
+    def discard(self):
+        """Delete the temporary file unless it was saved"""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+def stream_upload(request, upload_dir, size_limits, type_field='type', file_field='file'):
+    """
+    Read a multipart/form-data request, streaming the file part to disk
+
+    Args:
+        request: Flask request (its body must not have been parsed yet)
+        upload_dir: Directory for the temporary file
+        size_limits: {type: max bytes}; the limit of the type given in
+            type_field applies, or the largest one while the type is unknown
+            (the field may come after the file)
+
+    Returns:
+        (fields, upload): dict of form fields and a StreamedUpload, or None
+        when the request has no file part
+
+    Raises:
+        UploadError: not a multipart request
+        UploadTooLarge: the file exceeded its limit (nothing is kept on disk)
+    """
+    content_type, options = parse_options_header(request.headers.get('Content-Type', ''))
+    boundary = options.get('boundary')
+    if content_type != 'multipart/form-data' or not boundary:
+        raise UploadError('Request must be multipart/form-data')
+
+    decoder = MultipartDecoder(
+        boundary.encode('latin-1'),
+        max_form_memory_size=request.max_form_memory_size,
+        max_parts=request.max_form_parts
+    )
+    fields = {}
+    upload = None
+    target = None
+    current = None
+    buffer = []
+    size = 0
+    digest = None
+
+    try:
+        while True:
+            chunk = request.stream.read(CHUNK_SIZE)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, Field):
+                    current, buffer = event, []
+                elif isinstance(event, File):
+                    current = event
+                    # Only the first file part with a name is stored, others are skipped
+                    if event.name == file_field and upload is None and target is None and event.filename:
+                        target = tempfile.NamedTemporaryFile(dir=upload_dir, prefix='.upload-',
+                                                             suffix='.part', delete=False)
+                        size, digest = 0, hashlib.sha256()
+                    elif event.name == file_field and upload is None and target is None:
+                        upload = StreamedUpload('', None, 0, None)
+                elif isinstance(event, Data):
+                    if isinstance(current, Field):
+                        buffer.append(event.data)
+                        if not event.more_data:
+                            fields[current.name] = b''.join(buffer).decode('utf-8', 'replace')
+                    elif target is not None:
+                        size += len(event.data)
+                        file_type = fields.get(type_field)
+                        max_size = size_limits.get(file_type, max(size_limits.values()))
+                        if size > max_size:
+                            raise UploadTooLarge(file_type if file_type in size_limits else None, max_size)
+                        digest.update(event.data)
+                        target.write(event.data)
+                        if not event.more_data:
+                            target.close()
+                            upload = StreamedUpload(current.filename, target.name, size, digest.hexdigest())
+                            target = None
+                event = decoder.next_event()
+            if isinstance(event, Epilogue) or not chunk:
+                break
+    except BaseException:
+        if target is not None:
+            target.close()
+            os.remove(target.name)
+        if upload is not None:
+            upload.discard()
+        raise
+
+    if target is not None:
+        # Body ended in the middle of the file part
+        target.close()
+        os.remove(target.name)
+        raise UploadError('Incomplete multipart body')
+
+    return fields, upload
+
+def staging_path(upload_dir, session_id):
+    """Staging file of a resumable upload session"""
+    return os.path.join(upload_dir, '.sessions', f'{session_id}.part')
+
+def append_chunk(stream, path, offset, max_size):
+    """
+    Write a request body into the staging file at offset
+
+    Returns:
+        New offset (bytes stored so far)
+
+    Raises:
+        UploadTooLarge: the chunk goes past max_size (the staging file is
+        truncated back to offset)
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = offset
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as target:
+        # Drop bytes of a chunk whose offset was never committed
+        target.truncate(start)
+        target.seek(start)
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            offset += len(chunk)
+            if offset > max_size:
+                target.truncate(start)
+                raise UploadTooLarge(None, max_size)
+            target.write(chunk)
+    return offset
+
+def hash_file(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def remove_upload_session(session, upload_dir):
+    """Delete an upload session and its staging file (the caller commits)"""
+    path = staging_path(upload_dir, session.id)
+    if os.path.exists(path):
+        os.remove(path)
+    db.session.delete(session)
+
+def remove_expired_upload_sessions(upload_dir):
+    """Garbage-collect abandoned upload sessions; returns how many were removed"""
+    expired = UploadSession.query.filter(UploadSession.expires_at < datetime.utcnow()).all()
+    for session in expired:
+        remove_upload_session(session, upload_dir)
+    if expired:
+        db.session.commit()
+    return len(expired)